@@ -2,43 +2,100 @@
 from __future__ import annotations
 
 import argparse
+import atexit
 import getpass
-import ipaddress
 import logging
-import re
+import sqlite3
 import sys
+import time
 from typing import Optional
 
+from ipmi_menu.commands import (
+    add_api_parser,
+    add_credentials_parser,
+    add_daemon_parser,
+    add_dashboard_parser,
+    add_inventory_parser,
+    add_inventory_sync_parser,
+    add_lan_audit_parser,
+    add_power_sample_parser,
+    add_provision_parser,
+    add_redfish_tls_parser,
+    add_sensor_scan_parser,
+    add_sol_capture_parser,
+    add_sol_search_parser,
+    add_status_parser,
+    cmd_api,
+    cmd_credentials,
+    cmd_daemon,
+    cmd_dashboard,
+    cmd_inventory,
+    cmd_inventory_sync,
+    cmd_lan_audit,
+    cmd_power_sample,
+    cmd_provision,
+    cmd_redfish_tls,
+    cmd_sensor_scan,
+    cmd_sol_capture,
+    cmd_sol_search,
+    cmd_status,
+    format_chassis_status,
+)
 from ipmi_menu.config.messages import get_available_languages, load_messages
 from ipmi_menu.config.preferences import (
+    get_host_profile,
     get_preferred_language,
     get_preferred_password,
     get_preferred_username,
     set_preferred_language,
     set_preferred_password,
     set_preferred_username,
+    update_host_profiles,
 )
 from ipmi_menu.config.settings import (
     DEFAULT_INTERFACE,
     DEFAULT_PASSWORD,
     DEFAULT_PORT,
     DEFAULT_USER,
+    POWER_WAIT_OFF_WINDOW,
+    POWER_WAIT_SETTLE,
+    POWER_WAIT_TIMEOUT,
     TIMEOUT_FAST,
     TIMEOUT_NORMAL,
+    TIMEOUT_SEL,
     TIMEOUT_SLOW,
 )
+from ipmi_menu.core.chassis import chassis_snapshot
+from ipmi_menu.core.credentials import configured_sets, remembered_set, resolve
+from ipmi_menu.core.daemon import attach
 from ipmi_menu.core.detect import detect
+from ipmi_menu.core.fleet import Target
+from ipmi_menu.core.hosts import is_valid_bmc_address
+from ipmi_menu.core.inventory import FRU_AREA_INFO, InventoryStore, record_inventory
 from ipmi_menu.core.ipmi import (
     has_ipmitool,
     ipmi,
     ipmi_lan_print,
     ipmi_sdr_list,
+    ipmi_stream,
     looks_like_auth_error,
     power,
     sol_activate,
     bootdev,
 )
+from ipmi_menu.core.negotiate import negotiate
+from ipmi_menu.core.power_wait import wait_for_power_state
+from ipmi_menu.core.profiling import profiler
+from ipmi_menu.core.transcript import TranscriptPlayer, TranscriptRecorder, set_player, set_recorder
+from ipmi_menu.core.sel import (
+    SEVERITY_CRITICAL,
+    SEVERITY_INFO,
+    SEVERITY_WARNING,
+    SelStore,
+    sync_sel,
+)
 from ipmi_menu.core.updater import is_update_available, run_upgrade
+from ipmi_menu.core.vendors import power_summary
 
 logger = logging.getLogger("ipmi_menu")
 
@@ -47,20 +104,6 @@ RED = "\033[91m"
 RESET = "\033[0m"
 from ipmi_menu.ui.prompts import confirm_critical, menu, yesno
 
-_HOSTNAME_RE = re.compile(
-    r"^(?!-)[A-Za-z0-9-]{1,63}(?<!-)(\.[A-Za-z0-9-]{1,63})*$"
-)
-
-
-def _is_valid_bmc_address(addr: str) -> bool:
-    """Validate BMC address as IPv4, IPv6, or hostname."""
-    try:
-        ipaddress.ip_address(addr)
-        return True
-    except ValueError:
-        pass
-    return bool(_HOSTNAME_RE.match(addr))
-
 
 def die(msg: str, code: int = 2) -> None:
     if msg:
@@ -68,6 +111,10 @@ def die(msg: str, code: int = 2) -> None:
     raise SystemExit(code)
 
 
+def _print_flush(line: str) -> None:
+    print(line, flush=True)
+
+
 def require_ipmi_ok(
     msg,
     host: str,
@@ -86,9 +133,110 @@ def require_ipmi_ok(
     die(msg.t("errors.ipmi_generic", details=blob or msg.t("errors.unknown")), 1)
 
 
+def remember_inventory(
+    host: str, user: str, password: Optional[str], interface: str, port: int, mc_text: str, fru_text: str
+) -> None:
+    """Save MC/FRU data already read to the inventory, with the fingerprint inventory-sync compares."""
+    rc, area, _ = ipmi(host, user, password, interface, port, TIMEOUT_FAST, FRU_AREA_INFO)
+    try:
+        store = InventoryStore()
+        record_inventory(store, host, mc_text, fru_text, area if rc == 0 else "")
+        store.close()
+    except sqlite3.Error as exc:
+        logger.debug("Inventory update failed: %s", exc)
+
+
+# Sub-commands: name -> (handler, needs ipmitool)
+SUBCOMMANDS = {
+    "provision": (cmd_provision, True),
+    "sol-capture": (cmd_sol_capture, True),
+    "sol-search": (cmd_sol_search, False),
+    "power-sample": (cmd_power_sample, True),
+    "sensor-scan": (cmd_sensor_scan, True),
+    "status": (cmd_status, True),
+    "daemon": (cmd_daemon, True),
+    "inventory-sync": (cmd_inventory_sync, True),
+    "inventory": (cmd_inventory, False),
+    "api": (cmd_api, True),
+    "lan-audit": (cmd_lan_audit, True),
+    "dashboard": (cmd_dashboard, True),
+    "credentials": (cmd_credentials, False),
+    "redfish-tls": (cmd_redfish_tls, False),
+}
+
+# Number of SEL entries shown by the SEL menu
+SEL_DISPLAY_LIMIT = 50
+
+# Power state a host is expected to settle in after each power action, and
+# the state it must go through first (a cycle shows off, then on again)
+_POWER_TARGET_STATE = {"on": ("on", None), "cycle": ("on", "off"), "reset": ("on", None)}
+# A reset keeps the power on: reaching "on" does not show that it happened
+_POWER_UNVERIFIABLE = {"reset"}
+
+
+def wait_power_state(msg, target: Target, mode: str) -> None:
+    expected = _POWER_TARGET_STATE.get(mode)
+    if expected is None:
+        return
+    state, via = expected
+    print(msg.t("info.power.waiting", state=state))
+    if via is None:
+        res = wait_for_power_state([target], state, POWER_WAIT_TIMEOUT, initial_delay=POWER_WAIT_SETTLE)[0]
+    else:
+        # Poll at once and often: the off phase of a cycle lasts a few seconds
+        res = wait_for_power_state(
+            [target], state, POWER_WAIT_TIMEOUT, base_interval=0.5, via=via, via_window=POWER_WAIT_OFF_WINDOW
+        )[0]
+    if not res.reached:
+        print(msg.t("errors.power_wait_timeout", state=res.state, seconds=f"{res.elapsed:.1f}"), file=sys.stderr)
+    elif mode in _POWER_UNVERIFIABLE or not res.verified:
+        print(msg.t("info.power.unverified", state=res.state, seconds=f"{res.elapsed:.1f}", action=mode))
+    else:
+        print(msg.t("info.power.reached", state=res.state, seconds=f"{res.elapsed:.1f}", polls=res.polls))
+
+
+def report_profile(msg, trace_path: Optional[str]) -> None:
+    print(profiler.summary(), file=sys.stderr)
+    if trace_path:
+        try:
+            profiler.write_trace(trace_path)
+            print(msg.t("info.profile.trace_saved", path=trace_path), file=sys.stderr)
+        except OSError as exc:
+            print(msg.t("errors.profile.trace", details=exc), file=sys.stderr)
+
+
+def report_transcript(msg, recorder: TranscriptRecorder) -> None:
+    recorder.close()
+    print(msg.t("info.transcript.saved", calls=recorder.calls, path=recorder.path), file=sys.stderr)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Interactive ipmitool menu")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose/debug output")
+    parser.add_argument("--profile", action="store_true", help="Time every BMC call and print a summary on exit")
+    parser.add_argument("--trace", metavar="FILE", help="With --profile, also write a Chrome trace of the calls")
+    parser.add_argument("--no-daemon", action="store_true", help="Do not use a running ipmi-menu daemon")
+    transcript = parser.add_mutually_exclusive_group()
+    transcript.add_argument("--record", metavar="FILE", help="Write every ipmitool call to a transcript (.gz: compressed)")
+    transcript.add_argument("--replay", metavar="FILE", help="Answer ipmitool calls from a transcript instead of the BMCs")
+    parser.add_argument(
+        "--replay-scale", type=float, default=1.0, help="With --replay, factor applied to recorded latencies (0: none)"
+    )
+    sub = parser.add_subparsers(dest="command")
+    add_provision_parser(sub)
+    add_sol_capture_parser(sub)
+    add_sol_search_parser(sub)
+    add_power_sample_parser(sub)
+    add_sensor_scan_parser(sub)
+    add_status_parser(sub)
+    add_daemon_parser(sub)
+    add_inventory_sync_parser(sub)
+    add_inventory_parser(sub)
+    add_api_parser(sub)
+    add_lan_audit_parser(sub)
+    add_dashboard_parser(sub)
+    add_credentials_parser(sub)
+    add_redfish_tls_parser(sub)
     args = parser.parse_args()
 
     logging.basicConfig(
@@ -97,6 +245,33 @@ def main() -> None:
     )
 
     msg = load_messages(get_preferred_language())
+    if args.profile or args.trace:
+        profiler.enable()
+        atexit.register(report_profile, msg, args.trace)
+
+    if args.record:
+        try:
+            recorder = TranscriptRecorder(args.record)
+        except OSError as exc:
+            die(msg.t("errors.transcript.open", path=args.record, details=exc), 2)
+        set_recorder(recorder)
+        atexit.register(report_transcript, msg, recorder)
+    if args.replay:
+        try:
+            set_player(TranscriptPlayer(args.replay, args.replay_scale))
+        except (OSError, ValueError) as exc:
+            die(msg.t("errors.transcript.open", path=args.replay, details=exc), 2)
+
+    # A running daemon answers repeated calls from its cache; transcripts need the calls made here
+    use_daemon = not (args.no_daemon or args.record or args.replay) and args.command != "daemon"
+    attached = use_daemon and attach() is not None
+    logger.debug("Attached to daemon: %s", attached)
+
+    if args.command:
+        handler, needs_ipmitool = SUBCOMMANDS[args.command]
+        if needs_ipmitool and not args.replay and not has_ipmitool():
+            die(msg.t("errors.ipmitool_missing"))
+        raise SystemExit(handler(msg, args))
 
     # Check for updates at startup (silent if fails)
     update_info = (False, "", None)
@@ -107,13 +282,13 @@ def main() -> None:
     except Exception as exc:
         logger.debug("Update check failed: %s", exc)
 
-    if not has_ipmitool():
+    if not args.replay and not has_ipmitool():
         die(msg.t("errors.ipmitool_missing"))
 
     host = input(msg.t("prompts.bmc_ip")).strip()
     if not host:
         die(msg.t("errors.bmc_ip_required"))
-    if not _is_valid_bmc_address(host):
+    if not is_valid_bmc_address(host):
         die(msg.t("errors.bmc_ip_invalid"))
 
     saved_user = get_preferred_username()
@@ -133,11 +308,31 @@ def main() -> None:
         password = password_in.rstrip("\n")
         pw_mode = "custom"
 
-    interface = DEFAULT_INTERFACE
     port = DEFAULT_PORT
+    # Defaults accepted: start with the credential set that last worked on this host
+    sets = configured_sets()
+    known = remembered_set(host, sets) if not user_input and pw_mode == "default" else None
+    if known is not None:
+        user, password, pw_mode = known.user, known.password, f"[{known.name}]"
 
     print(msg.t("info.connect_detect"))
-    require_ipmi_ok(msg, host, user, password, interface, port)
+    # Fastest working interface/cipher suite, probed once then cached per host.
+    # Through the daemon the cached link is checked with a (cached) `mc info`.
+    link = negotiate(host, user, password, port, verify=not attached)
+    if attached and link is not None:
+        if ipmi(host, user, password, link.interface, port, TIMEOUT_FAST, ["mc", "info"])[0] != 0:
+            link = negotiate(host, user, password, port, refresh=True)
+    if link is None and sets:
+        others = [c for c in sets if c != known]  # the remembered set just failed
+        res = resolve(host, others, port, profile=get_host_profile(host), refresh=True)
+        cred = res.credentials
+        if cred is not None and res.link is not None:
+            print(msg.t("info.credentials.accepted", name=cred.name))
+            user, password, pw_mode, link = cred.user, cred.password, f"[{cred.name}]", res.link
+            update_host_profiles({host: {"credentials": cred.name, **link.to_dict(port)}})
+    if link is None:
+        require_ipmi_ok(msg, host, user, password, DEFAULT_INTERFACE, port)
+    interface = link.interface if link is not None else DEFAULT_INTERFACE
 
     di = detect(host, user, password, interface, port, TIMEOUT_NORMAL)
     print(
@@ -149,6 +344,10 @@ def main() -> None:
         )
     )
     print(msg.t("info.auth", user=user, port=port, iface=interface, pw_mode=pw_mode))
+    profile = di.profile
+    if di.mc_text and di.fru_text:
+        # detect() needed the FRU dump: keep it rather than reading it again later
+        remember_inventory(host, user, password, interface, port, di.mc_text, di.fru_text)
 
     while True:
         # Build menu options
@@ -157,6 +356,7 @@ def main() -> None:
             ("sol", msg.t("menu.action.sol")),
             ("boot", msg.t("menu.action.boot")),
             ("info", msg.t("menu.action.info")),
+            ("sel", msg.t("menu.action.sel")),
             ("lang", msg.t("menu.action.language")),
             ("settings", msg.t("menu.action.settings")),
         ]
@@ -236,31 +436,85 @@ def main() -> None:
             continue
 
         if action == "info":
+            # sdr/fru are slow on many BMCs: print lines as they arrive
             print(msg.t("labels.info.sensors"))
-            rc_s, out_s, err_s = ipmi_sdr_list(host, user, password, interface, port, TIMEOUT_SLOW)
-            if out_s:
-                print(out_s)
+            rc_s, _, err_s = ipmi_sdr_list(
+                host, user, password, interface, port, profile.timeout("sdr", TIMEOUT_SLOW), on_line=_print_flush
+            )
             if rc_s != 0 and err_s:
                 print(err_s, file=sys.stderr)
 
+            print(msg.t("labels.info.power"))
+            rc, out, err = power_summary(host, user, password, interface, port, TIMEOUT_NORMAL, profile)
+            if out:
+                print(out)
+            if rc != 0 and err:
+                print(err, file=sys.stderr)
+
             print(msg.t("labels.info.misc"))
-            for sub_args, sub_timeout in (
-                (["mc", "info"], TIMEOUT_FAST),
-                (["fru", "print"], TIMEOUT_SLOW),
-            ):
-                rc, out, err = ipmi(host, user, password, interface, port, sub_timeout, list(sub_args))
-                if out:
-                    print(out)
-                if rc != 0 and err:
-                    print(err, file=sys.stderr)
+            rc, mc_out, err = ipmi(host, user, password, interface, port, TIMEOUT_FAST, ["mc", "info"])
+            if mc_out:
+                print(mc_out)
+            if rc != 0 and err:
+                print(err, file=sys.stderr)
 
-            rc, out, err = ipmi_lan_print(host, user, password, interface, port, TIMEOUT_NORMAL)
+            rc, fru_out, err = ipmi_stream(
+                host,
+                user,
+                password,
+                interface,
+                port,
+                profile.timeout("fru", TIMEOUT_SLOW),
+                ["fru", "print"],
+                _print_flush,
+            )
+            if rc != 0 and err:
+                print(err, file=sys.stderr)
+            if mc_out and fru_out:
+                remember_inventory(host, user, password, interface, port, mc_out, fru_out)
+
+            rc, out, err = ipmi_lan_print(
+                host, user, password, interface, port, TIMEOUT_NORMAL, channel=profile.lan_channel
+            )
             if out:
                 print(out)
             if rc != 0 and err:
                 print(err, file=sys.stderr)
             continue
 
+        if action == "sel":
+            sel_filter = menu(
+                msg,
+                "menu.sel.title",
+                [
+                    ("all", msg.t("menu.sel.all")),
+                    ("warning", msg.t("menu.sel.warning")),
+                    ("critical", msg.t("menu.sel.critical")),
+                    ("home", msg.t("menu.home")),
+                ],
+                0,
+            )
+            if sel_filter == "home":
+                continue
+            min_sev = {"all": SEVERITY_INFO, "warning": SEVERITY_WARNING, "critical": SEVERITY_CRITICAL}[sel_filter]
+            print(msg.t("info.sel.syncing"))
+            store = SelStore()
+            try:
+                res = sync_sel(host, user, password, interface, port, profile.timeout("sel", TIMEOUT_SEL), store)
+                if not res.ok:
+                    print(msg.t("errors.ipmi_generic", details=res.error or msg.t("errors.unknown")), file=sys.stderr)
+                else:
+                    print(msg.t("info.sel.synced", new=res.new, mode="full" if res.full else "incremental"))
+                entries = store.query(host, min_severity=min_sev, limit=SEL_DISPLAY_LIMIT)
+            finally:
+                store.close()
+            if not entries:
+                print(msg.t("info.sel.empty"))
+            for e in reversed(entries):
+                when = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(e.timestamp)) if e.timestamp else "-"
+                print(f"{e.record_id:>6x} | {when} | {e.severity_name:<8} | {e.sensor} | {e.event} | {e.direction}")
+            continue
+
         if action == "sol":
             print(msg.t("labels.sol_exit"))
             rc = sol_activate(host, user, password, interface, port)
@@ -292,12 +546,22 @@ def main() -> None:
                     print(msg.t("errors.cancelled"))
                     continue
 
-            timeout_power = TIMEOUT_FAST if mode == "status" else TIMEOUT_NORMAL
-            rc, out, err = power(host, user, password, interface, port, timeout_power, mode)
+            if mode == "status":
+                # one `chassis status` request gives power state, last event and faults
+                rc, st, err = chassis_snapshot(host, user, password, interface, port, TIMEOUT_FAST)
+                if st is not None:
+                    print(format_chassis_status(msg, host, st))
+                elif err:
+                    print(err, file=sys.stderr)
+                continue
+
+            rc, out, err = power(host, user, password, interface, port, TIMEOUT_NORMAL, mode)
             if out:
                 print(out)
             if rc != 0 and err:
                 print(err, file=sys.stderr)
+            elif rc == 0:
+                wait_power_state(msg, Target(host, user, password, interface, port), mode)
             continue
 
         # bootdev
@@ -379,6 +643,8 @@ def main() -> None:
                 print(out2)
             if rc2 != 0 and err2:
                 print(err2, file=sys.stderr)
+            elif rc2 == 0:
+                wait_power_state(msg, Target(host, user, password, interface, port), reboot_mode)
         else:
             print(msg.t("info.boot.set_no_reboot"))
         continue
@@ -0,0 +1,799 @@
+"""Non-interactive fleet sub-commands of ipmi-menu."""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import getpass
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ipmi_menu.config.messages import Messages
+from ipmi_menu.config.preferences import (
+    CONFIG_DIR,
+    get_credential_sets,
+    set_credential_sets,
+    update_host_profiles,
+)
+from ipmi_menu.config.settings import (
+    DEFAULT_PORT,
+    TIMEOUT_FAST,
+    TIMEOUT_SLOW,
+)
+from ipmi_menu.core.anomaly import SensorFrame, SensorReading, find_outliers, parse_sensor_list
+from ipmi_menu.core.api import API_SOCKET, API_TOKEN_FILE, DEFAULT_WORKERS, PER_BMC_LIMIT, ApiServer
+from ipmi_menu.core.chassis import ChassisStatus, chassis_snapshot
+from ipmi_menu.core.daemon import DAEMON_SOCKET, Daemon, connect
+from ipmi_menu.core.credentials import configured_sets, resolve_many
+from ipmi_menu.core.dcmi import (
+    POWER_SUMMARY_FILE,
+    PowerSampler,
+    rack_matrix,
+    summarize_matrix,
+    write_summaries,
+)
+from ipmi_menu.core.fleet import Target, entry_target
+from ipmi_menu.core.hosts import HostEntry, load_hosts, load_inventory, tag_value
+from ipmi_menu.core.inventory import InventoryRecord, InventoryStore, sync_inventory
+from ipmi_menu.core.ipmi import has_ipmitool, ipmi, ipmi_base, sol_deactivate
+from ipmi_menu.core.journal import Journal, new_journal_path
+from ipmi_menu.core.lan_audit import LanAuditStore, audit, collect
+from ipmi_menu.core.negotiate import negotiate_many
+from ipmi_menu.core.provision import ProvisionPipeline, ProvisionResult
+from ipmi_menu.core.redfish import HTTPS_PORT, fetch_fingerprint, normalize_fingerprint, tls_settings
+from ipmi_menu.core.shard import run_sharded
+from ipmi_menu.core.sol_capture import SOL_LOG_DIR, SolCapture
+from ipmi_menu.core.sol_index import SolIndex
+from ipmi_menu.ui.dashboard import Dashboard
+from ipmi_menu.ui.prompts import confirm_critical, menu
+
+
+def add_fleet_arguments(p: argparse.ArgumentParser) -> None:
+    """Arguments shared by every sub-command working on a host list."""
+    p.add_argument("hosts_file", help="File with one BMC address per line, or a .csv/.json inventory")
+    p.add_argument("--tag", action="append", help="Only hosts of the inventory with this tag (repeatable)")
+    p.add_argument("-U", "--user", help="IPMI username (default: saved username)")
+    p.add_argument("-I", "--interface", help="ipmitool interface (default: probed per host, then cached)")
+    p.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="BMC port")
+    p.add_argument("-w", "--workers", type=int, default=8, help="Concurrent BMC operations")
+    p.add_argument("--reprobe", action="store_true", help="Probe interface/cipher suite again, ignoring the cache")
+
+
+def fleet_targets(msg: Messages, args: argparse.Namespace) -> List[Target]:
+    """
+    Build targets from the host list or inventory (see load_inventory),
+    keeping the hosts with every --tag. Credentials come from -U, the entry
+    or its credential group (see entry_target); the other hosts get the
+    configured credential set that works for them, if any. Hosts without
+    an interface (-I, inventory) take their interface and cipher suite
+    from the cache, probing unknown ones.
+    """
+    try:
+        inventory = load_inventory(args.hosts_file)
+    except (OSError, ValueError) as exc:
+        print(msg.t("errors.hosts_file", details=exc), file=sys.stderr)
+        raise SystemExit(2)
+    entries = inventory.select(getattr(args, "tag", None) or ())
+    if not entries:
+        print(msg.t("errors.hosts_empty"), file=sys.stderr)
+        raise SystemExit(2)
+
+    targets = [entry_target(e, inventory.group(e.group), args.user, args.interface, args.port) for e in entries]
+    handled = _resolve_credentials(msg, args, entries, targets)
+    # Probe per credential set: hosts of a group share user, password and port
+    unknown: Dict[Tuple[str, Optional[str], int], List[int]] = {}
+    for i, e in enumerate(entries):
+        group = inventory.group(e.group)
+        if i not in handled and not (args.interface or e.interface or (group and group.interface)):
+            t = targets[i]
+            unknown.setdefault((t.user, t.password, t.port), []).append(i)
+    failed = 0
+    for (user, password, port), idx in unknown.items():
+        hosts = [targets[i].host for i in idx]
+        links = negotiate_many(hosts, user, password, port, workers=args.workers, refresh=args.reprobe)
+        failed += len(hosts) - len(links)
+        for i in idx:
+            link = links.get(targets[i].host)
+            if link is not None:
+                targets[i] = dataclasses.replace(targets[i], interface=link.interface)
+    if failed:
+        print(msg.t("errors.negotiate.failed", count=failed), file=sys.stderr)
+    return targets
+
+
+def _resolve_credentials(msg: Messages, args: argparse.Namespace, entries: List[HostEntry], targets: List[Target]) -> set:
+    """
+    Give the hosts without explicit credentials (-U, inventory user or
+    group) the configured credential set that works for them, updating
+    `targets` in place. Returns the indices of the hosts tried, whose link
+    is settled either way.
+    """
+    sets = configured_sets() if not args.user else []
+    if not sets:
+        return set()
+    buckets: Dict[Tuple[Optional[str], int], List[int]] = {}
+    for i, e in enumerate(entries):
+        if not (e.user or e.group):
+            buckets.setdefault((args.interface or e.interface, targets[i].port), []).append(i)
+    resolved = set()
+    for (interface, port), idx in buckets.items():
+        results = resolve_many(
+            [targets[i].host for i in idx], sets, port, interface=interface, workers=args.workers, refresh=args.reprobe
+        )
+        for i in idx:
+            r = results[targets[i].host]
+            if r.credentials is not None and r.link is not None:
+                targets[i] = dataclasses.replace(
+                    targets[i], user=r.credentials.user, password=r.credentials.password, interface=r.link.interface
+                )
+                resolved.add(i)
+    tried = {i for idx in buckets.values() for i in idx}
+    if len(tried) > len(resolved):
+        print(msg.t("errors.credentials.failed", count=len(tried) - len(resolved)), file=sys.stderr)
+    return tried
+
+
+def add_journal_arguments(p: argparse.ArgumentParser) -> None:
+    p.add_argument("--resume", metavar="JOURNAL", help="Resume an interrupted job from its journal")
+
+
+def open_journal(msg: Messages, args: argparse.Namespace, targets: List[Target]) -> Tuple[Journal, List[Target]]:
+    """Open (or resume) the job journal and drop hosts it already completed."""
+    path = args.resume or new_journal_path(args.command)
+    try:
+        journal = Journal(path, args.command, {"hosts_file": os.path.abspath(args.hosts_file)})
+    except (OSError, ValueError) as exc:
+        print(msg.t("errors.journal", details=exc), file=sys.stderr)
+        raise SystemExit(2)
+    done = journal.completed()
+    if done:
+        print(msg.t("info.journal.resuming", done=len(done), total=len(targets)))
+    return journal, [t for t in targets if t.host not in done]
+
+
+def add_provision_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("provision", help="PXE-boot and power cycle a list of hosts")
+    add_fleet_arguments(p)
+    p.add_argument("--legacy", action="store_true", help="Legacy BIOS boot instead of UEFI")
+    p.add_argument("--persistent", action="store_true", help="Keep PXE as boot device for all boots")
+    p.add_argument("--restore-disk", action="store_true", help="Set disk boot back once hosts are on")
+    p.add_argument("-y", "--yes", action="store_true", help="Do not ask for confirmation")
+    add_journal_arguments(p)
+
+
+def cmd_provision(msg: Messages, args: argparse.Namespace) -> int:
+    targets = fleet_targets(msg, args)
+    journal, targets = open_journal(msg, args, targets)
+    if not targets:
+        print(msg.t("info.journal.nothing_left"))
+        journal.close()
+        return 0
+    if not args.yes and not confirm_critical(msg, msg.t("labels.critical.provision", count=len(targets))):
+        print(msg.t("errors.cancelled"))
+        journal.close()
+        return 1
+
+    def report(res: ProvisionResult) -> None:
+        journal.record(res.host, res.ok, res.elapsed, res.detail if not res.ok else res.stage)
+        key = "info.provision.host_ok" if res.ok else "errors.provision.host_failed"
+        print(msg.t(key, host=res.host, stage=res.stage, seconds=f"{res.elapsed:.1f}", details=res.detail))
+
+    pipeline = ProvisionPipeline(
+        targets,
+        uefi=not args.legacy,
+        persistent=args.persistent,
+        restore_disk=args.restore_disk,
+        workers=args.workers,
+        on_result=report,
+    )
+    try:
+        results = pipeline.run()
+    except KeyboardInterrupt:
+        print(msg.t("errors.journal.interrupted", path=journal.path), file=sys.stderr)
+        return 130
+    finally:
+        journal.close()
+
+    print(msg.t("labels.provision.stages"))
+    for name in pipeline.stages:
+        st = pipeline.stats[name]
+        print(
+            f"  {name:<8} ok={st.ok:<5} failed={st.failed:<5} "
+            f"p50={st.percentile(0.5):6.1f}s p95={st.percentile(0.95):6.1f}s "
+            f"max={max(st.latencies, default=0.0):6.1f}s {st.throughput * 60:7.1f} hosts/min"
+        )
+    failed = sum(1 for r in results if not r.ok)
+    print(msg.t("info.provision.summary", ok=len(results) - failed, failed=failed))
+    print(msg.t("info.journal.path", path=journal.path))
+    return 1 if failed else 0
+
+
+def add_sol_capture_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("sol-capture", help="Capture the SOL consoles of a list of hosts")
+    add_fleet_arguments(p)
+    p.add_argument("--log-dir", default=str(SOL_LOG_DIR), help="Directory of the per-host console logs")
+    p.add_argument("--max-log-mb", type=int, default=16, help="Rotate (and gzip) console logs at this size")
+    p.add_argument("--keep", type=int, default=20, help="Compressed segments kept per host")
+
+
+def _sol_deactivate_all(targets: List[Target], workers: int) -> None:
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for t in targets:
+            pool.submit(sol_deactivate, t.host, t.user, t.password, t.interface, t.port, TIMEOUT_FAST)
+
+
+def cmd_sol_capture(msg: Messages, args: argparse.Namespace) -> int:
+    targets = fleet_targets(msg, args)
+    # A stale SOL session on the BMC makes `sol activate` fail: release them first.
+    _sol_deactivate_all(targets, args.workers)
+    capture = SolCapture(
+        {t.host: ipmi_base(t.host, t.user, t.password, t.interface, t.port) + ["sol", "activate"] for t in targets},
+        args.log_dir,
+        max_log_bytes=args.max_log_mb * 1024 * 1024,
+        keep=args.keep,
+    )
+    capture.start()
+    print(msg.t("info.sol_capture.started", count=len(targets), path=capture.log_dir))
+    try:
+        while True:
+            items = [
+                (
+                    name,
+                    msg.t(
+                        "menu.sol_capture.live" if s.alive else "menu.sol_capture.ended",
+                        host=name,
+                        kib=s.received // 1024,
+                    ),
+                )
+                for name, s in capture.sessions.items()
+            ]
+            items.append(("quit", msg.t("menu.sol_capture.stop")))
+            choice = menu(msg, "menu.sol_capture.title", items, len(items) - 1)
+            if choice == "quit":
+                break
+            print(msg.t("labels.sol_capture.attach"))
+            capture.attach(choice)
+            print()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        capture.stop()
+        _sol_deactivate_all(targets, args.workers)
+    print(msg.t("info.sol_capture.stopped", path=capture.log_dir))
+    return 0
+
+
+def add_sol_search_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("sol-search", help="Search captured SOL console logs")
+    p.add_argument("query", nargs="?", default="", help="Text to look for, e.g. \"kernel panic\"")
+    p.add_argument("--log-dir", default=str(SOL_LOG_DIR), help="Directory of the per-host console logs")
+    p.add_argument("--host", help="Only search the logs of this host")
+    p.add_argument("--boots", action="store_true", help="List the boots of --host instead of searching")
+
+
+def cmd_sol_search(msg: Messages, args: argparse.Namespace) -> int:
+    index = SolIndex(args.log_dir)
+    try:
+        index.update()
+        if args.boots:
+            if not args.host:
+                print(msg.t("errors.sol_search.host_required"), file=sys.stderr)
+                return 2
+            boots = index.boots(args.host)
+            for n, seg in enumerate(boots, start=1):
+                first = next((ln for ln in index.read_segment(seg) if ln.strip()), "")
+                print(f"#{n:<4} {seg.path}@{seg.start}  {first}")
+            return 0 if boots else 1
+        hits = index.grep(args.query, args.host)
+    finally:
+        index.close()
+
+    for seg, lines in hits.items():
+        label = msg.t("labels.sol_search.boot") if seg.boot else ""
+        print(f"== {seg.host} {seg.path}@{seg.start} {label}".rstrip())
+        for ln in lines:
+            print(f"   {ln}")
+    print(msg.t("info.sol_search.summary", matches=sum(len(v) for v in hits.values()), segments=len(hits)))
+    return 0 if hits else 1
+
+
+def add_power_sample_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("power-sample", help="Sample DCMI power readings and account energy")
+    add_fleet_arguments(p)
+    p.add_argument("--interval", type=float, default=5.0, help="Seconds between two readings of a host")
+    p.add_argument("--window", type=float, default=300.0, help="Seconds summarised per persisted record")
+    p.add_argument("--windows", type=int, default=0, help="Stop after this many windows (0: until Ctrl-C)")
+    p.add_argument("--summary-file", default=str(POWER_SUMMARY_FILE), help="JSON lines file of summaries")
+
+
+def cmd_power_sample(msg: Messages, args: argparse.Namespace) -> int:
+    if args.interval <= 0 or args.window <= 0:
+        print(msg.t("errors.power_sample.interval"), file=sys.stderr)
+        return 2
+    targets = fleet_targets(msg, args)
+    hosts = [t.host for t in targets]
+    rack_of = {t.host: tag_value(t.tags, "rack") for t in targets}
+    ticks = max(1, int(round(args.window / args.interval)))
+    print(msg.t("info.power_sample.started", count=len(targets), interval=args.interval, window=args.window))
+
+    done = 0
+    # One sampler (and its scheduler) for the whole run, not one per window
+    with PowerSampler(targets, args.interval) as sampler:
+        try:
+            while args.windows <= 0 or done < args.windows:
+                window_start = time.time()
+                matrix = sampler.sample_window(ticks)
+                host_stats = summarize_matrix(hosts, matrix, args.interval)
+                rack_keys, rack_rows = rack_matrix(hosts, matrix, rack_of)
+                rack_stats = summarize_matrix(rack_keys, rack_rows, args.interval)
+                window_s = ticks * args.interval
+                write_summaries(
+                    host_stats, scope="host", window_start=window_start, window_s=window_s, path=args.summary_file
+                )
+                write_summaries(
+                    rack_stats, scope="rack", window_start=window_start, window_s=window_s, path=args.summary_file
+                )
+                missing = sum(1 for st in host_stats if st.samples == 0)
+                for st in rack_stats:
+                    print(
+                        f"{time.strftime('%H:%M:%S', time.localtime(window_start))} rack={st.key} "
+                        f"mean={st.mean_w:.0f}W p95={st.p95_w:.0f}W max={st.max_w:.0f}W "
+                        f"energy={st.energy_wh:.1f}Wh"
+                    )
+                if missing:
+                    print(msg.t("errors.power_sample.no_reading", count=missing), file=sys.stderr)
+                done += 1
+        except KeyboardInterrupt:
+            pass
+    print(msg.t("info.power_sample.saved", path=args.summary_file))
+    return 0
+
+
+SENSOR_STATE_FILE = CONFIG_DIR / "sensor_state.json"
+
+
+def add_sensor_scan_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("sensor-scan", help="Rank sensor outliers across a list of hosts")
+    add_fleet_arguments(p)
+    p.add_argument("--top", type=int, default=20, help="Number of outliers to show")
+    p.add_argument(
+        "-j", "--processes", type=int, default=1, help="Worker processes, each running --workers BMC reads (large fleets)"
+    )
+    p.add_argument(
+        "--state-file",
+        default=str(SENSOR_STATE_FILE),
+        help="Readings of the previous scan, used for rate of change (rewritten after each scan)",
+    )
+    p.add_argument(
+        "--peers", default="rack", metavar="TAG", help="Inventory tag whose hosts are compared with each other"
+    )
+
+
+def _read_sensors(t: Target) -> Tuple[str, List[SensorReading]]:
+    # Module level so that run_sharded can hand it to worker processes
+    rc, out, _ = ipmi(t.host, t.user, t.password, t.interface, t.port, TIMEOUT_SLOW, ["sensor"])
+    return t.host, parse_sensor_list(out) if rc == 0 else []
+
+
+def cmd_sensor_scan(msg: Messages, args: argparse.Namespace) -> int:
+    targets = fleet_targets(msg, args)
+    readings = dict(run_sharded(_read_sensors, targets, processes=args.processes, workers=args.workers))
+    group_of = {t.host: tag_value(t.tags, args.peers) for t in targets}
+    unreachable = sum(1 for rows in readings.values() if not rows)
+
+    previous: Dict[str, Dict[str, float]] = {}
+    read_at: Dict[str, float] = {}
+    try:
+        with open(args.state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        previous = state.get("values", {})
+        # Files from before per-host times: every host was read at "ts"
+        read_at = state.get("read_at") or {h: state["ts"] for h in previous}
+    except (OSError, ValueError, KeyError):
+        pass
+    now = time.time()
+
+    ages = {h: (now - t) / 60.0 for h, t in read_at.items()}
+    frame = SensorFrame.from_readings(readings, group_of=group_of, previous=previous, previous_minutes=ages)
+    outliers = find_outliers(frame, top=args.top)
+
+    # Hosts that did not answer keep their last readings (and when they were taken)
+    for h, rows in readings.items():
+        if rows:
+            previous[h] = {r.name: r.value for r in rows}
+            read_at[h] = now
+    os.makedirs(os.path.dirname(os.path.abspath(args.state_file)), exist_ok=True)
+    with open(args.state_file, "w", encoding="utf-8") as f:
+        json.dump({"ts": now, "values": previous, "read_at": read_at}, f)
+
+    for o in outliers:
+        print(
+            f"{o.score:6.2f}  {o.host:<24} {o.sensor:<20} {o.value:>10.2f} {o.unit:<10} "
+            f"z={o.zscore:+.1f} thr={o.proximity:.2f} rate={o.rate:+.1f}/min"
+        )
+    if unreachable:
+        print(msg.t("errors.sensor_scan.unreachable", count=unreachable), file=sys.stderr)
+    print(msg.t("info.sensor_scan.summary", readings=len(frame.value), hosts=len(readings), outliers=len(outliers)))
+    return 0
+
+
+def format_chassis_status(msg: Messages, host: str, st: ChassisStatus) -> str:
+    return msg.t(
+        "info.chassis.status",
+        host=host,
+        power=st.power,
+        event=st.last_power_event or "-",
+        policy=st.restore_policy or "-",
+        faults=", ".join(st.faults) or msg.t("labels.chassis.no_fault"),
+    )
+
+
+def add_status_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("status", help="Power state, last power event and faults of a list of hosts")
+    add_fleet_arguments(p)
+    p.add_argument("--faults-only", action="store_true", help="Only show hosts with an active fault")
+
+
+def cmd_status(msg: Messages, args: argparse.Namespace) -> int:
+    targets = fleet_targets(msg, args)
+
+    def read(t: Target):
+        return t.host, chassis_snapshot(t.host, t.user, t.password, t.interface, t.port, TIMEOUT_FAST)
+
+    unreachable = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for host, (_, st, err) in pool.map(read, targets):
+            if st is None:
+                unreachable += 1
+                details = err or msg.t("errors.unknown")
+                print(msg.t("errors.status.host_failed", host=host, details=details), file=sys.stderr)
+            elif st.faults or not args.faults_only:
+                print(format_chassis_status(msg, host, st))
+    if unreachable:
+        print(msg.t("errors.status.unreachable", count=unreachable), file=sys.stderr)
+    return 1 if unreachable else 0
+
+
+def add_daemon_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("daemon", help="Keep BMC responses and sessions warm for later ipmi-menu runs")
+    p.add_argument("--socket", default=str(DAEMON_SOCKET), help="Unix socket path")
+    action = p.add_mutually_exclusive_group()
+    action.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    action.add_argument("--stats", action="store_true", help="Show the cache statistics of the running daemon")
+
+
+def cmd_daemon(msg: Messages, args: argparse.Namespace) -> int:
+    if args.stop or args.stats:
+        client = connect(args.socket)
+        if client is None:
+            print(msg.t("errors.daemon.not_running", path=args.socket), file=sys.stderr)
+            return 1
+        if args.stop:
+            client.request({"op": "shutdown"})
+            print(msg.t("info.daemon.stopped"))
+        else:
+            print(msg.t("info.daemon.stats", **client.request({"op": "stats"})))
+        return 0
+
+    daemon = Daemon(args.socket)
+    try:
+        daemon.bind()
+    except OSError as exc:
+        print(msg.t("errors.daemon.start", details=exc), file=sys.stderr)
+        return 1
+    print(msg.t("info.daemon.listening", path=args.socket), flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(msg.t("info.daemon.stopped"))
+    return 0
+
+
+def format_inventory(msg: Messages, r: InventoryRecord) -> str:
+    return msg.t(
+        "info.inventory.host",
+        host=r.host,
+        vendor=r.vendor,
+        product=r.product or "-",
+        serial=r.serial or "-",
+        firmware=r.firmware or "-",
+    )
+
+
+def add_inventory_sync_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("inventory-sync", help="Read MC/FRU data of a list of hosts into the local inventory")
+    add_fleet_arguments(p)
+    p.add_argument("--force", action="store_true", help="Read the FRU of every host, even if unchanged")
+    p.add_argument("--db", help="Inventory database (default: ~/.config/ipmi-menu/inventory.db)")
+
+
+def cmd_inventory_sync(msg: Messages, args: argparse.Namespace) -> int:
+    targets = fleet_targets(msg, args)
+    store = InventoryStore(args.db)
+
+    def sync(t: Target):
+        return t.host, sync_inventory(t.host, t.user, t.password, t.interface, t.port, TIMEOUT_FAST, store,
+                                      force=args.force)
+
+    fetched = changed = failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            for host, res in pool.map(sync, targets):
+                if not res.ok:
+                    failed += 1
+                    details = res.error or msg.t("errors.unknown")
+                    print(msg.t("errors.inventory.host_failed", host=host, details=details), file=sys.stderr)
+                    continue
+                fetched += res.fetched
+                changed += res.changed
+                if res.changed:
+                    print(format_inventory(msg, store.get(host)))  # type: ignore[arg-type]
+    finally:
+        store.close()
+    print(msg.t("info.inventory.sync_summary", hosts=len(targets), fetched=fetched, changed=changed, failed=failed))
+    return 1 if failed else 0
+
+
+def add_inventory_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("inventory", help="Search the local hardware inventory")
+    p.add_argument("--host", help="Only this host")
+    p.add_argument("--vendor", help="Vendor, e.g. dell (* wildcards allowed, case-insensitive)")
+    p.add_argument("--product", help="Product name, e.g. 'PowerEdge*'")
+    p.add_argument("--serial", help="Product, board or chassis serial number")
+    p.add_argument("--firmware", help="BMC firmware revision")
+    p.add_argument("--limit", type=int, help="At most this many hosts")
+    p.add_argument("--fru", action="store_true", help="Also print every stored FRU field")
+    p.add_argument("--json", action="store_true", help="One JSON object per host")
+    p.add_argument("--db", help="Inventory database (default: ~/.config/ipmi-menu/inventory.db)")
+
+
+def cmd_inventory(msg: Messages, args: argparse.Namespace) -> int:
+    store = InventoryStore(args.db)
+    try:
+        found = store.search(
+            host=args.host,
+            vendor=args.vendor,
+            product=args.product,
+            serial=args.serial,
+            firmware=args.firmware,
+            limit=args.limit,
+        )
+        for r in found:
+            fru = store.fru(r.host) if args.fru else {}
+            if args.json:
+                doc = dict(vars(r), **({"fru": fru} if args.fru else {}))
+                print(json.dumps(doc, sort_keys=True))
+                continue
+            print(format_inventory(msg, r))
+            for device, fields in fru.items():
+                print(f"  {device}")
+                for field, value in fields.items():
+                    print(f"    {field:<24} {value}")
+    finally:
+        store.close()
+    if not args.json:
+        print(msg.t("info.inventory.search_summary", count=len(found)))
+    return 0 if found else 1
+
+
+def add_api_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("api", help="Serve power/bootdev/sensors/detect over a local HTTP API (NDJSON results)")
+    p.add_argument("--socket", default=str(API_SOCKET), help="Unix socket path")
+    p.add_argument("--listen", metavar="[HOST:]PORT", help="Listen on TCP instead (default host 127.0.0.1)")
+    p.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent BMC operations per request")
+    p.add_argument("--per-bmc", type=int, default=PER_BMC_LIMIT, help="Concurrent operations on one BMC")
+
+
+def cmd_api(msg: Messages, args: argparse.Namespace) -> int:
+    address = None
+    if args.listen:
+        host, _, port = args.listen.rpartition(":")
+        try:
+            address = (host or "127.0.0.1", int(port))
+        except ValueError:
+            print(msg.t("errors.api.listen", value=args.listen), file=sys.stderr)
+            return 2
+    try:
+        server = ApiServer(socket_path=args.socket, address=address, workers=args.workers, per_bmc=args.per_bmc)
+    except OSError as exc:
+        print(msg.t("errors.api.start", details=exc), file=sys.stderr)
+        return 1
+    print(msg.t("info.api.listening", address=server.address), flush=True)
+    if server.token is not None:
+        print(msg.t("info.api.token", path=API_TOKEN_FILE), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(msg.t("info.api.stopped"))
+    return 0
+
+
+def add_lan_audit_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("lan-audit", help="Report hosts whose BMC network configuration changed since the last audit")
+    add_fleet_arguments(p)
+    p.add_argument("--channel", type=int, help="LAN channel (default: found by lan print, users of channel 1)")
+    p.add_argument("--show-new", action="store_true", help="Also list hosts audited for the first time")
+    p.add_argument("--db", help="Audit database (default: ~/.config/ipmi-menu/lan_audit.db)")
+
+
+def cmd_lan_audit(msg: Messages, args: argparse.Namespace) -> int:
+    targets = fleet_targets(msg, args)
+
+    def read(t: Target):
+        return t.host, collect(t.host, t.user, t.password, t.interface, t.port, TIMEOUT_FAST, args.channel)
+
+    snapshots = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for host, (snap, err) in pool.map(read, targets):
+            if snap is None:
+                failed += 1
+                details = err or msg.t("errors.unknown")
+                print(msg.t("errors.lan_audit.host_failed", host=host, details=details), file=sys.stderr)
+            else:
+                snapshots.append(snap)
+
+    store = LanAuditStore(args.db)
+    try:
+        drifts = audit(snapshots, store)
+    finally:
+        store.close()
+    new = sum(1 for d in drifts if d.new)
+    for d in drifts:
+        if d.new:
+            if args.show_new:
+                print(msg.t("info.lan_audit.new", host=d.host))
+            continue
+        print(msg.t("info.lan_audit.drift", host=d.host))
+        for name, before, after in d.changes:
+            print(f"  {name:<28} {before or '-'} -> {after or '-'}")
+    print(msg.t("info.lan_audit.summary", hosts=len(targets), drifted=len(drifts) - new, new=new, failed=failed))
+    return 1 if failed or len(drifts) > new else 0
+
+
+def add_dashboard_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("dashboard", help="Live full-screen view of power state and key sensors of a fleet")
+    add_fleet_arguments(p)
+    p.add_argument("--interval", type=float, default=10.0, help="Seconds between chassis status polls of a host")
+    p.add_argument("--sensor-interval", type=float, default=60.0, help="Seconds between sensor reads of a host")
+
+
+def cmd_dashboard(msg: Messages, args: argparse.Namespace) -> int:
+    if args.interval <= 0 or args.sensor_interval <= 0:
+        print(msg.t("errors.dashboard.interval"), file=sys.stderr)
+        return 2
+    targets = fleet_targets(msg, args)
+    Dashboard(
+        targets, interval=args.interval, sensor_interval=args.sensor_interval, workers=max(1, args.workers)
+    ).run(msg)
+    return 0
+
+
+def add_credentials_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("credentials", help="Manage the credential sets tried on hosts rejecting the default ones")
+    action = p.add_mutually_exclusive_group()
+    action.add_argument("--add", metavar="NAME", help="Add (or replace) a credential set, tried after the existing ones")
+    action.add_argument("--remove", metavar="NAME", help="Remove a credential set")
+    action.add_argument("--resolve", metavar="HOSTS_FILE", help="Find the working set of every host and remember it")
+    p.add_argument("-U", "--user", help="With --add: IPMI username of the set")
+    p.add_argument("--password-env", help="With --add: read the password from this variable instead of saving it")
+    p.add_argument("-I", "--interface", help="With --resolve: ipmitool interface (default: cached, else probed)")
+    p.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="With --resolve: BMC port")
+    p.add_argument("-w", "--workers", type=int, default=8, help="With --resolve: hosts tried concurrently")
+    p.add_argument("--reprobe", action="store_true", help="With --resolve: also check the hosts with a remembered set")
+
+
+def cmd_credentials(msg: Messages, args: argparse.Namespace) -> int:
+    saved = get_credential_sets()
+    if args.add:
+        if not args.user:
+            print(msg.t("errors.credentials.user_required"), file=sys.stderr)
+            return 2
+        entry = {"name": args.add, "user": args.user}
+        if args.password_env:
+            entry["password_env"] = args.password_env
+        else:
+            entry["password"] = getpass.getpass(msg.t("prompts.password"))
+        names = [c.get("name") for c in saved]
+        if args.add in names:
+            saved[names.index(args.add)] = entry
+        else:
+            saved.append(entry)
+        set_credential_sets(saved)
+        print(msg.t("info.credentials.saved", name=args.add))
+        return 0
+    if args.remove:
+        kept = [c for c in saved if c.get("name") != args.remove]
+        if len(kept) == len(saved):
+            print(msg.t("errors.credentials.unknown", name=args.remove), file=sys.stderr)
+            return 1
+        set_credential_sets(kept)
+        return 0
+    if args.resolve:
+        return _cmd_credentials_resolve(msg, args)
+    for n, c in enumerate(saved, start=1):
+        source = f"${c['password_env']}" if c.get("password_env") else msg.t("labels.credentials.saved")
+        print(f"{n:>2}. {c.get('name', '-'):<16} {c.get('user', '-'):<16} {source}")
+    if not saved:
+        print(msg.t("info.credentials.none"))
+    return 0
+
+
+def _cmd_credentials_resolve(msg: Messages, args: argparse.Namespace) -> int:
+    if not has_ipmitool():
+        print(msg.t("errors.ipmitool_missing"), file=sys.stderr)
+        return 2
+    sets = configured_sets()
+    if not sets:
+        print(msg.t("info.credentials.none"), file=sys.stderr)
+        return 2
+    try:
+        hosts = load_hosts(args.resolve)
+    except (OSError, ValueError) as exc:
+        print(msg.t("errors.hosts_file", details=exc), file=sys.stderr)
+        return 2
+    results = resolve_many(
+        hosts, sets, args.port, interface=args.interface, workers=args.workers, refresh=args.reprobe
+    )
+    failed = 0
+    for host in hosts:
+        r = results[host]
+        if r.credentials is None:
+            failed += 1
+            print(msg.t("errors.credentials.host_failed", host=host, details=r.error or msg.t("errors.unknown")),
+                  file=sys.stderr)
+        else:
+            print(f"{host:<24} {r.credentials.name:<16} {r.link.interface if r.link else '-'}")
+    attempts = sum(r.attempts for r in results.values())
+    print(msg.t("info.credentials.summary", hosts=len(hosts), failed=failed, attempts=attempts))
+    return 1 if failed else 0
+
+
+def add_redfish_tls_parser(sub: "argparse._SubParsersAction") -> None:
+    p = sub.add_parser("redfish-tls", help="Show or set how the Redfish certificate of a BMC is trusted")
+    p.add_argument("host", help="BMC address")
+    action = p.add_mutually_exclusive_group()
+    action.add_argument("--ca-file", help="Verify the certificate against this CA bundle")
+    action.add_argument("--fingerprint", help="Trust only the certificate with this SHA-256 fingerprint")
+    action.add_argument("--pin", action="store_true", help="Trust the certificate the BMC presents now")
+    action.add_argument("--insecure", action="store_true", help="Do not verify the certificate at all")
+    action.add_argument("--clear", action="store_true", help="Verify against the system CAs again (default)")
+    p.add_argument("-p", "--port", type=int, default=HTTPS_PORT, help="With --pin: HTTPS port of the BMC")
+
+
+def cmd_redfish_tls(msg: Messages, args: argparse.Namespace) -> int:
+    tls: Optional[Dict[str, object]] = None
+    if args.ca_file:
+        if not os.path.isfile(args.ca_file):
+            print(msg.t("errors.redfish_tls.ca_file", path=args.ca_file), file=sys.stderr)
+            return 2
+        tls = {"ca_file": os.path.abspath(args.ca_file)}
+    elif args.fingerprint:
+        tls = {"fingerprint": normalize_fingerprint(args.fingerprint)}
+    elif args.pin:
+        try:
+            tls = {"fingerprint": fetch_fingerprint(args.host, args.port, TIMEOUT_FAST)}
+        except OSError as exc:
+            print(msg.t("errors.redfish_tls.fetch", host=args.host, details=exc), file=sys.stderr)
+            return 1
+    elif args.insecure:
+        tls = {"verify": False}
+    elif args.clear:
+        tls = {}
+    if tls is not None:
+        update_host_profiles({args.host: {"redfish_tls": tls}})
+    current = tls_settings(args.host)
+    if current.get("fingerprint"):
+        print(msg.t("labels.redfish_tls.fingerprint", host=args.host, fingerprint=current["fingerprint"]))
+    elif current.get("ca_file"):
+        print(msg.t("labels.redfish_tls.ca_file", host=args.host, path=current["ca_file"]))
+    elif current.get("verify") is False:
+        print(msg.t("labels.redfish_tls.insecure", host=args.host))
+    else:
+        print(msg.t("labels.redfish_tls.system", host=args.host))
+    return 0
@@ -1,10 +1,18 @@
 from __future__ import annotations
 
 import base64
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, last writer wins
+    fcntl = None  # type: ignore[assignment]
 
 from .settings import DEFAULT_LOCALE
 
@@ -14,10 +22,6 @@ PREFERENCES_FILE = CONFIG_DIR / "preferences.json"
 CURRENT_VERSION = 1
 
 
-def _ensure_config_dir() -> None:
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-
-
 def _encode_password(password: str) -> str:
     return base64.b64encode(password.encode("utf-8")).decode("ascii")
 
@@ -48,57 +52,192 @@ def _migrate(prefs: Dict[str, Any]) -> Dict[str, Any]:
     return prefs
 
 
-def load_preferences() -> Dict[str, Any]:
-    if not PREFERENCES_FILE.exists():
-        return {}
+Op = Callable[[Dict[str, Any]], None]
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Exclusive advisory lock on `path` (created if needed)."""
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
     try:
-        with open(PREFERENCES_FILE, "r", encoding="utf-8") as f:
-            prefs = json.load(f)
-    except (json.JSONDecodeError, OSError):
-        return {}
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+
+class PreferencesStore:
+    """
+    preferences.json kept in memory.
+
+    Reads cost one stat(): the file is parsed again only when another
+    process replaced it. A write is an operation applied to the in-memory
+    copy, then replayed under an exclusive lock on a fresh read of the file
+    when someone else changed it meanwhile, so concurrent ipmi-menu
+    processes do not lose each other's updates. The result is written to a
+    temporary file and renamed over the old one. Inside `batch()`, writes
+    are flushed once at the end.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._data: Dict[str, Any] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._loaded = False
+        self._pending: List[Op] = []
+        self._depth = 0
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                prefs = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+        return prefs if isinstance(prefs, dict) else {}
+
+    def _refresh(self) -> None:
+        stamp = self._stat()
+        if self._loaded and stamp == self._stamp:
+            return
+        self._data, self._stamp, self._loaded = self._read(), stamp, True
+        for op in self._pending:  # changes of a batch not flushed yet
+            op(self._data)
+        if self._data and self._data.get("version", 0) < CURRENT_VERSION:
+            self.update(_migrate)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data.get(key, default))
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return copy.deepcopy(self._data)
+
+    def host(self, host: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            profile = self._data.get("hosts", {}).get(host)
+            return dict(profile) if profile is not None else None
+
+    def hosts(self, hosts: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Profiles of `hosts` (all saved ones by default); unknown hosts are left out."""
+        with self._lock:
+            self._refresh()
+            saved = self._data.get("hosts", {})
+            names = saved.keys() if hosts is None else hosts
+            return {h: dict(saved[h]) for h in names if h in saved}
+
+    def update(self, op: Op) -> None:
+        with self._lock:
+            self._refresh()
+            op(self._data)
+            self._pending.append(op)
+            if not self._depth:
+                self.flush()
+
+    def set(self, key: str, value: Any) -> None:
+        """Set `key`, or remove it if `value` is None."""
+
+        def op(d: Dict[str, Any]) -> None:
+            if value is None:
+                d.pop(key, None)
+            else:
+                d[key] = value
+
+        self.update(op)
+
+    @contextmanager
+    def batch(self) -> Iterator["PreferencesStore"]:
+        with self._lock:
+            self._depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if not self._depth:
+                    self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._pending:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with _locked(self.path.with_name(self.path.name + ".lock")):
+                data = self._data
+                if self._stat() != self._stamp:
+                    data = self._read()
+                    for op in self._pending:
+                        op(data)
+                tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+                self._data, self._stamp, self._loaded = data, self._stat(), True
+                self._pending = []
+
+
+_stores: Dict[Path, PreferencesStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store() -> PreferencesStore:
+    """Store of the current PREFERENCES_FILE, shared by the whole process."""
+    with _stores_lock:
+        store = _stores.get(PREFERENCES_FILE)
+        if store is None:
+            store = _stores[PREFERENCES_FILE] = PreferencesStore(PREFERENCES_FILE)
+        return store
 
-    if prefs.get("version", 0) < CURRENT_VERSION:
-        prefs = _migrate(prefs)
-        save_preferences(prefs)
 
-    return prefs
+def load_preferences() -> Dict[str, Any]:
+    return get_store().snapshot()
 
 
 def save_preferences(prefs: Dict[str, Any]) -> None:
-    _ensure_config_dir()
-    with open(PREFERENCES_FILE, "w", encoding="utf-8") as f:
-        json.dump(prefs, f, indent=2)
-    os.chmod(PREFERENCES_FILE, 0o600)
+    new = copy.deepcopy(prefs)
+
+    def op(d: Dict[str, Any]) -> None:
+        d.clear()
+        d.update(copy.deepcopy(new))
+
+    get_store().update(op)
 
 
 def get_preferred_language() -> str:
-    prefs = load_preferences()
-    return prefs.get("language", DEFAULT_LOCALE)
+    return get_store().get("language", DEFAULT_LOCALE)
 
 
 def set_preferred_language(lang: str) -> None:
-    prefs = load_preferences()
-    prefs["language"] = lang
-    save_preferences(prefs)
+    get_store().set("language", lang)
 
 
 def get_preferred_username() -> str | None:
-    prefs = load_preferences()
-    return prefs.get("username")
+    return get_store().get("username")
 
 
 def set_preferred_username(username: str | None) -> None:
-    prefs = load_preferences()
-    if username:
-        prefs["username"] = username
-    elif "username" in prefs:
-        del prefs["username"]
-    save_preferences(prefs)
+    get_store().set("username", username or None)
 
 
 def get_preferred_password() -> str | None:
-    prefs = load_preferences()
-    encoded = prefs.get("password")
+    encoded = get_store().get("password")
     if encoded is None:
         return None
     try:
@@ -108,9 +247,75 @@ def get_preferred_password() -> str | None:
 
 
 def set_preferred_password(password: str | None) -> None:
-    prefs = load_preferences()
-    if password is not None:
-        prefs["password"] = _encode_password(password)
-    elif "password" in prefs:
-        del prefs["password"]
-    save_preferences(prefs)
+    get_store().set("password", _encode_password(password) if password is not None else None)
+
+
+def get_credential_sets() -> List[Dict[str, Any]]:
+    """
+    Ordered credential sets tried on hosts that reject the default
+    credentials: [{"name", "user", "password" (decoded) or "password_env"}].
+    """
+    sets = []
+    for c in get_store().get("credential_sets") or []:
+        c = dict(c)
+        if c.get("password") is not None:
+            try:
+                c["password"] = _decode_password(c["password"])
+            except Exception:
+                pass
+        sets.append(c)
+    return sets
+
+
+def set_credential_sets(sets: Iterable[Mapping[str, Any]]) -> None:
+    encoded = []
+    for c in sets:
+        c = dict(c)
+        if c.get("password") is not None:
+            c["password"] = _encode_password(c["password"])
+        encoded.append(c)
+    get_store().set("credential_sets", encoded or None)
+
+
+def get_host_profile(host: str) -> Optional[Dict[str, Any]]:
+    """Per-host settings (interface, cipher suite, ...) saved by a probe or the user."""
+    return get_store().host(host)
+
+
+def get_host_profiles(hosts: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    return get_store().hosts(hosts)
+
+
+def set_host_profiles(profiles: Mapping[str, Optional[Dict[str, Any]]]) -> None:
+    """Save (or, with None, forget) several host profiles in one write."""
+    if not profiles:
+        return
+    new = {h: dict(p) if p is not None else None for h, p in profiles.items()}
+
+    def op(d: Dict[str, Any]) -> None:
+        hosts = d.setdefault("hosts", {})
+        for host, profile in new.items():
+            if profile is None:
+                hosts.pop(host, None)
+            else:
+                hosts[host] = dict(profile)
+
+    get_store().update(op)
+
+
+def set_host_profile(host: str, profile: Optional[Dict[str, Any]]) -> None:
+    set_host_profiles({host: profile})
+
+
+def update_host_profiles(fields: Mapping[str, Mapping[str, Any]]) -> None:
+    """Merge fields into several host profiles in one write, keeping their other fields."""
+    if not fields:
+        return
+    new = {h: dict(f) for h, f in fields.items()}
+
+    def op(d: Dict[str, Any]) -> None:
+        hosts = d.setdefault("hosts", {})
+        for host, changes in new.items():
+            hosts.setdefault(host, {}).update(changes)
+
+    get_store().update(op)
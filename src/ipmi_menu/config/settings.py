@@ -10,3 +10,12 @@ DEFAULT_LOCALE = "fr"
 TIMEOUT_FAST = 10
 TIMEOUT_NORMAL = 35
 TIMEOUT_SLOW = 60
+# A full `sel elist` on a large SEL can take minutes
+TIMEOUT_SEL = 300
+
+# Waiting for a host to come back after a power action
+POWER_WAIT_TIMEOUT = 300
+POWER_WAIT_SETTLE = 5
+# Seconds a power cycle is given to show its off phase before the wait stops
+# looking for it (a short cycle can fall between two polls)
+POWER_WAIT_OFF_WINDOW = 15
@@ -0,0 +1,262 @@
+"""Fleet-wide sensor anomaly detection over column arrays."""
+from __future__ import annotations
+
+import math
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install ipmi-menu[analysis]
+    np = None  # type: ignore[assignment]
+
+NAN = float("nan")
+
+# A reading is an outlier when any of these is reached.
+Z_THRESHOLD = 3.0
+PROXIMITY_THRESHOLD = 0.9
+RATE_THRESHOLD = {"temperature": 5.0, "fan": 3000.0, "voltage": 0.5, "power": 200.0}  # per minute
+
+
+@dataclass
+class SensorReading:
+    name: str
+    value: float
+    unit: str
+    status: str = ""
+    lower_critical: Optional[float] = None
+    upper_critical: Optional[float] = None
+
+
+def _num(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def sensor_type(unit: str) -> str:
+    u = unit.lower()
+    if "degrees" in u:
+        return "temperature"
+    if "rpm" in u:
+        return "fan"
+    if "volts" in u:
+        return "voltage"
+    if "watts" in u:
+        return "power"
+    if "amps" in u:
+        return "current"
+    return "other"
+
+
+def parse_sensor_list(text: str) -> List[SensorReading]:
+    """
+    Parse `ipmitool sensor` output (value and thresholds):
+    `CPU1 Temp | 45.000 | degrees C | ok | na | 0.000 | na | 85.000 | 90.000 | na`.
+    Discrete sensors and sensors without a reading are skipped.
+    """
+    out: List[SensorReading] = []
+    for ln in text.splitlines():
+        parts = [p.strip() for p in ln.split("|")]
+        if len(parts) < 4:
+            continue
+        value = _num(parts[1])
+        if value is None or parts[2] == "discrete":
+            continue
+        lcr = _num(parts[5]) if len(parts) > 5 else None
+        ucr = _num(parts[8]) if len(parts) > 8 else None
+        out.append(SensorReading(parts[0], value, parts[2], parts[3], lcr, ucr))
+    return out
+
+
+def parse_sdr_list(text: str) -> List[SensorReading]:
+    """Parse `sdr list` lines (`CPU1 Temp | 45 degrees C | ok`); no thresholds."""
+    out: List[SensorReading] = []
+    for ln in text.splitlines():
+        parts = [p.strip() for p in ln.split("|")]
+        if len(parts) < 3:
+            continue
+        value_unit = parts[1].split(None, 1)
+        value = _num(value_unit[0]) if value_unit else None
+        if value is None:
+            continue
+        out.append(SensorReading(parts[0], value, value_unit[1] if len(value_unit) > 1 else "", parts[2]))
+    return out
+
+
+@dataclass
+class SensorFrame:
+    """
+    Readings of many hosts as parallel columns, one row per (host, sensor).
+    Columns are typed arrays, which NumPy maps without copying.
+
+    `series` identifies (peer group, sensor name): the peers a reading is
+    compared with. `prev` holds the previous value of the same row (NaN if
+    unknown) for rate-of-change, and `prev_minutes` its age when it differs
+    from the frame's (NaN: the age given to find_outliers).
+    """
+
+    hosts: List[str] = field(default_factory=list)
+    series_keys: List[Tuple[str, str]] = field(default_factory=list)
+    units: List[str] = field(default_factory=list)
+    host_idx: "array[int]" = field(default_factory=lambda: array("q"))
+    series: "array[int]" = field(default_factory=lambda: array("q"))
+    value: "array[float]" = field(default_factory=lambda: array("d"))
+    lcr: "array[float]" = field(default_factory=lambda: array("d"))
+    ucr: "array[float]" = field(default_factory=lambda: array("d"))
+    prev: "array[float]" = field(default_factory=lambda: array("d"))
+    prev_minutes: "array[float]" = field(default_factory=lambda: array("d"))
+
+    @classmethod
+    def from_readings(
+        cls,
+        readings: Mapping[str, Sequence[SensorReading]],
+        group_of: Optional[Mapping[str, str]] = None,
+        previous: Optional[Mapping[str, Mapping[str, float]]] = None,
+        previous_minutes: Optional[Mapping[str, float]] = None,
+    ) -> "SensorFrame":
+        f = cls()
+        series_ids: Dict[Tuple[str, str], int] = {}
+        for host, rows in readings.items():
+            h = len(f.hosts)
+            f.hosts.append(host)
+            group = (group_of or {}).get(host, "-")
+            prev_host = (previous or {}).get(host, {})
+            age = (previous_minutes or {}).get(host, NAN)
+            for r in rows:
+                key = (group, r.name)
+                sid = series_ids.get(key)
+                if sid is None:
+                    sid = series_ids[key] = len(f.series_keys)
+                    f.series_keys.append(key)
+                    f.units.append(r.unit)
+                f.host_idx.append(h)
+                f.series.append(sid)
+                f.value.append(r.value)
+                f.lcr.append(NAN if r.lower_critical is None else r.lower_critical)
+                f.ucr.append(NAN if r.upper_critical is None else r.upper_critical)
+                f.prev.append(prev_host.get(r.name, NAN))
+                f.prev_minutes.append(age)
+        return f
+
+
+@dataclass
+class Outlier:
+    host: str
+    sensor: str
+    unit: str
+    value: float
+    zscore: float
+    proximity: float
+    rate: float
+    score: float
+
+
+def _scores_numpy(f: SensorFrame, minutes: float):
+    v = np.frombuffer(f.value, dtype=np.float64)
+    s = np.frombuffer(f.series, dtype=np.int64)
+    nseries = len(f.series_keys)
+
+    # Leave-one-out peer statistics: a reading is compared with its peers
+    # only, otherwise a single hot node inflates the std it is judged by.
+    n = np.bincount(s, minlength=nseries).astype(float)[s]
+    sums = np.bincount(s, weights=v, minlength=nseries)[s]
+    sq = np.bincount(s, weights=v * v, minlength=nseries)[s]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peers = n - 1
+        mean = (sums - v) / peers
+        var = np.maximum((sq - v * v) / peers - mean * mean, 0.0)
+        std = np.maximum(np.sqrt(var), np.maximum(0.01 * np.abs(mean), 1e-6))
+        z = np.where(peers >= 2, (v - mean) / std, 0.0)
+
+        ucr = np.frombuffer(f.ucr, dtype=np.float64)
+        lcr = np.frombuffer(f.lcr, dtype=np.float64)
+        span = np.where((lcr > 0) & (ucr > lcr), ucr - lcr, np.nan)
+        both = ~np.isnan(span)
+        up = np.where(both, (v - lcr) / span, np.where(ucr > 0, v / ucr, 0.0))
+        low = np.where(both, (ucr - v) / span, np.where((lcr > 0) & (v > 0), lcr / v, 0.0))
+        prox = np.maximum(up, low)
+
+        prev = np.frombuffer(f.prev, dtype=np.float64)
+        age = np.frombuffer(f.prev_minutes, dtype=np.float64)
+        age = np.where(np.isnan(age), minutes, np.maximum(age, 1e-9))
+        rate = np.where(np.isnan(prev), 0.0, (v - prev) / age)
+
+    rate_lim = np.asarray(
+        [RATE_THRESHOLD.get(sensor_type(f.units[i]), math.inf) for i in range(nseries)], dtype=float
+    )[s]
+    score = np.maximum.reduce([np.abs(z) / Z_THRESHOLD, prox / PROXIMITY_THRESHOLD, np.abs(rate) / rate_lim])
+    flagged = np.nonzero(score >= 1.0)[0]
+    order = flagged[np.argsort(-score[flagged], kind="stable")]
+    return order.tolist(), z, prox, rate, score
+
+
+def _proximity(v: float, lcr: float, ucr: float) -> float:
+    """Closeness to the nearest critical threshold: 1 on the threshold, 0.5 mid-range with both thresholds."""
+    if lcr > 0 and ucr > lcr:
+        # Position within the span, so a rail at nominal voltage is not "near" its threshold
+        return max((v - lcr) / (ucr - lcr), (ucr - v) / (ucr - lcr))
+    return max(v / ucr if ucr > 0 else 0.0, lcr / v if lcr > 0 and v > 0 else 0.0)
+
+
+def _scores_python(f: SensorFrame, minutes: float):
+    nseries = len(f.series_keys)
+    cnt = [0] * nseries
+    sums = [0.0] * nseries
+    sq = [0.0] * nseries
+    for sid, v in zip(f.series, f.value):
+        cnt[sid] += 1
+        sums[sid] += v
+        sq[sid] += v * v
+    rate_lim = [RATE_THRESHOLD.get(sensor_type(u), math.inf) for u in f.units]
+
+    zs: List[float] = []
+    proxs: List[float] = []
+    rates: List[float] = []
+    scores: List[float] = []
+    for sid, v, lcr, ucr, prev, age in zip(f.series, f.value, f.lcr, f.ucr, f.prev, f.prev_minutes):
+        peers = cnt[sid] - 1
+        z = 0.0
+        if peers >= 2:
+            mean = (sums[sid] - v) / peers
+            var = max((sq[sid] - v * v) / peers - mean * mean, 0.0)
+            z = (v - mean) / max(math.sqrt(var), 0.01 * abs(mean), 1e-6)
+        prox = _proximity(v, lcr, ucr)
+        rate = 0.0 if math.isnan(prev) else (v - prev) / (minutes if math.isnan(age) else max(age, 1e-9))
+        zs.append(z)
+        proxs.append(prox)
+        rates.append(rate)
+        scores.append(max(abs(z) / Z_THRESHOLD, prox / PROXIMITY_THRESHOLD, abs(rate) / rate_lim[sid]))
+    order = sorted((i for i, sc in enumerate(scores) if sc >= 1.0), key=lambda i: scores[i], reverse=True)
+    return order, zs, proxs, rates, scores
+
+
+def find_outliers(f: SensorFrame, *, minutes_since_previous: float = 1.0, top: Optional[int] = None) -> List[Outlier]:
+    """
+    Score every reading by peer z-score, threshold proximity (position
+    between the lower and upper critical thresholds, or value/upper critical
+    and lower critical/value when only one is set) and rate of change, each
+    divided by its threshold; readings scoring >= 1 are returned, worst first.
+    """
+    if not f.value:
+        return []
+    minutes = max(minutes_since_previous, 1e-9)
+    compute = _scores_numpy if np is not None else _scores_python
+    flagged, z, prox, rate, score = compute(f, minutes)
+    if top is not None:
+        flagged = flagged[:top]
+    return [
+        Outlier(
+            host=f.hosts[f.host_idx[i]],
+            sensor=f.series_keys[f.series[i]][1],
+            unit=f.units[f.series[i]],
+            value=f.value[i],
+            zscore=float(z[i]),
+            proximity=float(prox[i]),
+            rate=float(rate[i]),
+            score=float(score[i]),
+        )
+        for i in flagged
+    ]
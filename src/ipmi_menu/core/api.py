@@ -0,0 +1,394 @@
+"""
+Local HTTP API running BMC operations over many hosts per request.
+
+    POST /v1/power    {"hosts": [...], "action": "status"}
+    POST /v1/bootdev  {"hosts": [...], "device": "pxe", "uefi": true, "persistent": false}
+    POST /v1/sensors  {"hosts": [...]}
+    POST /v1/detect   {"hosts": [...]}
+    GET  /v1/health
+
+Every POST also accepts "user", "password", "interface", "port" and
+"timeout"; missing credentials are resolved as for the fleet sub-commands
+and, without "interface", each host's link is negotiated as its turn comes.
+The reply is NDJSON streamed as hosts complete: one {"host", "ok", "rc", "result", "error", "elapsed"}
+line per host, then {"done": true, "hosts": n, "failed": k}.
+
+The server listens on a Unix socket (owner only) or on a loopback TCP
+port, where requests must carry `Authorization: Bearer <token>`.
+"""
+from __future__ import annotations
+
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+from ipmi_menu.config.settings import DEFAULT_INTERFACE, DEFAULT_PORT, TIMEOUT_FAST, TIMEOUT_NORMAL, TIMEOUT_SLOW
+
+from .anomaly import parse_sensor_list
+from .detect import detect
+from .fleet import Target, default_credentials
+from .ipmi import bootdev, ipmi, parse_power_state, power
+from .negotiate import negotiate
+
+logger = logging.getLogger("ipmi_menu")
+
+API_SOCKET = CONFIG_DIR / "api.sock"
+API_TOKEN_FILE = CONFIG_DIR / "api.token"
+
+# Most BMCs handle very few sessions at once: requests to the same BMC
+# beyond this many wait for their turn, whatever the number of workers.
+PER_BMC_LIMIT = 2
+DEFAULT_WORKERS = 32
+MAX_HOSTS = 100_000
+# Largest request body read: MAX_HOSTS addresses with room to spare
+MAX_BODY = 8 * 1024 * 1024
+
+POWER_ACTIONS = ("status", "on", "off", "cycle", "reset", "soft")
+BOOT_DEVICES = ("pxe", "disk", "cdrom", "bios", "none")
+
+
+class ApiError(ValueError):
+    """A bad request, answered with HTTP 400."""
+
+
+@dataclass
+class HostResult:
+    host: str
+    ok: bool
+    rc: int
+    result: Any = None
+    error: str = ""
+    elapsed: float = 0.0
+
+
+class HostLimiter:
+    """One semaphore per BMC, created on first use."""
+
+    def __init__(self, per_host: int = PER_BMC_LIMIT) -> None:
+        self.per_host = max(1, per_host)
+        self._sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._sems.get(host)
+            if sem is None:
+                sem = self._sems[host] = threading.BoundedSemaphore(self.per_host)
+            return sem
+
+
+def _power(t: Target, req: Dict[str, Any], timeout: int) -> Tuple[int, Any, str]:
+    action = req.get("action", "status")
+    rc, out, err = power(t.host, t.user, t.password, t.interface, t.port, timeout, action)
+    if action == "status":
+        return rc, {"state": parse_power_state(out)}, err
+    return rc, {"output": out.strip()}, err
+
+
+def _bootdev(t: Target, req: Dict[str, Any], timeout: int) -> Tuple[int, Any, str]:
+    rc, out, err = bootdev(
+        t.host, t.user, t.password, t.interface, t.port, timeout, req["device"],
+        uefi=bool(req.get("uefi", True)), persistent=bool(req.get("persistent", False)),
+    )
+    return rc, {"output": out.strip()}, err
+
+
+def _sensors(t: Target, req: Dict[str, Any], timeout: int) -> Tuple[int, Any, str]:
+    rc, out, err = ipmi(t.host, t.user, t.password, t.interface, t.port, timeout, ["sensor"])
+    return rc, [asdict(r) for r in parse_sensor_list(out)] if rc == 0 else None, err
+
+
+def _detect(t: Target, req: Dict[str, Any], timeout: int) -> Tuple[int, Any, str]:
+    di = detect(t.host, t.user, t.password, t.interface, t.port, timeout)
+    if not (di.manufacturer or di.product or di.manufacturer_id):
+        return 1, None, "no answer to mc info / fru print"
+    return 0, {
+        "vendor": di.vendor,
+        "manufacturer": di.manufacturer,
+        "product": di.product,
+        "manufacturer_id": di.manufacturer_id,
+    }, ""
+
+
+def _check_power(req: Dict[str, Any]) -> None:
+    if req.get("action", "status") not in POWER_ACTIONS:
+        raise ApiError(f"action must be one of {', '.join(POWER_ACTIONS)}")
+
+
+def _check_bootdev(req: Dict[str, Any]) -> None:
+    if req.get("device") not in BOOT_DEVICES:
+        raise ApiError(f"device must be one of {', '.join(BOOT_DEVICES)}")
+
+
+# name -> (operation, request check, default timeout)
+OPERATIONS: Dict[str, Tuple[Callable[[Target, Dict[str, Any], int], Tuple[int, Any, str]],
+                            Optional[Callable[[Dict[str, Any]], None]], int]] = {
+    "power": (_power, _check_power, TIMEOUT_FAST),
+    "bootdev": (_bootdev, _check_bootdev, TIMEOUT_FAST),
+    "sensors": (_sensors, None, TIMEOUT_SLOW),
+    "detect": (_detect, None, TIMEOUT_NORMAL),
+}
+
+
+def targets_for(req: Dict[str, Any]) -> List[Target]:
+    """Targets of a request; their interface is "" when it is to be negotiated."""
+    hosts = req.get("hosts")
+    if not isinstance(hosts, list) or not hosts or not all(isinstance(h, str) and h for h in hosts):
+        raise ApiError("hosts must be a non-empty list of BMC addresses")
+    if len(hosts) > MAX_HOSTS:
+        raise ApiError(f"at most {MAX_HOSTS} hosts per request")
+    user, password = default_credentials(req.get("user"))
+    if "password" in req:
+        password = req["password"]
+    try:
+        port = int(req.get("port", DEFAULT_PORT))
+    except (TypeError, ValueError):
+        raise ApiError("port must be an integer")
+    interface = str(req.get("interface") or "")
+    return [Target(h, user, password, interface, port) for h in hosts]
+
+
+def with_link(t: Target) -> Target:
+    """`t` with its negotiated (cached or probed) interface if it has none."""
+    if t.interface:
+        return t
+    link = negotiate(t.host, t.user, t.password, t.port)
+    return replace(t, interface=link.interface if link is not None else DEFAULT_INTERFACE)
+
+
+def fan_out(
+    targets: Sequence[Target],
+    run: Callable[[Target], Tuple[int, Any, str]],
+    *,
+    workers: int = DEFAULT_WORKERS,
+    limiter: Optional[HostLimiter] = None,
+) -> Iterator[HostResult]:
+    """
+    Run `run` on every target concurrently and yield results as they
+    complete. Closing the iterator (e.g. the client went away) cancels the
+    targets not started yet.
+    """
+    limiter = limiter or HostLimiter()
+
+    def one(t: Target) -> HostResult:
+        with limiter(t.host):
+            started = time.monotonic()
+            try:
+                rc, result, err = run(t)
+            except Exception as exc:  # a bad host must not end the stream
+                logger.debug("API operation on %s failed: %s", t.host, exc)
+                rc, result, err = 1, None, str(exc)
+        return HostResult(t.host, rc == 0, rc, result, err.strip() if rc != 0 else "",
+                          round(time.monotonic() - started, 3))
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets))), thread_name_prefix="api")
+    try:
+        pending = {pool.submit(one, t) for t in targets}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_ApiServerMixin"
+
+    def address_string(self) -> str:  # Unix sockets have no peer address
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        logger.debug("API %s: %s", self.address_string(), fmt % args)
+
+    def _reply(self, status: int, doc: Dict[str, Any]) -> None:
+        body = json.dumps(doc).encode() + b"\n"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self) -> bool:
+        token = self.server.api.token
+        if token is None:
+            return True
+        given = self.headers.get("Authorization", "")
+        if hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+            return True
+        self.close_connection = True  # the body, if any, was not read
+        self._reply(401, {"error": "missing or bad token"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self._authorized():
+            return
+        if self.path == "/v1/health":
+            return self._reply(200, {"ok": True, "operations": sorted(OPERATIONS)})
+        self._reply(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if not self._authorized():
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            self.close_connection = True  # the body is not read
+            if length < 0:
+                return self._reply(400, {"error": "bad Content-Length"})
+            return self._reply(413, {"error": f"request body over {MAX_BODY} bytes"})
+        body = self.rfile.read(length)
+        name = self.path[len("/v1/"):] if self.path.startswith("/v1/") else ""
+        if name not in OPERATIONS:
+            return self._reply(404, {"error": "not found"})
+        try:
+            req = json.loads(body or b"{}")
+            if not isinstance(req, dict):
+                raise ApiError("the body must be a JSON object")
+            results = self.server.api.run(name, req)
+        except (ApiError, ValueError) as exc:
+            return self._reply(400, {"error": str(exc)})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        failed = total = 0
+        try:
+            for res in results:
+                total += 1
+                failed += not res.ok
+                self._chunk(asdict(res))
+            self._chunk({"done": True, "hosts": total, "failed": failed})
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            logger.debug("API client went away after %d results", total)
+            self.close_connection = True
+        finally:
+            results.close()
+
+    def _chunk(self, doc: Dict[str, Any]) -> None:
+        data = json.dumps(doc).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+class _ApiServerMixin:
+    api: "ApiServer"
+    daemon_threads = True
+
+
+class _TcpServer(_ApiServerMixin, ThreadingHTTPServer):
+    pass
+
+
+class _UnixServer(_ApiServerMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+class ApiServer:
+    def __init__(
+        self,
+        *,
+        socket_path: Union[str, Path, None] = None,
+        address: Optional[Tuple[str, int]] = None,
+        token: Optional[str] = None,
+        workers: int = DEFAULT_WORKERS,
+        per_bmc: int = PER_BMC_LIMIT,
+    ) -> None:
+        """Listen on `address` (TCP, token required) or else on `socket_path`."""
+        self.workers = workers
+        self.limiter = HostLimiter(per_bmc)
+        self.socket_path: Optional[Path] = None
+        self.token: Optional[str] = None
+        self._server: Union[_TcpServer, _UnixServer]
+        if address is not None:
+            self.token = token or load_token()
+            self._server = _TcpServer(address, _Handler)
+        else:
+            self.socket_path = Path(socket_path) if socket_path is not None else API_SOCKET
+            self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.socket_path.exists():
+                probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    probe.connect(str(self.socket_path))
+                    raise OSError(f"an API server is already listening on {self.socket_path}")
+                except ConnectionRefusedError:
+                    self.socket_path.unlink()  # left by a server that crashed
+                finally:
+                    probe.close()
+            old_umask = os.umask(0o177)
+            try:
+                self._server = _UnixServer(str(self.socket_path), _Handler)
+            finally:
+                os.umask(old_umask)
+        self._server.api = self
+
+    @property
+    def address(self) -> str:
+        if self.socket_path is not None:
+            return str(self.socket_path)
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def run(self, name: str, req: Dict[str, Any]) -> Iterator[HostResult]:
+        op, check, default_timeout = OPERATIONS[name]
+        if check is not None:
+            check(req)
+        try:
+            timeout = int(req.get("timeout", default_timeout))
+        except (TypeError, ValueError):
+            raise ApiError("timeout must be an integer")
+        targets = targets_for(req)
+        # Negotiation runs in fan_out's workers, under the per-BMC limit, so
+        # the stream starts at once instead of after probing every host.
+        return fan_out(targets, lambda t: op(with_link(t), req, timeout), workers=self.workers, limiter=self.limiter)
+
+    def serve_forever(self) -> None:
+        try:
+            self._server.serve_forever(poll_interval=0.2)
+        finally:
+            self._server.server_close()
+            if self.socket_path is not None:
+                try:
+                    self.socket_path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+
+def load_token(path: Union[str, Path, None] = None) -> str:
+    """$IPMI_MENU_API_TOKEN, else the saved token, created on first use."""
+    token = os.environ.get("IPMI_MENU_API_TOKEN")
+    if token:
+        return token
+    p = Path(path) if path is not None else API_TOKEN_FILE
+    try:
+        saved = p.read_text(encoding="utf-8").strip()
+        if saved:
+            return saved
+    except FileNotFoundError:
+        pass
+    p.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token + "\n")
+    return token
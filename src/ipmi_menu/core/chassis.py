@@ -0,0 +1,73 @@
+"""Chassis state from a single `chassis status` request."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from .ipmi import ipmi, parse_kv
+
+
+@dataclass
+class ChassisStatus:
+    power: str  # "on", "off" or "unknown"
+    last_power_event: str  # "command", "ac-failed", "overload", ... or "" if none
+    restore_policy: str
+    intrusion: bool
+    power_overload: bool
+    interlock: bool
+    main_power_fault: bool
+    power_control_fault: bool
+    drive_fault: bool
+    fan_fault: bool
+    front_panel_lockout: bool
+
+    @property
+    def faults(self) -> List[str]:
+        """Names of the active fault/alert flags, empty when healthy."""
+        flags = [
+            ("intrusion", self.intrusion),
+            ("power-overload", self.power_overload),
+            ("interlock", self.interlock),
+            ("main-power-fault", self.main_power_fault),
+            ("power-control-fault", self.power_control_fault),
+            ("drive-fault", self.drive_fault),
+            ("fan-fault", self.fan_fault),
+        ]
+        return [name for name, on in flags if on]
+
+
+def _flag(kv: dict, key: str) -> bool:
+    # "true"/"false" for faults, "active"/"inactive" for intrusion and interlock
+    return kv.get(key, "").lower() in ("true", "active")
+
+
+def parse_chassis_status(text: str) -> ChassisStatus:
+    """
+    Parse `chassis status`:
+    `System Power : on`, `Last Power Event : ac-failed`, `Chassis Intrusion : inactive`, ...
+    """
+    kv = parse_kv(text)
+    power = kv.get("system power", "").lower()
+    return ChassisStatus(
+        power=power if power in ("on", "off") else "unknown",
+        last_power_event=kv.get("last power event", ""),
+        restore_policy=kv.get("power restore policy", ""),
+        intrusion=_flag(kv, "chassis intrusion"),
+        power_overload=_flag(kv, "power overload"),
+        interlock=_flag(kv, "power interlock"),
+        main_power_fault=_flag(kv, "main power fault"),
+        power_control_fault=_flag(kv, "power control fault"),
+        drive_fault=_flag(kv, "drive fault"),
+        fan_fault=_flag(kv, "cooling/fan fault"),
+        front_panel_lockout=_flag(kv, "front-panel lockout"),
+    )
+
+
+def chassis_snapshot(
+    host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int
+) -> Tuple[int, Optional[ChassisStatus], str]:
+    """Return (rc, status, error); status is None when the BMC did not answer."""
+    rc, out, err = ipmi(host, user, password, interface, port, timeout, ["chassis", "status"])
+    if rc != 0 or not out:
+        return rc or 1, None, err or out
+    return rc, parse_chassis_status(out), ""
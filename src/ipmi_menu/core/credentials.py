@@ -0,0 +1,216 @@
+"""
+Credential resolution across hardware generations.
+
+Fleets often have several credential sets (factory defaults of each
+vendor, per-generation accounts). resolve_many() tries the configured sets
+in order on every host that has no remembered set yet, many hosts at once
+but with spaced attempts on any one BMC so a wrong set does not trigger
+its lockout. The set that worked is saved in the host profile and tried
+first next time, so later bulk jobs do a single handshake per host.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from ipmi_menu.config.preferences import (
+    get_credential_sets,
+    get_host_profile,
+    get_host_profiles,
+    update_host_profiles,
+)
+from ipmi_menu.config.settings import TIMEOUT_FAST
+
+from .ipmi import run_local, set_host_cipher
+from .negotiate import CANDIDATES, LinkProfile, is_auth_failure, use_link
+
+# Seconds between two attempts on one BMC, and failed attempts allowed per
+# BMC and run. Common lockout policies trigger at 3-5 failures per minute.
+ATTEMPT_INTERVAL = 2.0
+MAX_FAILURES = 3
+
+# Error fragments meaning the BMC did not answer at all: no other set can do better.
+_NO_ANSWER = ("no response", "timeout", "connection refused", "host is unreachable")
+
+
+@dataclass(frozen=True)
+class CredentialSet:
+    name: str
+    user: str
+    password: Optional[str]
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "CredentialSet":
+        """Set saved in the preferences; `password_env` wins over a saved password."""
+        env = d.get("password_env")
+        password = os.environ.get(env) if env else d.get("password")
+        return cls(str(d["name"]), str(d.get("user") or ""), password)
+
+
+@dataclass
+class Resolution:
+    host: str
+    credentials: Optional[CredentialSet]  # None: no set accepted
+    link: Optional[LinkProfile]
+    attempts: int = 0  # 0: remembered set used without a handshake
+    error: str = ""
+
+
+def configured_sets() -> List[CredentialSet]:
+    return [CredentialSet.from_dict(d) for d in get_credential_sets() if d.get("name")]
+
+
+def remembered_set(host: str, sets: Sequence[CredentialSet]) -> Optional[CredentialSet]:
+    """Set of `sets` that last worked on `host`, if any."""
+    name = (get_host_profile(host) or {}).get("credentials")
+    return next((c for c in sets if c.name == name), None)
+
+
+class AttemptLimiter:
+    """Spaces attempts on each host and caps its failures; hosts do not wait on each other."""
+
+    def __init__(self, interval: float = ATTEMPT_INTERVAL, max_failures: int = MAX_FAILURES) -> None:
+        self.interval = interval
+        self.max_failures = max_failures
+        self._next: Dict[str, float] = {}
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, host: str) -> bool:
+        """Wait for the next slot of `host`; False once it failed too often."""
+        with self._lock:
+            if self._failures.get(host, 0) >= self.max_failures:
+                return False
+            now = time.monotonic()
+            at = max(now, self._next.get(host, now))
+            self._next[host] = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+        return True
+
+    def failed(self, host: str) -> None:
+        with self._lock:
+            self._failures[host] = self._failures.get(host, 0) + 1
+
+
+def no_answer(err: str) -> bool:
+    t = (err or "").lower()
+    return any(n in t for n in _NO_ANSWER) and not is_auth_failure(t)
+
+
+def ordered(sets: Sequence[CredentialSet], remembered: Optional[str]) -> List[CredentialSet]:
+    """`sets` with the remembered one first."""
+    return sorted(sets, key=lambda c: c.name != remembered)
+
+
+def try_credentials(
+    host: str, cred: CredentialSet, port: int, link: LinkProfile, timeout: int = TIMEOUT_FAST
+) -> Tuple[bool, str]:
+    """One `mc info` handshake over `link`: (True, "") or (False, error)."""
+    use_link(host, link)
+    rc, out, err = run_local(
+        host, cred.user, cred.password, link.interface, port, timeout, ["mc", "info"], cipher=link.cipher
+    )
+    return (True, "") if rc == 0 and out else (False, err or out)
+
+
+def resolve(
+    host: str,
+    sets: Sequence[CredentialSet],
+    port: int,
+    *,
+    profile: Optional[Mapping[str, Any]] = None,
+    interface: Optional[str] = None,
+    limiter: Optional[AttemptLimiter] = None,
+    refresh: bool = False,
+    timeout: int = TIMEOUT_FAST,
+) -> Resolution:
+    """
+    Credential set and link of `host`. A remembered set with a cached link
+    is trusted as is unless `refresh`; otherwise sets are tried in order
+    (the remembered one first) until one answers, the limiter refuses, or
+    the BMC does not answer at all.
+
+    Handshakes run one at a time, each through the limiter. Without a known
+    link, the link candidates are tried in turn with the first set: the
+    first one refusing the credentials (rather than the protocol) proves
+    the transport and is kept for the other sets, so a wrong set costs one
+    failed login, not one per candidate.
+    """
+    profile = profile or {}
+    limiter = limiter or AttemptLimiter()
+    cached = LinkProfile.from_dict(profile, port) if profile else None
+    link = cached
+    if interface and (link is None or link.interface != interface):
+        link = LinkProfile(interface)
+    remembered = profile.get("credentials")
+    order = ordered(sets, remembered)
+    if not refresh and link is not None and order and order[0].name == remembered:
+        use_link(host, link)
+        return Resolution(host, order[0], link)
+
+    candidates = [link] if link is not None else list(CANDIDATES)
+    pinned = link is not None  # transport known: every failure counts against the credentials
+    attempts = 0
+    err = "no credential set configured"
+    result: Optional[Resolution] = None
+    for cred in order:
+        while candidates and result is None:
+            c = candidates[0]
+            if not limiter.acquire(host):
+                result = Resolution(host, None, None, attempts, "too many failed attempts")
+                break
+            attempts += 1
+            ok, err = try_credentials(host, cred, port, c, timeout)
+            if ok:
+                return Resolution(host, cred, c, attempts)
+            if no_answer(err):
+                result = Resolution(host, None, None, attempts, err)
+            elif pinned or is_auth_failure(err):
+                limiter.failed(host)
+                candidates, pinned = [c], True
+                break
+            else:
+                candidates.pop(0)  # interface/cipher suite not supported by this BMC
+        if result is not None or not candidates:
+            break
+    # Leave the cipher registry as the cache describes it, not as the last handshake set it
+    if cached is not None:
+        use_link(host, cached)
+    else:
+        set_host_cipher(host, None)
+    return result or Resolution(host, None, None, attempts, err)
+
+
+def resolve_many(
+    hosts: Sequence[str],
+    sets: Sequence[CredentialSet],
+    port: int,
+    *,
+    interface: Optional[str] = None,
+    workers: int = 8,
+    refresh: bool = False,
+    limiter: Optional[AttemptLimiter] = None,
+) -> Dict[str, Resolution]:
+    """
+    resolve() every host concurrently; the sets (and probed links) found
+    by a handshake are saved in a single preferences write.
+    """
+    profiles = get_host_profiles(hosts)
+    limiter = limiter or AttemptLimiter()
+
+    def one(h: str) -> Resolution:
+        return resolve(h, sets, port, profile=profiles.get(h), interface=interface, limiter=limiter, refresh=refresh)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = dict(zip(hosts, pool.map(one, hosts)))
+    update_host_profiles({
+        h: {"credentials": r.credentials.name, **(r.link.to_dict(port) if interface is None else {})}
+        for h, r in results.items()
+        if r.attempts and r.credentials is not None and r.link is not None
+    })
+    return results
@@ -0,0 +1,384 @@
+"""
+Optional local daemon keeping BMC responses and sessions warm between runs.
+
+`ipmi-menu daemon` listens on a Unix socket and runs every BMC call sent to
+it, answering from a per-command TTL cache when it can and refreshing the
+status of recently used hosts in the background. Redfish sessions stay open
+in the daemon process. The CLI attaches to it when the socket answers (see
+`attach()`) and otherwise runs ipmitool itself as before.
+
+The protocol is one JSON object per line in each direction.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+
+from .ipmi import host_cipher, run_local, set_runner
+from .profiling import profiler
+
+logger = logging.getLogger("ipmi_menu")
+
+DAEMON_SOCKET = CONFIG_DIR / "daemon.sock"
+
+# Seconds a successful response stays valid, by command prefix. Commands
+# not listed are never cached.
+CACHE_TTL: Sequence[Tuple[Tuple[str, ...], float]] = (
+    (("mc", "info"), 3600),
+    (("fru", "print"), 3600),
+    (("raw", "0x0a", "0x10", "0x00"), 600),  # FRU area info, read with the FRU by the inventory
+    (("lan", "print"), 600),
+    (("sdr",), 60),
+    (("sensor",), 30),
+    (("dcmi", "power", "reading"), 10),
+    (("chassis", "status"), 10),
+    (("chassis", "power", "status"), 10),
+)
+
+# Uncached commands that may change what the cached ones report: they drop
+# the host's cached responses. Other uncached reads (`sel info`, ...) keep them.
+INVALIDATING: Sequence[Tuple[str, ...]] = (
+    ("chassis", "power"),
+    ("chassis", "bootdev"),
+    ("chassis", "bootparam"),
+    ("chassis", "policy"),
+    ("mc", "reset"),
+    ("lan", "set"),
+    ("user", "set"),
+    ("user", "enable"),
+    ("user", "disable"),
+    ("user", "priv"),
+    ("channel", "setaccess"),
+    ("sol", "set"),
+    ("sel", "clear"),
+    ("fru", "write"),
+    ("fru", "edit"),
+    ("raw",),  # may write anything
+)
+
+# Commands refreshed in the background for hosts used within POLL_WINDOW.
+POLLED: Sequence[Tuple[str, ...]] = (("chassis", "status"), ("chassis", "power", "status"))
+POLL_INTERVAL = 5.0
+POLL_WINDOW = 15 * 60
+
+# Margin added to the BMC timeout while the client waits for the daemon.
+CLIENT_MARGIN = 5
+
+Key = Tuple[str, str, str, str, Optional[int], int, Tuple[str, ...]]
+
+
+def cache_ttl(args: Sequence[str]) -> Optional[float]:
+    for prefix, ttl in CACHE_TTL:
+        if tuple(args[: len(prefix)]) == prefix:
+            return ttl
+    return None
+
+
+def invalidates(args: Sequence[str]) -> bool:
+    return any(tuple(args[: len(prefix)]) == prefix for prefix in INVALIDATING)
+
+
+@dataclass
+class CacheEntry:
+    rc: int
+    out: str
+    err: str
+    expires: float
+    timeout: int
+
+
+class ResponseCache:
+    """Successful BMC responses by (host, user, password, interface, cipher, port, args)."""
+
+    def __init__(self) -> None:
+        self._entries: Dict[Key, CacheEntry] = {}
+        self._last_used: Dict[str, float] = {}
+        self._inflight: Dict[Key, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def call(
+        self,
+        host: str,
+        user: str,
+        password: Optional[str],
+        interface: str,
+        port: int,
+        timeout: int,
+        args: List[str],
+        *,
+        cipher: Optional[int] = None,
+        refresh: bool = False,
+    ) -> Tuple[int, str, str, bool]:
+        """(rc, out, err, served from cache) of `args` on `host`."""
+        ttl = cache_ttl(args)
+        if ttl is None:
+            if invalidates(args):
+                self.invalidate(host)
+            return run_local(host, user, password, interface, port, timeout, args, cipher=cipher) + (False,)
+
+        key: Key = (host, user, password or "", interface, cipher, port, tuple(args))
+        with self._lock:
+            self._last_used[host] = time.monotonic()
+            lock = self._inflight.setdefault(key, threading.Lock())
+        # Concurrent identical requests wait for the first one instead of
+        # hitting the BMC again.
+        with lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and not refresh and entry.expires > time.monotonic():
+                    self.hits += 1
+                    return entry.rc, entry.out, entry.err, True
+                self.misses += 1
+            rc, out, err = run_local(host, user, password, interface, port, timeout, args, cipher=cipher)
+            with self._lock:
+                if rc == 0:
+                    self._entries[key] = CacheEntry(rc, out, err, time.monotonic() + ttl, timeout)
+                else:
+                    self._entries.pop(key, None)
+            return rc, out, err, False
+
+    def invalidate(self, host: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == host]:
+                del self._entries[key]
+
+    def due_for_poll(self, window: float = POLL_WINDOW) -> List[Tuple[Key, int]]:
+        """Polled entries of hosts used within `window` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, e.timeout)
+                for key, e in self._entries.items()
+                if key[6] in POLLED and now - self._last_used.get(key[0], 0.0) < window
+            ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hosts": len({k[0] for k in self._entries}),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_Server"
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections.add(self.connection)
+
+    def finish(self) -> None:
+        with self.server.lock:
+            self.server.connections.discard(self.connection)
+        super().finish()
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                reply = self.server.daemon.dispatch(json.loads(line))
+            except Exception as exc:  # a bad request must not kill the connection
+                logger.debug("Daemon request failed: %s", exc)
+                reply = {"error": str(exc)}
+            self.wfile.write(json.dumps(reply).encode() + b"\n")
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    daemon: "Daemon"
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path, _Handler)
+        self.lock = threading.Lock()
+        self.connections: Set[socket.socket] = set()
+
+    def close_connections(self) -> None:
+        """Hang up on attached clients, which then run their calls locally."""
+        with self.lock:
+            for conn in self.connections:
+                try:
+                    conn.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+
+class Daemon:
+    def __init__(
+        self,
+        socket_path: Union[str, Path] = DAEMON_SOCKET,
+        poll_interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.socket_path = Path(socket_path)
+        self.poll_interval = poll_interval
+        self.cache = ResponseCache()
+        self.started = time.time()
+        self._stop = threading.Event()
+        self._server: Optional[_Server] = None
+
+    def dispatch(self, req: Dict[str, object]) -> Dict[str, object]:
+        op = req.get("op")
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid()}
+        if op == "ipmi":
+            rc, out, err, cached = self.cache.call(
+                str(req["host"]),
+                str(req["user"]),
+                req.get("password"),  # type: ignore[arg-type]
+                str(req["interface"]),
+                int(req["port"]),  # type: ignore[arg-type]
+                int(req["timeout"]),  # type: ignore[arg-type]
+                [str(a) for a in req["args"]],  # type: ignore[union-attr]
+                cipher=req.get("cipher"),  # type: ignore[arg-type]
+                refresh=bool(req.get("refresh")),
+            )
+            return {"rc": rc, "out": out, "err": err, "cached": cached}
+        if op == "stats":
+            return dict(self.cache.stats(), pid=os.getpid(), uptime=round(time.time() - self.started))
+        if op == "shutdown":
+            threading.Thread(target=self.stop, daemon=True).start()
+            return {"ok": True}
+        return {"error": f"unknown op {op!r}"}
+
+    def bind(self) -> None:
+        """Create the socket, replacing a stale one left by a crashed daemon."""
+        if self.socket_path.exists():
+            if connect(self.socket_path) is not None:
+                raise OSError(f"a daemon is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)  # the socket carries passwords: owner only
+        try:
+            self._server = _Server(str(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        self._server.daemon = self
+
+    def serve_forever(self) -> None:
+        if self._server is None:
+            self.bind()
+        assert self._server is not None
+        poller = threading.Thread(target=self._poll, name="daemon-poll", daemon=True)
+        poller.start()
+        try:
+            self._server.serve_forever(poll_interval=0.2)
+        finally:
+            self._stop.set()
+            self._server.server_close()
+            self._server.close_connections()
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            for (host, user, password, interface, cipher, port, args), timeout in self.cache.due_for_poll():
+                if self._stop.is_set():
+                    return
+                self.cache.call(
+                    host, user, password, interface, port, timeout, list(args), cipher=cipher, refresh=True
+                )
+
+
+class DaemonClient:
+    """Connection to a running daemon, one socket per thread."""
+
+    def __init__(self, socket_path: Union[str, Path] = DAEMON_SOCKET) -> None:
+        self.socket_path = Path(socket_path)
+        self._local = threading.local()
+
+    def request(self, req: Dict[str, object], timeout: Optional[float] = None) -> Dict[str, object]:
+        f = getattr(self._local, "file", None)
+        if f is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(str(self.socket_path))
+            f = self._local.file = sock.makefile("rwb")
+            self._local.sock = sock
+        self._local.sock.settimeout(timeout)
+        try:
+            f.write(json.dumps(req).encode() + b"\n")
+            f.flush()
+            line = f.readline()
+            if not line:
+                raise ConnectionError("daemon closed the connection")
+        except (OSError, ValueError):
+            self.close()
+            raise
+        reply = json.loads(line)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def run(
+        self,
+        host: str,
+        user: str,
+        password: Optional[str],
+        interface: str,
+        port: int,
+        timeout: int,
+        args: List[str],
+        *,
+        refresh: bool = False,
+    ) -> Tuple[int, str, str]:
+        """Runner for core.ipmi.set_runner; runs locally if the daemon went away."""
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            reply = self.request(
+                {"op": "ipmi", "host": host, "user": user, "password": password, "interface": interface,
+                 "cipher": host_cipher(host) if interface == "lanplus" else None, "port": port,
+                 "timeout": timeout, "args": list(args), "refresh": refresh},
+                timeout=timeout + CLIENT_MARGIN,
+            )
+        except (OSError, RuntimeError, ValueError) as exc:
+            logger.debug("Daemon call failed (%s), running locally", exc)
+            return run_local(host, user, password, interface, port, timeout, args)
+        rc, out, err = int(reply["rc"]), str(reply["out"]), str(reply["err"])  # type: ignore[call-overload]
+        profiler.record(host, " ".join(args), started, 0.0, time.perf_counter() - t0, rc, len(out), len(err))
+        return rc, out, err
+
+    def close(self) -> None:
+        f = getattr(self._local, "file", None)
+        if f is not None:
+            f.close()
+            self._local.sock.close()
+            self._local.file = None
+
+
+def connect(socket_path: Union[str, Path] = DAEMON_SOCKET, timeout: float = 1.0) -> Optional[DaemonClient]:
+    """Client of the daemon listening on `socket_path`, or None if none answers."""
+    client = DaemonClient(socket_path)
+    try:
+        client.request({"op": "ping"}, timeout=timeout)
+    except (OSError, RuntimeError, ValueError):
+        return None
+    return client
+
+
+def attach(socket_path: Union[str, Path] = DAEMON_SOCKET) -> Optional[DaemonClient]:
+    """Route every core.ipmi call through the daemon if one is running."""
+    client = connect(socket_path)
+    if client is not None:
+        set_runner(client.run)
+    return client
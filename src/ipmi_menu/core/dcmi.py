@@ -0,0 +1,246 @@
+"""DCMI power readings: fleet sampling and energy accounting."""
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+import time
+import warnings
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+from ipmi_menu.config.settings import TIMEOUT_FAST
+
+from .fleet import Target
+from .ipmi import ipmi
+from .scheduler import Scheduler
+
+try:
+    import numpy as np
+except ImportError:  # optional: pip install ipmi-menu[analysis]
+    np = None  # type: ignore[assignment]
+
+POWER_SUMMARY_FILE = CONFIG_DIR / "power" / "summaries.jsonl"
+
+_POWER_RE = re.compile(r"instantaneous power reading\s*:\s*(\d+(?:\.\d+)?)\s*watts", re.IGNORECASE)
+
+NAN = float("nan")
+
+
+def parse_dcmi_power(text: str) -> Optional[float]:
+    """Instantaneous watts from `dcmi power reading` output."""
+    m = _POWER_RE.search(text or "")
+    return float(m.group(1)) if m else None
+
+
+def dcmi_power_reading(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int) -> Tuple[int, str, str]:
+    return ipmi(host, user, password, interface, port, timeout, ["dcmi", "power", "reading"])
+
+
+@dataclass
+class PowerStats:
+    key: str
+    samples: int
+    mean_w: float
+    min_w: float
+    max_w: float
+    p50_w: float
+    p95_w: float
+    energy_wh: float
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Linear interpolation between closest ranks (numpy's default method)."""
+    if not ordered:
+        return NAN
+    pos = (len(ordered) - 1) * q
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def _row_stats(key: str, row: Sequence[float], duration_s: float) -> PowerStats:
+    vals = sorted(v for v in row if not math.isnan(v))
+    if not vals:
+        return PowerStats(key, 0, NAN, NAN, NAN, NAN, NAN, 0.0)
+    mean = sum(vals) / len(vals)
+    return PowerStats(
+        key, len(vals), mean, vals[0], vals[-1],
+        _percentile(vals, 0.5), _percentile(vals, 0.95), mean * duration_s / 3600.0,
+    )
+
+
+def summarize_matrix(keys: Sequence[str], matrix: Sequence[Sequence[float]], interval: float) -> List[PowerStats]:
+    """
+    Statistics of every row of a (series x ticks) matrix of watts, NaN for
+    missing samples. Energy is the mean power over the whole window, so a
+    missed sample does not count as zero watts.
+
+    All rows are computed in one batch with NumPy when it is installed.
+    """
+    if not keys:
+        return []
+    duration = len(matrix[0]) * interval
+    if np is None:
+        return [_row_stats(k, row, duration) for k, row in zip(keys, matrix)]
+
+    arr = np.asarray(matrix, dtype=float)
+    counts = np.sum(~np.isnan(arr), axis=1)
+    out: List[PowerStats] = []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # rows without any sample
+        mean = np.nanmean(arr, axis=1)
+        mn = np.nanmin(arr, axis=1)
+        mx = np.nanmax(arr, axis=1)
+        p50, p95 = np.nanpercentile(arr, [50, 95], axis=1)
+    for i, k in enumerate(keys):
+        n = int(counts[i])
+        energy = float(mean[i]) * duration / 3600.0 if n else 0.0
+        out.append(PowerStats(k, n, float(mean[i]), float(mn[i]), float(mx[i]), float(p50[i]), float(p95[i]), energy))
+    return out
+
+
+def rack_matrix(
+    hosts: Sequence[str], matrix: Sequence[Sequence[float]], rack_of: Mapping[str, str]
+) -> Tuple[List[str], List[List[float]]]:
+    """
+    Sum host rows tick by tick into one row per rack. A host's missing sample
+    is replaced by its window mean; a tick where no host of the rack answered
+    stays NaN.
+
+    All racks are summed in one matrix product with NumPy when it is installed.
+    """
+    racks: Dict[str, List[int]] = {}
+    for i, h in enumerate(hosts):
+        racks.setdefault(rack_of.get(h, "-"), []).append(i)
+    keys = sorted(racks)
+    if np is None or not hosts:
+        return keys, [_rack_row(racks[k], matrix) for k in keys]
+
+    arr = np.asarray(matrix, dtype=float)
+    answered = ~np.isnan(arr)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # hosts without any sample
+        means = np.nanmean(arr, axis=1)
+    # Hosts that never answered have a NaN mean and add nothing
+    filled = np.nan_to_num(np.where(answered, arr, means[:, None]), nan=0.0)
+    member = np.zeros((len(keys), len(hosts)))
+    for r, k in enumerate(keys):
+        member[r, racks[k]] = 1.0
+    sums = member @ filled
+    present = member @ answered.astype(float)
+    return keys, np.where(present > 0, sums, NAN).tolist()
+
+
+def _rack_row(idxs: Sequence[int], matrix: Sequence[Sequence[float]]) -> List[float]:
+    """rack_matrix() row of the hosts `idxs` without NumPy."""
+    means = []
+    for i in idxs:
+        vals = [v for v in matrix[i] if not math.isnan(v)]
+        means.append(sum(vals) / len(vals) if vals else NAN)
+    row = []
+    for t in range(len(matrix[0]) if matrix else 0):
+        present = [matrix[i][t] for i in idxs if not math.isnan(matrix[i][t])]
+        if not present:
+            row.append(NAN)
+            continue
+        missing = [m for i, m in zip(idxs, means) if math.isnan(matrix[i][t]) and not math.isnan(m)]
+        row.append(sum(present) + sum(missing))
+    return row
+
+
+class PowerSampler:
+    """
+    Sample `dcmi power reading` on many hosts at a fixed cadence.
+
+    Every tick is scheduled at start + k * interval on one shared scheduler,
+    so slow BMCs do not make the cadence drift. A host whose previous reading
+    is still in flight skips the tick (recorded as missing). Only the current
+    window of samples is kept in memory. Without a `scheduler`, the sampler
+    creates one on first use and keeps it for every window until close().
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[Target],
+        interval: float,
+        *,
+        timeout: int = TIMEOUT_FAST,
+        scheduler: Optional[Scheduler] = None,
+    ) -> None:
+        self.targets = list(targets)
+        self.interval = interval
+        self.timeout = timeout
+        self._scheduler = scheduler
+        self._own = scheduler is None
+        self._lock = threading.Lock()
+        self._busy = [False] * len(self.targets)
+
+    def _sample(self, i: int, row: List[float], tick: int) -> None:
+        t = self.targets[i]
+        with self._lock:
+            if self._busy[i]:
+                return
+            self._busy[i] = True
+        try:
+            rc, out, _ = dcmi_power_reading(t.host, t.user, t.password, t.interface, t.port, self.timeout)
+            watts = parse_dcmi_power(out) if rc == 0 else None
+            if watts is not None:
+                row[tick] = watts
+        finally:
+            with self._lock:
+                self._busy[i] = False
+
+    def sample_window(self, ticks: int) -> List[List[float]]:
+        """Take `ticks` samples per host; return the (hosts x ticks) matrix."""
+        if self._scheduler is None:
+            self._scheduler = Scheduler(max_workers=min(64, max(1, len(self.targets))))
+        sched = self._scheduler
+        matrix = [[NAN] * ticks for _ in self.targets]
+        start = time.monotonic()
+        for k in range(ticks):
+            for i in range(len(self.targets)):
+                sched.call_at(start + k * self.interval, lambda i=i, k=k: self._sample(i, matrix[i], k))
+        # Let the last tick's readings complete.
+        time.sleep(max(0.0, start + ticks * self.interval - time.monotonic()))
+        deadline = time.monotonic() + self.timeout
+        while any(self._busy) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return matrix
+
+    def close(self) -> None:
+        """Stop the scheduler the sampler created (a given one is left running)."""
+        if self._own and self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+    def __enter__(self) -> "PowerSampler":
+        return self
+
+    def __exit__(self, *exc: object) -> Optional[bool]:
+        self.close()
+        return None
+
+
+def write_summaries(
+    stats: Sequence[PowerStats],
+    *,
+    scope: str,
+    window_start: float,
+    window_s: float,
+    path: Union[str, Path, None] = None,
+) -> None:
+    """Append one JSON line per host/rack summary (NaN written as null)."""
+    p = Path(path) if path is not None else POWER_SUMMARY_FILE
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(p, "a", encoding="utf-8") as f:
+        for s in stats:
+            rec = {"scope": scope, "start": int(window_start), "window_s": window_s}
+            for k, v in asdict(s).items():
+                if isinstance(v, float):
+                    v = None if math.isnan(v) else round(v, 2)
+                rec[k] = v
+            f.write(json.dumps(rec) + "\n")
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 from .ipmi import ipmi, normalize_vendor, parse_kv
+from .vendors import GENERIC, VendorProfile, parse_manufacturer_id, profile_for
 
 
 @dataclass
@@ -11,26 +12,46 @@ class DetectInfo:
     vendor: str
     manufacturer: str
     product: str
+    manufacturer_id: Optional[int] = None
+    profile: VendorProfile = field(default=GENERIC)
+    mc_text: str = ""  # `mc info` output, "" if it failed
+    fru_text: str = ""  # `fru print` output, "" if it was not needed or failed
 
 
 def detect(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int) -> DetectInfo:
     manufacturer = ""
     product = ""
     raw = ""
+    manufacturer_id: Optional[int] = None
+    mc_text = fru_text = ""
 
     rc, out, _ = ipmi(host, user, password, interface, port, timeout, ["mc", "info"])
     if rc == 0 and out:
+        mc_text = out
         raw += "\n" + out
         kv = parse_kv(out)
-        manufacturer = kv.get("manufacturer", manufacturer)
+        manufacturer = kv.get("manufacturer name", "") or kv.get("manufacturer", manufacturer)
         product = kv.get("product name", product)
-
-    rc2, out2, _ = ipmi(host, user, password, interface, port, timeout, ["fru", "print"])
-    if rc2 == 0 and out2:
-        raw += "\n" + out2
-        kv2 = parse_kv(out2)
-        manufacturer = manufacturer or kv2.get("board mfg", "") or kv2.get("product manufacturer", "")
-        product = product or kv2.get("board product", "") or kv2.get("product name", "")
-
-    vendor = normalize_vendor(manufacturer, product, raw)
-    return DetectInfo(vendor=vendor, manufacturer=manufacturer, product=product)
+        manufacturer_id = parse_manufacturer_id(out)
+
+    profile = profile_for(manufacturer_id)
+    # The FRU dump is slow on many BMCs: only read it for what `mc info` lacked
+    if profile is GENERIC or not product:
+        rc2, out2, _ = ipmi(host, user, password, interface, port, profile.timeout("fru", timeout), ["fru", "print"])
+        if rc2 == 0 and out2:
+            fru_text = out2
+            raw += "\n" + out2
+            kv2 = parse_kv(out2)
+            manufacturer = manufacturer or kv2.get("board mfg", "") or kv2.get("product manufacturer", "")
+            product = product or kv2.get("board product", "") or kv2.get("product name", "")
+
+    vendor = profile.key if profile is not GENERIC else normalize_vendor(manufacturer, product, raw)
+    return DetectInfo(
+        vendor=vendor,
+        manufacturer=manufacturer,
+        product=product,
+        manufacturer_id=manufacturer_id,
+        profile=profile,
+        mc_text=mc_text,
+        fru_text=fru_text,
+    )
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from ipmi_menu.config.preferences import get_preferred_password, get_preferred_username
+from ipmi_menu.config.settings import DEFAULT_INTERFACE, DEFAULT_PASSWORD, DEFAULT_PORT, DEFAULT_USER
+
+from .hosts import CredentialGroup, HostEntry
+
+
+@dataclass(frozen=True)
+class Target:
+    """Connection parameters of one BMC, as passed to the core.ipmi helpers."""
+
+    host: str
+    user: str
+    password: Optional[str]
+    interface: str = DEFAULT_INTERFACE
+    port: int = DEFAULT_PORT
+    tags: Tuple[str, ...] = ()
+
+
+def default_credentials(user: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Credentials of non-interactive runs: `user`, else the saved username,
+    else the default; the password comes from $IPMI_PASSWORD (as with
+    `ipmitool -E`), then the saved preference, then the default.
+    """
+    user = user or get_preferred_username() or DEFAULT_USER
+    password: Optional[str] = os.environ.get("IPMI_PASSWORD")
+    if password is None:
+        saved = get_preferred_password()
+        password = saved if saved is not None else DEFAULT_PASSWORD
+    return user, password
+
+
+def entry_target(
+    entry: HostEntry,
+    group: Optional[CredentialGroup],
+    user: Optional[str] = None,
+    interface: Optional[str] = None,
+    port: int = DEFAULT_PORT,
+) -> Target:
+    """
+    Target of an inventory entry. The user, interface and port of the entry
+    win over its group's, which win over the command line (`user`,
+    `interface`, `port`); the password is the group's when its variable is
+    set, else the default_credentials one.
+    """
+    g = group or CredentialGroup("")
+    fallback_user, password = default_credentials(user)
+    if group is not None and group.password is not None:
+        password = group.password
+    return Target(
+        entry.address,
+        entry.user or g.user or fallback_user,
+        password,
+        entry.interface or g.interface or interface or DEFAULT_INTERFACE,
+        entry.port or g.port or port,
+        entry.tags,
+    )
@@ -0,0 +1,248 @@
+"""Host list and inventory loading, BMC address validation."""
+from __future__ import annotations
+
+import csv
+import ipaddress
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+_HOSTNAME_RE = re.compile(
+    r"^(?!-)[A-Za-z0-9-]{1,63}(?<!-)(\.[A-Za-z0-9-]{1,63})*$"
+)
+
+
+def is_valid_bmc_address(addr: str) -> bool:
+    """Validate BMC address as IPv4, IPv6, or hostname."""
+    try:
+        ipaddress.ip_address(addr)
+        return True
+    except ValueError:
+        pass
+    return bool(_HOSTNAME_RE.match(addr))
+
+
+def parse_hosts(lines: Iterable[str]) -> List[str]:
+    """
+    Parse one host per line, ignoring blank lines and `#` comments.
+
+    Duplicates are dropped (first occurrence wins); invalid addresses raise
+    ValueError with the offending line number.
+    """
+    hosts: List[str] = []
+    seen = set()
+    for lineno, ln in enumerate(lines, start=1):
+        addr = ln.split("#", 1)[0].strip()
+        if not addr:
+            continue
+        if not is_valid_bmc_address(addr):
+            raise ValueError(f"line {lineno}: invalid BMC address {addr!r}")
+        if addr in seen:
+            continue
+        seen.add(addr)
+        hosts.append(addr)
+    return hosts
+
+
+def load_hosts(path: Union[str, Path]) -> List[str]:
+    """Addresses of a host list or inventory file (see load_inventory)."""
+    return [e.address for e in load_inventory(path).hosts]
+
+
+# CSV header names accepted for the address column
+_ADDRESS_COLUMNS = ("host", "address", "bmc")
+_KNOWN_COLUMNS = {"group", "tags", "user", "interface", "port"}
+
+
+@dataclass(frozen=True)
+class HostEntry:
+    """One inventory line. Unset fields fall back to the group, then the command line."""
+
+    address: str
+    group: str = ""  # credential group
+    tags: Tuple[str, ...] = ()  # free labels, "key=value" ones can be looked up with tag_value
+    user: Optional[str] = None
+    interface: Optional[str] = None
+    port: Optional[int] = None
+
+
+@dataclass
+class CredentialGroup:
+    """
+    Credentials shared by a set of hosts. Passwords are never read from the
+    inventory: they come from the `password_env` variable, by default
+    $IPMI_PASSWORD_<GROUP> (upper-cased, other characters as `_`).
+    """
+
+    name: str
+    user: Optional[str] = None
+    password_env: str = ""
+    interface: Optional[str] = None
+    port: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if not self.password_env:
+            self.password_env = "IPMI_PASSWORD_" + re.sub(r"[^A-Za-z0-9]", "_", self.name).upper()
+
+    @property
+    def password(self) -> Optional[str]:
+        return os.environ.get(self.password_env)
+
+
+@dataclass
+class Inventory:
+    hosts: List[HostEntry] = field(default_factory=list)
+    groups: Dict[str, CredentialGroup] = field(default_factory=dict)
+
+    def group(self, name: str) -> Optional[CredentialGroup]:
+        """Credential group `name`; groups only named by hosts get the defaults."""
+        if not name:
+            return None
+        if name not in self.groups:
+            self.groups[name] = CredentialGroup(name)
+        return self.groups[name]
+
+    def select(self, tags: Sequence[str]) -> List[HostEntry]:
+        """Hosts carrying every tag of `tags` (all hosts when empty)."""
+        wanted = set(tags)
+        return [e for e in self.hosts if wanted.issubset(e.tags)]
+
+
+def tag_value(tags: Iterable[str], key: str, default: str = "-") -> str:
+    """Value of the `key=value` tag, e.g. tag_value(entry.tags, "rack")."""
+    prefix = key + "="
+    for t in tags:
+        if t.startswith(prefix):
+            return t[len(prefix):]
+    return default
+
+
+def _split_tags(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        value = re.split(r"[;,\s]+", value)
+    return tuple(t for t in (str(v).strip() for v in value or ()) if t)
+
+
+def _port(value: Any, where: str) -> Optional[int]:
+    if value in (None, ""):
+        return None
+    try:
+        port = int(value)
+    except (TypeError, ValueError):
+        port = 0
+    if not 0 < port < 65536:
+        raise ValueError(f"{where}: invalid port {value!r}")
+    return port
+
+
+class _Dedup:
+    """Drops repeated addresses (first one wins) and validates each address once."""
+
+    def __init__(self) -> None:
+        self.seen: set = set()
+        self.hosts: List[HostEntry] = []
+
+    def add(self, entry: HostEntry, where: str) -> None:
+        if entry.address in self.seen:
+            return
+        if not is_valid_bmc_address(entry.address):
+            raise ValueError(f"{where}: invalid BMC address {entry.address!r}")
+        self.seen.add(entry.address)
+        self.hosts.append(entry)
+
+
+def parse_inventory_csv(lines: Iterable[str]) -> Inventory:
+    """
+    CSV inventory with a header line. The address column is `host`,
+    `address` or `bmc`; optional columns are group, tags (separated by
+    `;`, `,` or spaces), user, interface and port. Any other non-empty
+    column becomes a `column=value` tag (e.g. rack, model).
+    """
+    reader = csv.reader(lines)
+    header = [h.strip().lower() for h in next(reader, [])]
+    addr_col = next((header.index(c) for c in _ADDRESS_COLUMNS if c in header), None)
+    if addr_col is None:
+        raise ValueError("line 1: no host/address/bmc column")
+    col = {name: i for i, name in enumerate(header)}
+    extra = [(name, i) for name, i in col.items() if name not in _KNOWN_COLUMNS and i != addr_col and name]
+    out = _Dedup()
+    for lineno, row in enumerate(reader, start=2):
+        if not row or len(row) <= addr_col or not row[addr_col].strip() or row[0].lstrip().startswith("#"):
+            continue
+
+        def get(name: str) -> str:
+            i = col.get(name)
+            return row[i].strip() if i is not None and i < len(row) else ""
+
+        tags = _split_tags(get("tags")) + tuple(
+            f"{name}={row[i].strip()}" for name, i in extra if i < len(row) and row[i].strip()
+        )
+        entry = HostEntry(
+            row[addr_col].strip(),
+            get("group"),
+            tags,
+            get("user") or None,
+            get("interface") or None,
+            _port(get("port"), f"line {lineno}"),
+        )
+        out.add(entry, f"line {lineno}")
+    return Inventory(out.hosts)
+
+
+def parse_inventory_json(data: Any) -> Inventory:
+    """
+    JSON inventory: a list of addresses or host objects, or an object with
+    `hosts` (same list) and `groups` ({name: {user, password_env,
+    interface, port}}). Host objects take the CSV column names; their
+    `tags` is a list or a string.
+    """
+    if isinstance(data, list):
+        data = {"hosts": data}
+    if not isinstance(data, dict) or not isinstance(data.get("hosts", []), list):
+        raise ValueError("expected a list of hosts or an object with a `hosts` list")
+    groups: Dict[str, CredentialGroup] = {}
+    for name, g in (data.get("groups") or {}).items():
+        if not isinstance(g, dict):
+            raise ValueError(f"group {name!r}: expected an object")
+        groups[name] = CredentialGroup(
+            name, g.get("user"), g.get("password_env", ""), g.get("interface"), _port(g.get("port"), f"group {name!r}")
+        )
+    out = _Dedup()
+    for n, item in enumerate(data.get("hosts", []), start=1):
+        where = f"host #{n}"
+        if isinstance(item, str):
+            entry = HostEntry(item.strip())
+        elif isinstance(item, dict):
+            addr = next((item[c] for c in _ADDRESS_COLUMNS if c in item), "")
+            entry = HostEntry(
+                str(addr).strip(),
+                str(item.get("group") or ""),
+                _split_tags(item.get("tags")),
+                item.get("user"),
+                item.get("interface"),
+                _port(item.get("port"), where),
+            )
+        else:
+            raise ValueError(f"{where}: expected an address or an object")
+        out.add(entry, where)
+    return Inventory(out.hosts, groups)
+
+
+def load_inventory(path: Union[str, Path]) -> Inventory:
+    """
+    Load hosts from a `.csv` or `.json` inventory, or a plain list with one
+    address per line (see parse_hosts).
+    """
+    suffix = Path(path).suffix.lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if suffix == ".json":
+            try:
+                return parse_inventory_json(json.load(f))
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"line {exc.lineno}: {exc.msg}") from None
+        if suffix == ".csv":
+            return parse_inventory_csv(f)
+        return Inventory([HostEntry(h) for h in parse_hosts(f)])
@@ -0,0 +1,325 @@
+"""Hardware inventory (MC and FRU data) of many hosts, refreshed incrementally."""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+
+from .ipmi import ipmi, normalize_vendor, parse_kv
+from .vendors import GENERIC, parse_manufacturer_id, profile_for
+
+INVENTORY_DB = CONFIG_DIR / "inventory.db"
+
+# FRU data is read again after this long even if the fingerprint did not
+# change, for boards swapped with identical firmware.
+FRU_MAX_AGE = 7 * 86400
+
+# Get FRU Inventory Area Info (Storage NetFn) of FRU device 0: its size
+# changes with any FRU rewrite and costs one small request.
+FRU_AREA_INFO = ["raw", "0x0a", "0x10", "0x00"]
+
+# `mc info` fields identifying the controller and its firmware.
+_FINGERPRINT_FIELDS = (
+    "device id",
+    "device revision",
+    "firmware revision",
+    "ipmi version",
+    "manufacturer id",
+    "product id",
+)
+
+@dataclass
+class InventoryRecord:
+    host: str
+    vendor: str
+    manufacturer: str
+    manufacturer_id: Optional[int]
+    product: str
+    firmware: str
+    product_serial: str
+    board_serial: str
+    chassis_serial: str
+    fingerprint: str
+    fru_hash: str
+    updated_at: float
+
+    @property
+    def serial(self) -> str:
+        return self.product_serial or self.board_serial or self.chassis_serial
+
+
+@dataclass
+class InventorySyncResult:
+    ok: bool
+    fetched: bool  # FRU data was read (fingerprint changed, unknown or too old)
+    changed: bool  # stored data differs from the previous sync
+    error: str = ""
+
+
+def fingerprint(mc_text: str, fru_area_info: str = "") -> str:
+    """Cheap identity of a BMC: firmware/device fields of `mc info` plus the FRU area size."""
+    kv = parse_kv(mc_text)
+    parts = [kv.get(f, "") for f in _FINGERPRINT_FIELDS]
+    parts.append(" ".join(fru_area_info.split()))
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+
+def parse_fru_devices(text: str) -> Dict[str, Dict[str, str]]:
+    """`fru print` output split per FRU device, e.g. {"Builtin FRU Device (ID 0)": {...}}."""
+    devices: Dict[str, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+    for ln in text.splitlines():
+        if ":" not in ln:
+            continue
+        k, v = ln.split(":", 1)
+        key = k.strip().lower()
+        if key == "fru device description":
+            current = devices.setdefault(v.strip(), {})
+        elif current is not None:
+            current.setdefault(key, v.strip())
+        else:
+            current = devices.setdefault("", {key: v.strip()})
+    return devices
+
+
+def parse_inventory(host: str, mc_text: str, fru_text: str) -> InventoryRecord:
+    """Record of `host`; serial numbers come from its main FRU device (the first one)."""
+    mc = parse_kv(mc_text)
+    devices = parse_fru_devices(fru_text)
+    fru = next(iter(devices.values()), {})
+    manufacturer_id = parse_manufacturer_id(mc_text)
+    profile = profile_for(manufacturer_id)
+    manufacturer = (
+        mc.get("manufacturer name", "") or mc.get("manufacturer", "")
+        or fru.get("board mfg", "") or fru.get("product manufacturer", "")
+    )
+    product = mc.get("product name", "") or fru.get("board product", "") or fru.get("product name", "")
+    vendor = profile.key if profile is not GENERIC else normalize_vendor(manufacturer, product, mc_text + fru_text)
+    return InventoryRecord(
+        host=host,
+        vendor=vendor,
+        manufacturer=manufacturer,
+        manufacturer_id=manufacturer_id,
+        product=product,
+        firmware=mc.get("firmware revision", ""),
+        product_serial=fru.get("product serial", ""),
+        board_serial=fru.get("board serial", ""),
+        chassis_serial=fru.get("chassis serial", ""),
+        fingerprint="",
+        fru_hash=hashlib.sha256(fru_text.strip().encode()).hexdigest()[:32] if fru_text.strip() else "",
+        updated_at=time.time(),
+    )
+
+
+class InventoryStore:
+    """
+    SQLite inventory of many hosts.
+
+    One row per host with the fields people search on, each indexed
+    (case-insensitive, so that `LIKE 'poweredge%'` uses the index), and the
+    full FRU data of every device as (host, device, field, value) rows.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None) -> None:
+        self.path = Path(path) if path is not None else INVENTORY_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT PRIMARY KEY,
+                vendor TEXT NOT NULL COLLATE NOCASE,
+                manufacturer TEXT NOT NULL,
+                manufacturer_id INTEGER,
+                product TEXT NOT NULL COLLATE NOCASE,
+                firmware TEXT NOT NULL COLLATE NOCASE,
+                product_serial TEXT NOT NULL COLLATE NOCASE,
+                board_serial TEXT NOT NULL COLLATE NOCASE,
+                chassis_serial TEXT NOT NULL COLLATE NOCASE,
+                fingerprint TEXT NOT NULL,
+                fru_hash TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                checked_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS hosts_by_vendor ON hosts (vendor, product);
+            CREATE INDEX IF NOT EXISTS hosts_by_product ON hosts (product);
+            CREATE INDEX IF NOT EXISTS hosts_by_firmware ON hosts (firmware);
+            CREATE INDEX IF NOT EXISTS hosts_by_product_serial ON hosts (product_serial);
+            CREATE INDEX IF NOT EXISTS hosts_by_board_serial ON hosts (board_serial);
+            CREATE INDEX IF NOT EXISTS hosts_by_chassis_serial ON hosts (chassis_serial);
+            CREATE TABLE IF NOT EXISTS fru (
+                host TEXT NOT NULL,
+                device TEXT NOT NULL,
+                field TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (host, device, field)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS fru_by_value ON fru (field, value);
+            """
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def state(self, host: str) -> Optional[Tuple[str, str, float]]:
+        """(fingerprint, FRU hash, time of the last FRU read) of `host`."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT fingerprint, fru_hash, updated_at FROM hosts WHERE host = ?", (host,)
+            ).fetchone()
+
+    def touch(self, host: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("UPDATE hosts SET checked_at = ? WHERE host = ?", (time.time(), host))
+
+    def store(self, record: InventoryRecord, fru_text: str) -> None:
+        rows = [
+            (record.host, device, field, value)
+            for device, fields in parse_fru_devices(fru_text).items()
+            for field, value in fields.items()
+        ]
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    record.host, record.vendor, record.manufacturer, record.manufacturer_id, record.product,
+                    record.firmware, record.product_serial, record.board_serial, record.chassis_serial,
+                    record.fingerprint, record.fru_hash, record.updated_at, time.time(),
+                ),
+            )
+            self._db.execute("DELETE FROM fru WHERE host = ?", (record.host,))
+            self._db.executemany("INSERT OR REPLACE INTO fru VALUES (?, ?, ?, ?)", rows)
+
+    def get(self, host: str) -> Optional[InventoryRecord]:
+        found = self.search(host=host)
+        return found[0] if found else None
+
+    def fru(self, host: str) -> Dict[str, Dict[str, str]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT device, field, value FROM fru WHERE host = ? ORDER BY device, field", (host,)
+            ).fetchall()
+        devices: Dict[str, Dict[str, str]] = {}
+        for device, field, value in rows:
+            devices.setdefault(device, {})[field] = value
+        return devices
+
+    def search(
+        self,
+        *,
+        host: Optional[str] = None,
+        vendor: Optional[str] = None,
+        product: Optional[str] = None,
+        serial: Optional[str] = None,
+        firmware: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[InventoryRecord]:
+        """
+        Hosts matching every given filter, by host name. Filters are
+        case-insensitive and accept `*` wildcards; `serial` matches the
+        product, board or chassis serial number.
+        """
+        sql = (
+            "SELECT host, vendor, manufacturer, manufacturer_id, product, firmware, product_serial, board_serial,"
+            " chassis_serial, fingerprint, fru_hash, updated_at FROM hosts WHERE 1"
+        )
+        params: List[object] = []
+        if host is not None:
+            sql += " AND host = ?"
+            params.append(host)
+        for column, value in (("vendor", vendor), ("product", product), ("firmware", firmware)):
+            if value is not None:
+                sql += f" AND {column} LIKE ? ESCAPE '\\'"
+                params.append(_like(value))
+        if serial is not None:
+            sql += (
+                " AND (product_serial LIKE ? ESCAPE '\\' OR board_serial LIKE ? ESCAPE '\\'"
+                " OR chassis_serial LIKE ? ESCAPE '\\')"
+            )
+            params += [_like(serial)] * 3
+        sql += " ORDER BY host"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [InventoryRecord(*row) for row in rows]
+
+    def find_by_field(self, field: str, value: str) -> List[str]:
+        """Hosts having any FRU device whose `field` (e.g. "board part number") equals `value`."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT host FROM fru WHERE field = ? AND value = ? ORDER BY host", (field.lower(), value)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+
+def _like(pattern: str) -> str:
+    escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%")
+
+
+def record_inventory(
+    store: InventoryStore, host: str, mc_text: str, fru_text: str, fru_area_info: str = ""
+) -> InventoryRecord:
+    """
+    Store data read elsewhere (e.g. by the Info menu or detect()). With the
+    FRU area info (FRU_AREA_INFO output) the fingerprint matches the one of
+    sync_inventory(), so the next sync skips `fru print` if nothing changed.
+    """
+    record = parse_inventory(host, mc_text, fru_text)
+    record.fingerprint = fingerprint(mc_text, fru_area_info)
+    store.store(record, fru_text)
+    return record
+
+
+def sync_inventory(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    store: InventoryStore,
+    *,
+    force: bool = False,
+    max_age: float = FRU_MAX_AGE,
+) -> InventorySyncResult:
+    """
+    Bring the inventory of `host` up to date.
+
+    `mc info` and the FRU area size are compared with the fingerprint of
+    the last sync: unchanged (and read less than `max_age` ago) means the
+    slow `fru print` is skipped.
+    """
+    rc, mc_text, err = ipmi(host, user, password, interface, port, timeout, ["mc", "info"])
+    if rc != 0 or not mc_text:
+        return InventorySyncResult(False, False, False, err or mc_text)
+    rc, area, _ = ipmi(host, user, password, interface, port, timeout, FRU_AREA_INFO)
+    fp = fingerprint(mc_text, area if rc == 0 else "")
+
+    prev = store.state(host)
+    if prev is not None and not force:
+        old_fp, _, updated_at = prev
+        if old_fp == fp and time.time() - updated_at < max_age:
+            store.touch(host)
+            return InventorySyncResult(True, False, False)
+
+    profile = profile_for(parse_manufacturer_id(mc_text))
+    rc, fru_text, err = ipmi(host, user, password, interface, port, profile.timeout("fru", timeout), ["fru", "print"])
+    if rc != 0 and not fru_text:
+        return InventorySyncResult(False, True, False, err)
+    record = parse_inventory(host, mc_text, fru_text)
+    record.fingerprint = fp
+    old = store.get(host)
+    changed = old is None or (old.fru_hash, old.firmware) != (record.fru_hash, record.firmware)
+    store.store(record, fru_text)
+    return InventorySyncResult(True, True, changed)
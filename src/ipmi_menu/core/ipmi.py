@@ -3,9 +3,12 @@ from __future__ import annotations
 import re
 import subprocess
 from shutil import which
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
-from .utils import run_cmd
+from . import redfish
+from .profiling import profiler
+from .redfish import REDFISH_INTERFACE
+from .utils import run_cmd, run_cmd_stream
 
 
 def has_ipmitool() -> bool:
@@ -21,6 +24,12 @@ def parse_kv(text: str) -> Dict[str, str]:
     return out
 
 
+def parse_power_state(text: str) -> str:
+    """Extract "on"/"off" from `chassis power status` output."""
+    m = re.search(r"power is (on|off)", (text or "").lower())
+    return m.group(1) if m else "unknown"
+
+
 def normalize_vendor(manufacturer: str, product: str, raw: str) -> str:
     blob = f"{manufacturer} {product} {raw}".lower()
     rules = [
@@ -37,15 +46,105 @@ def normalize_vendor(manufacturer: str, product: str, raw: str) -> str:
     return (manufacturer or "unknown").strip().lower() or "unknown"
 
 
-def ipmi_base(host: str, user: str, password: Optional[str], interface: str, port: int) -> List[str]:
+# Cipher suite negotiated for each host (see core.negotiate), used whenever
+# the host is reached over lanplus.
+_host_ciphers: Dict[str, int] = {}
+
+
+def set_host_cipher(host: str, cipher: Optional[int]) -> None:
+    if cipher is None:
+        _host_ciphers.pop(host, None)
+    else:
+        _host_ciphers[host] = cipher
+
+
+def host_cipher(host: str) -> Optional[int]:
+    return _host_ciphers.get(host)
+
+
+def ipmi_base(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    *,
+    cipher: Optional[int] = None,
+) -> List[str]:
     cmd = ["ipmitool", "-I", interface, "-H", host, "-p", str(port), "-U", user]
+    if cipher is None and interface == "lanplus":
+        cipher = _host_ciphers.get(host)
+    if cipher is not None:
+        cmd += ["-C", str(cipher)]
     if password is not None:
         cmd += ["-P", password]
     return cmd
 
 
-def ipmi(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int, args: List[str]) -> Tuple[int, str, str]:
-    return run_cmd(ipmi_base(host, user, password, interface, port) + args, timeout)
+# runner(host, user, password, interface, port, timeout, args, refresh=False)
+Runner = Callable[..., Tuple[int, str, str]]
+
+# When set (e.g. by the daemon client), every ipmi() call is delegated to it.
+_runner: Optional[Runner] = None
+
+
+def set_runner(runner: Optional[Runner]) -> None:
+    global _runner
+    _runner = runner
+
+
+def run_local(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    args: List[str],
+    *,
+    cipher: Optional[int] = None,
+) -> Tuple[int, str, str]:
+    """Run `args` against the BMC from this process, ignoring any runner."""
+    if interface == REDFISH_INTERFACE:
+        return redfish.run(host, user, password, port, timeout, args)
+    return run_cmd(ipmi_base(host, user, password, interface, port, cipher=cipher) + args, timeout)
+
+
+def ipmi(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    args: List[str],
+    *,
+    refresh: bool = False,
+) -> Tuple[int, str, str]:
+    """Run `args` on the BMC; `refresh` makes a caching runner (the daemon) ask the BMC again."""
+    if _runner is not None:
+        return _runner(host, user, password, interface, port, timeout, args, refresh=refresh)
+    return run_local(host, user, password, interface, port, timeout, args)
+
+
+def ipmi_stream(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    args: List[str],
+    on_line: Callable[[str], None],
+) -> Tuple[int, str, str]:
+    # Streamed commands (FRU, SDR) run here even with the daemon attached: its
+    # protocol only returns whole answers, which would hold every line back.
+    if interface == REDFISH_INTERFACE:
+        rc, out, err = ipmi(host, user, password, interface, port, timeout, args)
+        for ln in out.splitlines():
+            on_line(ln)
+        return rc, out, err
+    return run_cmd_stream(ipmi_base(host, user, password, interface, port) + args, timeout, on_line)
 
 
 def looks_like_auth_error(text: str) -> bool:
@@ -69,6 +168,8 @@ def looks_like_auth_error(text: str) -> bool:
 
 
 def sol_activate(host: str, user: str, password: Optional[str], interface: str, port: int) -> int:
+    if interface == REDFISH_INTERFACE:
+        return 1  # Redfish has no serial console
     cmd = ipmi_base(host, user, password, interface, port) + ["sol", "activate"]
     try:
         rc = subprocess.call(cmd)
@@ -80,7 +181,21 @@ def sol_activate(host: str, user: str, password: Optional[str], interface: str,
     return rc
 
 
-def power(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int, mode: str) -> Tuple[int, str, str]:
+def sol_deactivate(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int) -> Tuple[int, str, str]:
+    return ipmi(host, user, password, interface, port, timeout, ["sol", "deactivate"])
+
+
+def power(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    mode: str,
+    *,
+    refresh: bool = False,
+) -> Tuple[int, str, str]:
     mp = {
         "on": ["chassis", "power", "on"],
         "off": ["chassis", "power", "off"],
@@ -89,7 +204,7 @@ def power(host: str, user: str, password: Optional[str], interface: str, port: i
         "status": ["chassis", "power", "status"],
         "soft": ["chassis", "power", "soft"],
     }
-    return ipmi(host, user, password, interface, port, timeout, mp[mode])
+    return ipmi(host, user, password, interface, port, timeout, mp[mode], refresh=refresh)
 
 
 def bootdev(
@@ -118,23 +233,57 @@ def bootdev(
 
     # fallback si options non supportées
     if rc != 0 and opts:
-        rc2, out2, err2 = ipmi(host, user, password, interface, port, timeout, args[:-1])
+        with profiler.retrying():
+            rc2, out2, err2 = ipmi(host, user, password, interface, port, timeout, args[:-1])
         if rc2 == 0:
             return rc2, out2, err2
 
     return rc, out, err
 
 
-def ipmi_lan_print(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int) -> Tuple[int, str, str]:
-    rc, out, err = ipmi(host, user, password, interface, port, timeout, ["lan", "print"])
+def ipmi_lan_print(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    channel: Optional[int] = None,
+) -> Tuple[int, str, str]:
+    if channel is not None:
+        # channel known from the vendor profile: a single round trip
+        rc, out, err = ipmi(host, user, password, interface, port, timeout, ["lan", "print", str(channel)])
+        if rc == 0:
+            return rc, out, err
+        with profiler.retrying():
+            rc, out, err = ipmi(host, user, password, interface, port, timeout, ["lan", "print"])
+    else:
+        rc, out, err = ipmi(host, user, password, interface, port, timeout, ["lan", "print"])
     if rc == 0:
         return rc, out, err
     # certains BMC attendent un channel
-    return ipmi(host, user, password, interface, port, timeout, ["lan", "print", "1"])
+    with profiler.retrying():
+        return ipmi(host, user, password, interface, port, timeout, ["lan", "print", "1"])
+
 
+def ipmi_sdr_list(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    on_line: Optional[Callable[[str], None]] = None,
+) -> Tuple[int, str, str]:
+    """`sdr list`, falling back to `sdr list all`; streams lines to on_line if given."""
+    def run(args: List[str]) -> Tuple[int, str, str]:
+        if on_line is None:
+            return ipmi(host, user, password, interface, port, timeout, args)
+        return ipmi_stream(host, user, password, interface, port, timeout, args, on_line)
 
-def ipmi_sdr_list(host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int) -> Tuple[int, str, str]:
-    rc, out, err = ipmi(host, user, password, interface, port, timeout, ["sdr", "list"])
-    if rc == 0 and out:
+    rc, out, err = run(["sdr", "list"])
+    # lines already streamed cannot be taken back: only retry if nothing came out
+    if out and (rc == 0 or on_line is not None):
         return rc, out, err
-    return ipmi(host, user, password, interface, port, timeout, ["sdr", "list", "all"])
+    with profiler.retrying():
+        return run(["sdr", "list", "all"])
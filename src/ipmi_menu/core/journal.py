@@ -0,0 +1,150 @@
+"""Append-only journal of per-host outcomes for resumable fleet jobs."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+
+JOBS_DIR = CONFIG_DIR / "jobs"
+
+_MAGIC = "#ipmi-menu-journal v1 "
+
+
+@dataclass
+class JournalEntry:
+    host: str
+    ok: bool
+    elapsed: float
+    detail: str
+
+
+def _clean(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+def _format_entry(e: JournalEntry) -> str:
+    # One tab-separated line per outcome: host, ok|fail, elapsed, detail.
+    return f"{e.host}\t{'ok' if e.ok else 'fail'}\t{e.elapsed:.3f}\t{_clean(e.detail)}\n"
+
+
+def read_journal(path: Union[str, Path]) -> Tuple[Dict[str, Any], Dict[str, JournalEntry], int]:
+    """
+    Return (header, latest entry per host, number of entry lines).
+
+    A trailing line without newline is a write interrupted by a crash and is
+    ignored, as are lines that do not parse.
+    """
+    header: Dict[str, Any] = {}
+    entries: Dict[str, JournalEntry] = {}
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for ln in f:
+            if not ln.endswith("\n"):
+                break
+            if ln.startswith(_MAGIC):
+                try:
+                    header = json.loads(ln[len(_MAGIC):])
+                except json.JSONDecodeError:
+                    pass
+                continue
+            parts = ln.rstrip("\n").split("\t", 3)
+            if len(parts) != 4:
+                continue
+            host, status, elapsed, detail = parts
+            try:
+                entries[host] = JournalEntry(host, status == "ok", float(elapsed), detail)
+            except ValueError:
+                continue
+            count += 1
+    return header, entries, count
+
+
+def _drop_partial_line(path: Path) -> None:
+    """Truncate `path` after its last newline: a line cut by a crash must not prefix the next record."""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            i = f.read(step).rfind(b"\n")
+            if i >= 0:
+                pos = pos - step + i + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+
+class Journal:
+    """
+    Thread-safe, append-only journal file.
+
+    Each outcome is one short line flushed immediately, so an interrupted job
+    loses at most the hosts that were in flight. Re-opening an existing
+    journal resumes it: `completed()` lists hosts to skip.
+    """
+
+    def __init__(self, path: Union[str, Path], job: str, params: Optional[Dict[str, Any]] = None) -> None:
+        self.path = Path(path)
+        self.job = job
+        self._lock = threading.Lock()
+        self.entries: Dict[str, JournalEntry] = {}
+
+        if self.path.exists():
+            header, self.entries, count = read_journal(self.path)
+            if header.get("job") not in (None, job):
+                raise ValueError(f"{self.path} is a journal for job {header.get('job')!r}, not {job!r}")
+            if count > 2 * max(1, len(self.entries)):
+                self._compact(header)
+            else:
+                _drop_partial_line(self.path)
+            self._f = open(self.path, "a", encoding="utf-8")
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, "w", encoding="utf-8")
+            head = {"job": job, "created": int(time.time()), "params": params or {}}
+            self._f.write(_MAGIC + json.dumps(head, sort_keys=True) + "\n")
+            self._f.flush()
+            os.chmod(self.path, 0o600)
+
+    def _compact(self, header: Dict[str, Any]) -> None:
+        """Rewrite the journal keeping only the latest entry per host."""
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(_MAGIC + json.dumps(header or {"job": self.job}, sort_keys=True) + "\n")
+            f.writelines(_format_entry(e) for e in self.entries.values())
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.path)
+
+    def completed(self) -> Set[str]:
+        with self._lock:
+            return {h for h, e in self.entries.items() if e.ok}
+
+    def record(self, host: str, ok: bool, elapsed: float, detail: str = "") -> None:
+        entry = JournalEntry(host, ok, elapsed, _clean(detail))
+        with self._lock:
+            self.entries[host] = entry
+            self._f.write(_format_entry(entry))
+            self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._f.closed:
+                self._f.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def new_journal_path(job: str) -> Path:
+    return JOBS_DIR / f"{job}-{time.strftime('%Y%m%d-%H%M%S')}.journal"
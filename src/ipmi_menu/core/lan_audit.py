@@ -0,0 +1,208 @@
+"""BMC network configuration audit: hash per host, diff only what drifted."""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+
+from .ipmi import ipmi, ipmi_lan_print
+
+LAN_AUDIT_DB = CONFIG_DIR / "lan_audit.db"
+
+# `lan print` lines that change without anyone touching the configuration.
+_VOLATILE = ("set in progress",)
+
+# ID, name (may be empty), callin, link auth, IPMI messaging, privilege limit
+_USER_ROW = re.compile(r"^(\d+)\s+(.*?)\s*\b(true|false)\s+(true|false)\s+(true|false)\s+(.+)$")
+
+# Default channel of `user list` when `lan print` found the LAN channel alone.
+DEFAULT_CHANNEL = 1
+
+
+@dataclass
+class LanSnapshot:
+    """Raw configuration of one host, reduced to what the hash covers."""
+
+    host: str
+    lan: str
+    users: str
+    digest: str
+
+
+@dataclass
+class Drift:
+    host: str
+    new: bool  # first audit of this host
+    changes: List[Tuple[str, str, str]] = field(default_factory=list)  # (field, before, after)
+
+
+def _canonical(text: str) -> str:
+    """Lines with collapsed whitespace and without volatile fields."""
+    lines = []
+    for ln in text.splitlines():
+        ln = " ".join(ln.split())
+        if not ln or ln.split(":", 1)[0].strip().lower() in _VOLATILE:
+            continue
+        lines.append(ln)
+    return "\n".join(lines)
+
+
+def snapshot(host: str, lan_text: str, users_text: str) -> LanSnapshot:
+    lan, users = _canonical(lan_text), _canonical(users_text)
+    digest = hashlib.sha256(f"{lan}\n--\n{users}".encode()).hexdigest()[:32]
+    return LanSnapshot(host, lan, users, digest)
+
+
+def parse_user_list(text: str) -> Dict[str, str]:
+    """
+    `user list` rows keyed by user id, e.g. {"user 2": "root, callin=true,
+    link=true, ipmi=true, priv=ADMINISTRATOR"}. Unnamed slots without
+    access are left out.
+    """
+    users: Dict[str, str] = {}
+    for ln in text.splitlines():
+        m = _USER_ROW.match(ln.strip())
+        if m is None:
+            continue
+        uid, name, callin, link, msg, priv = m.groups()
+        if not name and priv == "NO ACCESS":
+            continue
+        users[f"user {uid}"] = f"{name}, callin={callin}, link={link}, ipmi={msg}, priv={priv}"
+    return users
+
+
+def normalize(snap: LanSnapshot) -> Dict[str, str]:
+    """Flat record of a snapshot: `lan print` fields, then one entry per user."""
+    record: Dict[str, str] = {}
+    key = ""
+    for ln in snap.lan.splitlines():
+        if ":" in ln:
+            k, v = ln.split(":", 1)
+            if k.strip():
+                key = k.strip().lower()
+                record[key] = v.strip()
+                continue
+            # continuation line (e.g. the per-level auth types), same key
+            record[key] = f"{record.get(key, '')}; {v.strip()}".strip("; ")
+    record.update(parse_user_list(snap.users))
+    return record
+
+
+def diff(before: Dict[str, str], after: Dict[str, str]) -> List[Tuple[str, str, str]]:
+    return [
+        (k, before.get(k, ""), after.get(k, ""))
+        for k in sorted(set(before) | set(after))
+        if before.get(k, "") != after.get(k, "")
+    ]
+
+
+def collect(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    channel: Optional[int] = None,
+) -> Tuple[Optional[LanSnapshot], str]:
+    """
+    (snapshot, "") of `host`, or (None, error) if `lan print` or `user list`
+    failed: a snapshot without its users would digest as drift.
+    """
+    rc, lan, err = ipmi_lan_print(host, user, password, interface, port, timeout, channel=channel)
+    if rc != 0 or not lan:
+        return None, err or lan
+    ch = str(channel if channel is not None else DEFAULT_CHANNEL)
+    rc, users, err = ipmi(host, user, password, interface, port, timeout, ["user", "list", ch])
+    if rc != 0 or not users:
+        return None, err or users or "user list failed"
+    return snapshot(host, lan, users), ""
+
+
+class LanAuditStore:
+    """
+    SQLite record of the last audited configuration of every host: its
+    digest, and its normalized record to diff the next one against.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None) -> None:
+        self.path = Path(path) if path is not None else LAN_AUDIT_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS lan_config (
+                host TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                record TEXT NOT NULL,
+                checked_at REAL NOT NULL,
+                changed_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def digests(self) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._db.execute("SELECT host, digest FROM lan_config").fetchall())
+
+    def records(self, hosts: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        hosts = list(hosts)
+        out: Dict[str, Dict[str, str]] = {}
+        with self._lock:
+            for i in range(0, len(hosts), 500):  # stay under SQLite's parameter limit
+                chunk = hosts[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT host, record FROM lan_config WHERE host IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                out.update((h, json.loads(r)) for h, r in rows)
+        return out
+
+    def save(self, unchanged: Iterable[str], changed: Dict[str, Tuple[str, Dict[str, str]]]) -> None:
+        """Mark `unchanged` hosts as checked and store the new digest/record of `changed` ones."""
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany("UPDATE lan_config SET checked_at = ? WHERE host = ?", [(now, h) for h in unchanged])
+            self._db.executemany(
+                "INSERT OR REPLACE INTO lan_config VALUES (?, ?, ?, ?, ?)",
+                [(h, d, json.dumps(r, sort_keys=True), now, now) for h, (d, r) in changed.items()],
+            )
+
+
+def audit(snapshots: Iterable[LanSnapshot], store: LanAuditStore) -> List[Drift]:
+    """
+    Compare snapshots with the last audit and record them. Only hosts whose
+    digest changed are parsed; the result lists them, first-seen ones with
+    `new` set.
+    """
+    known = store.digests()
+    unchanged: List[str] = []
+    drifted: Dict[str, LanSnapshot] = {}
+    for snap in snapshots:
+        if known.get(snap.host) == snap.digest:
+            unchanged.append(snap.host)
+        else:
+            drifted[snap.host] = snap
+
+    previous = store.records(h for h in drifted if h in known)
+    changed: Dict[str, Tuple[str, Dict[str, str]]] = {}
+    result: List[Drift] = []
+    for host, snap in sorted(drifted.items()):
+        record = normalize(snap)
+        changed[host] = (snap.digest, record)
+        before = previous.get(host)
+        result.append(Drift(host, before is None, diff(before, record) if before is not None else []))
+    store.save(unchanged, changed)
+    return result
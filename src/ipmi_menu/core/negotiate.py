@@ -0,0 +1,194 @@
+"""Interface / cipher suite auto-negotiation, cached per host."""
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from ipmi_menu.config.preferences import get_host_profile, get_host_profiles, update_host_profiles
+from ipmi_menu.config.settings import DEFAULT_PORT, TIMEOUT_FAST
+
+from . import redfish
+from .ipmi import ipmi_base, set_host_cipher
+from .redfish import REDFISH_INTERFACE
+from .utils import run_cmd
+
+logger = logging.getLogger("ipmi_menu")
+
+
+@dataclass(frozen=True)
+class LinkProfile:
+    interface: str
+    cipher: Optional[int] = None  # None: let ipmitool pick
+
+    def to_dict(self, port: int = DEFAULT_PORT) -> Dict[str, object]:
+        """Profile fields of the link probed on `port` (only saved when not the default)."""
+        d: Dict[str, object] = {"interface": self.interface, "cipher": self.cipher}
+        if port != DEFAULT_PORT:
+            d["port"] = port
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any], port: int = DEFAULT_PORT) -> Optional["LinkProfile"]:
+        """Link saved in profile `d`, or None if there is none for `port`."""
+        interface = d.get("interface")
+        if not isinstance(interface, str) or d.get("port", DEFAULT_PORT) != port:
+            return None
+        cipher = d.get("cipher")
+        return cls(interface, cipher if isinstance(cipher, int) else None)
+
+
+# In order of preference. Suite 17 (SHA256) is what recent BMCs prefer, 3 is
+# the IPMI 2.0 baseline, plain `lan` is for IPMI 1.5.
+CANDIDATES: Sequence[LinkProfile] = (
+    LinkProfile("lanplus", 17),
+    LinkProfile("lanplus", 3),
+    LinkProfile("lanplus"),
+    LinkProfile("lan"),
+)
+
+# Seconds the preferred candidate gets before the next one is tried as well,
+# and handshakes in flight at once per host.
+PROBE_STAGGER = 1.0
+PROBE_MAX_INFLIGHT = 2
+
+# The BMC answered and refused the credentials: a failed login as far as its lockout counts.
+_AUTH_ERRORS = ("rakp", "unauthorized", "invalid user", "password", "authentication", "access denied", "privilege")
+
+
+def is_auth_failure(err: str) -> bool:
+    t = (err or "").lower()
+    return any(n in t for n in _AUTH_ERRORS)
+
+
+def probe_link(
+    host: str,
+    user: str,
+    password: Optional[str],
+    port: int,
+    timeout: int = TIMEOUT_FAST,
+    candidates: Sequence[LinkProfile] = CANDIDATES,
+    *,
+    stagger: float = PROBE_STAGGER,
+    max_inflight: int = PROBE_MAX_INFLIGHT,
+) -> Optional[LinkProfile]:
+    """
+    Find the link of `host` with a cheap `mc info`, or None if no candidate
+    answers (bad credentials, BMC down). The preferred candidate goes first;
+    the next one starts when it fails or has not answered within `stagger`
+    seconds, with at most `max_inflight` handshakes at once. A refusal of
+    the credentials ends the probe: other candidates would only add failed
+    logins. A slower candidate still in flight is left to finish.
+    """
+    set_host_cipher(host, None)  # the default-suite candidate must not inherit a cached one
+
+    def attempt(c: LinkProfile) -> Tuple[bool, str]:
+        started = time.monotonic()
+        if c.interface == REDFISH_INTERFACE:
+            rc, out, err = redfish.run(host, user, password, port, timeout, ["mc", "info"])
+        else:
+            cmd = ipmi_base(host, user, password, c.interface, port, cipher=c.cipher) + ["mc", "info"]
+            rc, out, err = run_cmd(cmd, timeout)
+        logger.debug("Probe %s %s: rc=%s in %.2fs", host, c, rc, time.monotonic() - started)
+        return rc == 0 and bool(out), err or out
+
+    limit = max(1, max_inflight)
+    queue = list(candidates)
+    pending: Dict[Future, LinkProfile] = {}
+    pool = ThreadPoolExecutor(max_workers=limit, thread_name_prefix="probe")
+    try:
+        while queue or pending:
+            if queue and len(pending) < limit:
+                c = queue.pop(0)
+                pending[pool.submit(attempt, c)] = c
+            can_start = bool(queue) and len(pending) < limit
+            done, _ = wait(pending, timeout=stagger if can_start else None, return_when=FIRST_COMPLETED)
+            # Among candidates finishing together, keep the preferred order.
+            for fut in sorted(done, key=lambda f: candidates.index(pending[f])):
+                c = pending.pop(fut)
+                ok, err = fut.result()
+                if ok:
+                    return c
+                if is_auth_failure(err):
+                    logger.debug("Probe %s: credentials refused over %s", host, c)
+                    return None
+        return None
+    finally:
+        pool.shutdown(wait=False)
+
+
+def use_link(host: str, link: LinkProfile) -> str:
+    """Make every later ipmitool call to `host` use `link`; return its interface."""
+    set_host_cipher(host, link.cipher if link.interface == "lanplus" else None)
+    return link.interface
+
+
+def cached_link(host: str, port: int = DEFAULT_PORT) -> Optional[LinkProfile]:
+    d = get_host_profile(host)
+    return LinkProfile.from_dict(d, port) if d else None
+
+
+def negotiate(
+    host: str,
+    user: str,
+    password: Optional[str],
+    port: int,
+    *,
+    refresh: bool = False,
+    verify: bool = False,
+    timeout: int = TIMEOUT_FAST,
+) -> Optional[LinkProfile]:
+    """
+    Cached link of `host`, probing (and caching) it when unknown or `refresh`.
+    With `verify`, a cached link is checked first and probed again if it no
+    longer answers (e.g. after a BMC firmware update).
+    """
+    link = None if refresh else cached_link(host, port)
+    if link is not None and verify:
+        link = probe_link(host, user, password, port, timeout, candidates=[link])
+    if link is None:
+        link = probe_link(host, user, password, port, timeout)
+        if link is not None:
+            update_host_profiles({host: link.to_dict(port)})
+    if link is not None:
+        use_link(host, link)
+    return link
+
+
+def negotiate_many(
+    hosts: Sequence[str],
+    user: str,
+    password: Optional[str],
+    port: int,
+    *,
+    workers: int = 8,
+    refresh: bool = False,
+    timeout: int = TIMEOUT_FAST,
+) -> Dict[str, LinkProfile]:
+    """
+    Links of many hosts: cached ones are used as is, the others (all of them
+    with `refresh`) are probed concurrently and saved in a single write.
+    Hosts no candidate works for are missing from the result.
+    """
+    saved = {} if refresh else get_host_profiles(hosts)
+    links: Dict[str, LinkProfile] = {}
+    unknown: List[str] = []
+    for h in hosts:
+        link = LinkProfile.from_dict(saved[h], port) if h in saved else None
+        if link is None:
+            unknown.append(h)
+        else:
+            links[h] = link
+
+    if unknown:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            probed = dict(zip(unknown, pool.map(lambda h: probe_link(h, user, password, port, timeout), unknown)))
+        found = {h: link for h, link in probed.items() if link is not None}
+        update_host_profiles({h: link.to_dict(port) for h, link in found.items()})
+        links.update(found)
+
+    for h, link in links.items():
+        use_link(h, link)
+    return links
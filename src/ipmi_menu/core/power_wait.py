@@ -0,0 +1,155 @@
+"""Wait until one or many hosts reach a given chassis power state."""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ipmi_menu.config.settings import TIMEOUT_FAST
+
+from .fleet import Target
+from .ipmi import parse_power_state, power
+from .scheduler import Scheduler
+
+logger = logging.getLogger("ipmi_menu")
+
+
+@dataclass
+class WaitResult:
+    host: str
+    state: str
+    reached: bool
+    elapsed: float
+    polls: int
+    verified: bool = True  # False: `state` reached, but the `via` state was never seen on the way
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random) -> float:
+    """Exponential backoff with "equal jitter": half fixed, half random."""
+    ceiling = min(cap, base * (2 ** attempt))
+    return ceiling / 2 + rng.uniform(0, ceiling / 2)
+
+
+def watch_power_state(
+    target: Target,
+    state: str,
+    timeout: float,
+    scheduler: Scheduler,
+    on_done: Callable[[WaitResult], None],
+    *,
+    initial_delay: float = 0.0,
+    base_interval: float = 1.0,
+    max_interval: float = 15.0,
+    poll_timeout: int = TIMEOUT_FAST,
+    cancel: Optional[threading.Event] = None,
+    via: Optional[str] = None,
+    via_window: float = 0.0,
+    rng: Optional[random.Random] = None,
+) -> None:
+    """
+    Poll `chassis power status` of `target` on `scheduler` until it reports
+    `state`, never from the daemon's cache, then call on_done(result) from a
+    scheduler worker. Returns at once: no thread is held between polls.
+
+    With `via` (e.g. "off" after a power cycle), `state` only counts once
+    the host has reported `via`: a cycle that has not started yet still
+    shows "on". A host found in `state` without ever showing `via` for
+    `via_window` seconds is finished as reached but not verified, since the
+    transition may have been shorter than the poll interval. Setting
+    `cancel` makes the host give up at its next poll.
+    """
+    t = target
+    rng = rng or random.Random()
+    start = time.monotonic()
+    deadline = start + timeout
+    seen_via = False
+
+    def poll(attempt: int) -> None:
+        nonlocal seen_via
+        try:
+            rc, out, _ = power(t.host, t.user, t.password, t.interface, t.port, poll_timeout, "status", refresh=True)
+            current = parse_power_state(out) if rc == 0 else "unknown"
+        except Exception as exc:  # a poll that raises is a failed poll, not a host lost for good
+            logger.debug("Power status of %s failed: %r", t.host, exc)
+            current = "unknown"
+        now = time.monotonic()
+        if via is not None and current == via:
+            seen_via = True
+        if current == state:
+            if via is None or seen_via:
+                on_done(WaitResult(t.host, current, True, now - start, attempt + 1))
+                return
+            if now - start >= via_window:
+                on_done(WaitResult(t.host, current, True, now - start, attempt + 1, verified=False))
+                return
+        if now >= deadline or (cancel is not None and cancel.is_set()):
+            on_done(WaitResult(t.host, current, False, now - start, attempt + 1))
+            return
+        delay = backoff_delay(attempt, base_interval, max_interval, rng)
+        scheduler.call_at(min(now + delay, deadline), lambda: poll(attempt + 1))
+
+    scheduler.call_later(initial_delay, lambda: poll(0))
+
+
+def wait_for_power_state(
+    targets: Sequence[Target],
+    state: str,
+    timeout: float,
+    *,
+    initial_delay: float = 0.0,
+    base_interval: float = 1.0,
+    max_interval: float = 15.0,
+    poll_timeout: int = TIMEOUT_FAST,
+    max_workers: int = 32,
+    scheduler: Optional[Scheduler] = None,
+    cancel: Optional[threading.Event] = None,
+    via: Optional[str] = None,
+    via_window: float = 0.0,
+) -> List[WaitResult]:
+    """
+    watch_power_state() every target and block until all are done.
+
+    All hosts share one scheduler; each gets its own backoff sequence so a
+    slow BMC does not delay the others. Results are returned in the order
+    of `targets`, with `elapsed` measured from the call to this function.
+    """
+    own_scheduler = scheduler is None
+    sched = scheduler or Scheduler(max_workers=max_workers)
+    rng = random.Random()
+    start = time.monotonic()
+    results: Dict[int, WaitResult] = {}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def finisher(idx: int) -> Callable[[WaitResult], None]:
+        def finish(result: WaitResult) -> None:
+            with lock:
+                results[idx] = result
+                if len(results) == len(targets):
+                    done.set()
+
+        return finish
+
+    if not targets:
+        return []
+    try:
+        for i, t in enumerate(targets):
+            watch_power_state(
+                t, state, timeout, sched, finisher(i),
+                initial_delay=initial_delay, base_interval=base_interval, max_interval=max_interval,
+                poll_timeout=poll_timeout, cancel=cancel, via=via, via_window=via_window, rng=rng,
+            )
+        # Polls in flight may overrun the deadline by up to poll_timeout.
+        done.wait(timeout + initial_delay + poll_timeout + 1)
+    finally:
+        if own_scheduler:
+            sched.shutdown(wait=False)
+
+    with lock:
+        return [
+            results.get(i) or WaitResult(t.host, "unknown", False, time.monotonic() - start, 0)
+            for i, t in enumerate(targets)
+        ]
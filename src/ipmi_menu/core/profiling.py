@@ -0,0 +1,228 @@
+"""Timing instrumentation of BMC calls: histograms and Chrome trace timeline."""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+# Histogram bucket upper bounds, in milliseconds (last bucket is open-ended).
+BUCKETS_MS: Tuple[float, ...] = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Calls kept for the timeline; histograms keep counting past it.
+MAX_RECORDS = 200_000
+
+# ipmitool options followed by a value, skipped when naming the command.
+_VALUE_OPTS = {"-I", "-H", "-p", "-U", "-P", "-C", "-L", "-y", "-k", "-K", "-f", "-t", "-b", "-T", "-B", "-m", "-o"}
+
+
+@dataclass
+class CallRecord:
+    host: str
+    command: str
+    start: float  # time.time()
+    spawn_s: float  # fork/exec until the child is running (0 for in-process transports)
+    wall_s: float
+    rc: int
+    out_bytes: int
+    err_bytes: int
+    retry: bool
+    thread: int
+
+
+@dataclass
+class Histogram:
+    counts: List[int] = field(default_factory=lambda: [0] * (len(BUCKETS_MS) + 1))
+    n: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_s: float = 0.0
+    spawn_s: float = 0.0
+    max_s: float = 0.0
+    out_bytes: int = 0
+
+    def add(self, r: CallRecord) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, r.wall_s * 1000)] += 1
+        self.n += 1
+        self.errors += r.rc != 0
+        self.retries += r.retry
+        self.total_s += r.wall_s
+        self.spawn_s += r.spawn_s
+        self.max_s = max(self.max_s, r.wall_s)
+        self.out_bytes += r.out_bytes
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (ms) of the bucket holding the q-quantile, capped by the max."""
+        if not self.n:
+            return 0.0
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(BUCKETS_MS[i], self.max_s * 1000) if i < len(BUCKETS_MS) else self.max_s * 1000
+        return self.max_s * 1000
+
+
+def describe(cmd: Sequence[str]) -> Tuple[str, str]:
+    """(host, command) of an ipmitool argv, e.g. ("10.0.0.5", "chassis power status")."""
+    if not cmd:
+        return "-", "-"
+    if os.path.basename(cmd[0]) != "ipmitool":
+        return "-", os.path.basename(cmd[0])
+    host = "-"
+    words: List[str] = []
+    it = iter(cmd[1:])
+    for arg in it:
+        if arg in _VALUE_OPTS:
+            value = next(it, "")
+            if arg == "-H":
+                host = value
+        elif not arg.startswith("-") or words:
+            words.append(arg)
+    return host, " ".join(words) or "-"
+
+
+class Profiler:
+    """
+    Collects one CallRecord per BMC call while enabled (it is off by default
+    and costs nothing then), aggregated per command and per (host, command).
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.records: List[CallRecord] = []
+        self.by_command: Dict[str, Histogram] = {}
+        self.by_host: Dict[Tuple[str, str], Histogram] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.started = time.time()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records, self.by_command, self.by_host = [], {}, {}
+
+    @property
+    def in_retry(self) -> bool:
+        return getattr(self._local, "retry", False)
+
+    @contextmanager
+    def retrying(self) -> Iterator[None]:
+        """Mark calls made inside the block as fallbacks of a failed call."""
+        prev = self.in_retry
+        self._local.retry = True
+        try:
+            yield
+        finally:
+            self._local.retry = prev
+
+    def record(
+        self,
+        host: str,
+        command: str,
+        start: float,
+        spawn_s: float,
+        wall_s: float,
+        rc: int,
+        out_bytes: int,
+        err_bytes: int,
+    ) -> None:
+        if not self.enabled:
+            return
+        r = CallRecord(
+            host, command, start, spawn_s, wall_s, rc, out_bytes, err_bytes, self.in_retry, threading.get_ident()
+        )
+        with self._lock:
+            if len(self.records) < MAX_RECORDS:
+                self.records.append(r)
+            self.by_command.setdefault(command, Histogram()).add(r)
+            self.by_host.setdefault((host, command), Histogram()).add(r)
+
+    def record_cmd(
+        self, cmd: Sequence[str], start: float, spawn_s: float, wall_s: float, rc: int, out: str, err: str
+    ) -> None:
+        if self.enabled:
+            host, command = describe(cmd)
+            self.record(host, command, start, spawn_s, wall_s, rc, len(out), len(err))
+
+    def summary(self, slowest_hosts: int = 10) -> str:
+        with self._lock:
+            by_command = dict(self.by_command)
+            by_host = dict(self.by_host)
+        if not by_command:
+            return "No BMC call recorded."
+        head = "".join(f"{'<' + _ms(b):>8}" for b in BUCKETS_MS) + f"{'>=' + _ms(BUCKETS_MS[-1]):>8}"
+        lines = [
+            f"{'command':<28} {'calls':>6} {'err':>5} {'retry':>5} {'p50':>7} {'p95':>7} {'max':>7} "
+            f"{'spawn':>7} {'out':>8}",
+        ]
+        for name, h in sorted(by_command.items(), key=lambda kv: -kv[1].total_s):
+            lines.append(
+                f"{name[:28]:<28} {h.n:>6} {h.errors:>5} {h.retries:>5} {_ms(h.percentile(0.5)):>7} "
+                f"{_ms(h.percentile(0.95)):>7} {_ms(h.max_s * 1000):>7} {_ms(h.spawn_s / h.n * 1000):>7} "
+                f"{_bytes(h.out_bytes):>8}"
+            )
+        lines += ["", f"{'wall time histogram':<28} {head}"]
+        for name, h in sorted(by_command.items(), key=lambda kv: -kv[1].total_s):
+            lines.append(f"{name[:28]:<28} " + "".join(f"{c or '.':>8}" for c in h.counts))
+        slow = sorted(by_host.items(), key=lambda kv: -kv[1].total_s)[:slowest_hosts]
+        if any(host != "-" for (host, _), _ in slow):
+            lines += ["", f"{'host':<24} {'command':<28} {'calls':>6} {'total':>8} {'max':>7}"]
+            for (host, name), h in slow:
+                lines.append(f"{host[:24]:<24} {name[:28]:<28} {h.n:>6} {h.total_s:>7.1f}s {_ms(h.max_s * 1000):>7}")
+        return "\n".join(lines)
+
+    def write_trace(self, path: Union[str, Path]) -> None:
+        """
+        Chrome trace event file (chrome://tracing, Perfetto): one row per
+        host, one complete event per call.
+        """
+        with self._lock:
+            records = list(self.records)
+        rows: Dict[str, int] = {}
+        events: List[Dict[str, object]] = []
+        for r in records:
+            tid = rows.get(r.host)
+            if tid is None:
+                tid = rows[r.host] = len(rows) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": r.host}})
+            events.append({
+                "name": r.command,
+                "cat": "retry" if r.retry else "call",
+                "ph": "X",
+                "pid": 1,
+                "tid": tid,
+                "ts": round((r.start - self.started) * 1e6),
+                "dur": round(r.wall_s * 1e6),
+                "args": {"rc": r.rc, "spawn_ms": round(r.spawn_s * 1000, 3), "out_bytes": r.out_bytes,
+                         "err_bytes": r.err_bytes},
+            })
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        with open(p, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def _ms(ms: float) -> str:
+    return f"{ms / 1000:.1f}s" if ms >= 1000 else f"{ms:.0f}ms"
+
+
+def _bytes(n: int) -> str:
+    for unit in ("B", "K", "M"):
+        if n < 1024:
+            return f"{n}{unit}"
+        n //= 1024
+    return f"{n}G"
+
+
+# Process-wide profiler used by core.utils and core.redfish.
+profiler = Profiler()
@@ -0,0 +1,237 @@
+"""Pipelined PXE reprovisioning over a list of hosts."""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from ipmi_menu.config.settings import POWER_WAIT_OFF_WINDOW, POWER_WAIT_SETTLE, POWER_WAIT_TIMEOUT, TIMEOUT_NORMAL
+
+from .fleet import Target
+from .ipmi import bootdev, parse_power_state, power
+from .power_wait import WaitResult, watch_power_state
+from .scheduler import Scheduler
+
+logger = logging.getLogger("ipmi_menu")
+
+PROVISION_STAGES = ("bootdev", "cycle", "wait_on", "restore")
+# Stages that report through a callback instead of holding a worker thread
+ASYNC_STAGES = frozenset({"wait_on"})
+
+
+@dataclass
+class StageStats:
+    name: str
+    ok: int = 0
+    failed: int = 0
+    latencies: List[float] = field(default_factory=list)
+    first_start: Optional[float] = None
+    last_end: Optional[float] = None
+
+    def record(self, start: float, end: float, ok: bool) -> None:
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+        self.latencies.append(end - start)
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def throughput(self) -> float:
+        """Hosts completed per second while the stage was active."""
+        if self.first_start is None or self.last_end is None:
+            return 0.0
+        window = self.last_end - self.first_start
+        done = self.ok + self.failed
+        return done / window if window > 0 else float(done)
+
+
+@dataclass
+class ProvisionResult:
+    host: str
+    ok: bool
+    stage: str
+    detail: str
+    elapsed: float
+
+
+class ProvisionPipeline:
+    """
+    Set PXE boot, power cycle, wait for power-on and optionally restore disk boot.
+
+    Each stage has its own worker pool and hands hosts to the next stage as
+    soon as they succeed, so a rack's power cycles overlap with the bootdev
+    calls of hosts further down the list. Waiting for power-on holds no
+    thread: its polls are events on the shared Scheduler. After a cycle the
+    host must be seen off before "on" counts, since a BMC that has not
+    started the cycle yet still reports on. A host stops at its first
+    failed stage.
+    """
+
+    def __init__(
+        self,
+        targets: Sequence[Target],
+        *,
+        uefi: bool = True,
+        persistent: bool = False,
+        restore_disk: bool = False,
+        workers: int = 8,
+        timeout: int = TIMEOUT_NORMAL,
+        wait_timeout: float = POWER_WAIT_TIMEOUT,
+        settle: float = POWER_WAIT_SETTLE,
+        off_window: float = POWER_WAIT_OFF_WINDOW,
+        poll_interval: float = 0.5,
+        on_result: Optional[Callable[[ProvisionResult], None]] = None,
+    ) -> None:
+        self.targets = list(targets)
+        self.uefi = uefi
+        self.persistent = persistent
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.wait_timeout = wait_timeout
+        self.settle = settle
+        self.off_window = off_window
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self.stages: List[str] = list(PROVISION_STAGES if restore_disk else PROVISION_STAGES[:-1])
+        self.stats: Dict[str, StageStats] = {name: StageStats(name) for name in self.stages}
+        self._scheduler: Optional[Scheduler] = None
+        self._cancel = threading.Event()
+        self._powered_on: Set[str] = set()  # hosts found off and powered on instead of cycled
+        self._lock = threading.Lock()
+
+    def _stage_bootdev(self, t: Target) -> Tuple[bool, str]:
+        rc, out, err = bootdev(
+            t.host, t.user, t.password, t.interface, t.port, self.timeout, "pxe",
+            uefi=self.uefi, persistent=self.persistent,
+        )
+        return rc == 0, err if rc != 0 else out
+
+    def _stage_cycle(self, t: Target) -> Tuple[bool, str]:
+        rc, out, err = power(t.host, t.user, t.password, t.interface, t.port, self.timeout, "cycle")
+        if rc == 0:
+            return True, out
+        # Most BMCs refuse a cycle on a powered-off chassis: power it on instead.
+        rc_s, out_s, _ = power(t.host, t.user, t.password, t.interface, t.port, self.timeout, "status", refresh=True)
+        if rc_s == 0 and parse_power_state(out_s) == "off":
+            rc, out, err = power(t.host, t.user, t.password, t.interface, t.port, self.timeout, "on")
+            if rc == 0:
+                with self._lock:
+                    self._powered_on.add(t.host)
+        return rc == 0, err if rc != 0 else out
+
+    def _stage_wait_on(self, t: Target, done: Callable[[bool, str], None]) -> None:
+        def reached(res: WaitResult) -> None:
+            detail = f"power {res.state} after {res.elapsed:.1f}s"
+            done(res.reached, detail if res.verified else detail + " (off phase not seen)")
+
+        assert self._scheduler is not None
+        with self._lock:
+            cycled = t.host not in self._powered_on
+        if cycled:
+            # Poll at once and often: the off phase of a cycle lasts a few seconds
+            watch_power_state(
+                t, "on", self.wait_timeout, self._scheduler, reached,
+                base_interval=self.poll_interval, cancel=self._cancel, via="off", via_window=self.off_window,
+            )
+        else:
+            watch_power_state(
+                t, "on", self.wait_timeout, self._scheduler, reached,
+                initial_delay=self.settle, cancel=self._cancel,
+            )
+
+    def _stage_restore(self, t: Target) -> Tuple[bool, str]:
+        rc, out, err = bootdev(
+            t.host, t.user, t.password, t.interface, t.port, self.timeout, "disk",
+            uefi=self.uefi, persistent=self.persistent,
+        )
+        return rc == 0, err if rc != 0 else out
+
+    def run(self) -> List[ProvisionResult]:
+        """
+        Run the pipeline over all targets; results keep the input order.
+
+        On KeyboardInterrupt no new stage is started; stages already running
+        complete (and are reported through `on_result`) before re-raising.
+        """
+        if not self.targets:
+            return []
+
+        results: Dict[int, ProvisionResult] = {}
+        lock = threading.Lock()
+        done = threading.Event()
+        pools = {
+            name: ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"provision-{name}")
+            for name in self.stages
+            if name not in ASYNC_STAGES
+        }
+        self._scheduler = Scheduler(max_workers=self.workers)
+
+        def finish(idx: int, result: ProvisionResult) -> None:
+            with lock:
+                results[idx] = result
+                if len(results) == len(self.targets):
+                    done.set()
+            if self.on_result is not None:
+                self.on_result(result)
+
+        def advance(idx: int, t: Target, stage_no: int, t0: float) -> None:
+            if self._cancel.is_set():
+                return
+            name = self.stages[stage_no]
+            start = time.monotonic()
+
+            def complete(ok: bool, detail: str) -> None:
+                end = time.monotonic()
+                if not ok and self._cancel.is_set():
+                    # Interrupted, not failed: leave the host to a resumed run.
+                    return
+                with lock:
+                    self.stats[name].record(start, end, ok)
+                if ok and stage_no + 1 < len(self.stages):
+                    if not self._cancel.is_set():
+                        handoff(idx, t, stage_no + 1, t0)
+                    return
+                finish(idx, ProvisionResult(t.host, ok, name, (detail or "").strip(), end - t0))
+
+            try:
+                if name in ASYNC_STAGES:
+                    getattr(self, f"_stage_{name}")(t, complete)
+                    return
+                ok, detail = getattr(self, f"_stage_{name}")(t)
+            except Exception as exc:
+                logger.exception("Provisioning stage %s failed on %s", name, t.host)
+                ok, detail = False, str(exc)
+            complete(ok, detail)
+
+        def handoff(idx: int, t: Target, stage_no: int, t0: float) -> None:
+            name = self.stages[stage_no]
+            if name in ASYNC_STAGES:
+                advance(idx, t, stage_no, t0)  # only schedules its first event
+            else:
+                pools[name].submit(advance, idx, t, stage_no, t0)
+
+        try:
+            for idx, t in enumerate(self.targets):
+                handoff(idx, t, 0, time.monotonic())
+            done.wait()
+        except KeyboardInterrupt:
+            self._cancel.set()
+            raise
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+
+        return [results[i] for i in range(len(self.targets))]
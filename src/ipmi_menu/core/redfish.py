@@ -0,0 +1,476 @@
+"""
+Redfish transport for the operations of core.ipmi.
+
+A host whose interface is "redfish" is reached over HTTPS instead of
+ipmitool: `run()` takes the same argument lists as `ipmi()` (`chassis power
+on`, `sensor`, `fru print`, ...) and answers with text in ipmitool's format,
+so every parser and menu works unchanged.
+"""
+from __future__ import annotations
+
+import atexit
+import base64
+import hashlib
+import http.client
+import json
+import logging
+import socket
+import ssl
+import threading
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from ipmi_menu.config.preferences import get_host_profile
+from ipmi_menu.config.settings import DEFAULT_PORT
+
+from .profiling import profiler
+
+logger = logging.getLogger("ipmi_menu")
+
+REDFISH_INTERFACE = "redfish"
+SCHEME = "https"
+HTTPS_PORT = 443
+
+# Idle keep-alive connections kept per BMC.
+MAX_IDLE_CONNECTIONS = 4
+
+_RESET_TYPES = {
+    "on": ("On", "ForceOn"),
+    "off": ("ForceOff",),
+    "cycle": ("PowerCycle", "ForceRestart"),
+    "reset": ("ForceRestart",),
+    "soft": ("GracefulShutdown",),
+}
+_BOOT_TARGETS = {"pxe": "Pxe", "disk": "Hdd", "cdrom": "Cd", "bios": "BiosSetup", "none": "None"}
+_HEALTH_STATUS = {"OK": "ok", "Warning": "nc", "Critical": "cr"}
+
+
+class RedfishError(Exception):
+    pass
+
+
+def tls_settings(host: str) -> Dict[str, Any]:
+    """
+    TLS trust of `host` from its profile (`redfish_tls`): {} verifies against
+    the system CAs, {"ca_file": path} against a bundle, {"fingerprint": hex}
+    pins the SHA-256 of the certificate, {"verify": False} trusts anything.
+    """
+    return dict((get_host_profile(host) or {}).get("redfish_tls") or {})
+
+
+def normalize_fingerprint(fp: str) -> str:
+    return fp.replace(":", "").replace(" ", "").lower()
+
+
+def cert_fingerprint(der: bytes) -> str:
+    return hashlib.sha256(der).hexdigest()
+
+
+def fetch_fingerprint(host: str, port: int, timeout: float) -> str:
+    """SHA-256 fingerprint of the certificate `host` presents now (to pin it)."""
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        with tls_context({"verify": False}).wrap_socket(sock, server_hostname=host) as tls_sock:
+            return cert_fingerprint(tls_sock.getpeercert(binary_form=True) or b"")
+
+
+def tls_context(tls: Mapping[str, Any]) -> ssl.SSLContext:
+    if tls.get("fingerprint") or tls.get("verify") is False:
+        # The pinned fingerprint is checked after the handshake instead
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+    return ssl.create_default_context(cafile=tls.get("ca_file"))
+
+
+class RedfishClient:
+    """
+    Keep-alive HTTP(S) connections to one BMC with a reused session token.
+
+    Requests from several threads share the pool; a connection the BMC
+    closed while idle is replaced transparently. The session is created on
+    first use and again only if the BMC expires it (401).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: Optional[str],
+        *,
+        scheme: Optional[str] = None,
+        tls: Optional[Mapping[str, Any]] = None,
+        max_idle: int = MAX_IDLE_CONNECTIONS,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password or ""
+        self.scheme = scheme or SCHEME
+        self.tls = dict(tls or {})
+        self.max_idle = max_idle
+        self._ssl: Optional[ssl.SSLContext] = None
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._session_uri: Optional[str] = None
+        self._basic_auth = False
+        self._members: Dict[str, str] = {}
+        self.connections_opened = 0
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        if self.scheme != "https":
+            return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        if self._ssl is None:
+            self._ssl = tls_context(self.tls)
+        conn = http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=self._ssl)
+        pinned = self.tls.get("fingerprint")
+        if pinned:
+            conn.connect()
+            got = cert_fingerprint(conn.sock.getpeercert(binary_form=True) or b"")
+            if got != normalize_fingerprint(pinned):
+                conn.close()
+                raise RedfishError(f"certificate fingerprint mismatch: got {got}")
+        return conn
+
+    def _send(
+        self, method: str, path: str, body: Optional[Dict[str, Any]], headers: Dict[str, str], timeout: float
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        hdrs = {"Accept": "application/json", **headers}
+        if payload is not None:
+            hdrs["Content-Type"] = "application/json"
+        for attempt in range(2):
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = self._connect(timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            try:
+                conn.request(method, path, body=payload, headers=hdrs)
+                resp = conn.getresponse()
+                data = resp.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # keep-alive connection closed by the BMC while idle
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                with self._lock:
+                    if len(self._idle) < self.max_idle:
+                        self._idle.append(conn)
+                        conn = None
+                if conn is not None:
+                    conn.close()
+            return resp.status, {k.lower(): v for k, v in resp.getheaders()}, data
+        raise RedfishError("connection closed")  # pragma: no cover - loop always returns or raises
+
+    def _login(self, timeout: float) -> None:
+        status, headers, _ = self._send(
+            "POST",
+            "/redfish/v1/SessionService/Sessions",
+            {"UserName": self.user, "Password": self.password},
+            {},
+            timeout,
+        )
+        if status in (200, 201) and "x-auth-token" in headers:
+            self._token = headers["x-auth-token"]
+            self._session_uri = headers.get("location")
+            self._basic_auth = False
+        elif status in (404, 405, 501):
+            self._basic_auth = True  # no session service: authenticate every request
+        else:
+            raise RedfishError(f"login failed: HTTP {status} {http.client.responses.get(status, '')}".rstrip())
+
+    def _auth_headers(self) -> Dict[str, str]:
+        if self._basic_auth:
+            cred = base64.b64encode(f"{self.user}:{self.password}".encode("utf-8")).decode("ascii")
+            return {"Authorization": f"Basic {cred}"}
+        return {"X-Auth-Token": self._token or ""}
+
+    def request(
+        self, method: str, path: str, body: Optional[Dict[str, Any]] = None, *, timeout: float = 30
+    ) -> Tuple[int, Any]:
+        """Authenticated request; return (HTTP status, decoded JSON body or None)."""
+        used: Optional[str] = None
+        for attempt in range(2):
+            with self._login_lock:
+                # Log in on first use, or again if the token just refused is
+                # still the current one (another thread may have renewed it).
+                if not self._basic_auth and (self._token is None or self._token == used):
+                    self._login(timeout)
+                headers = self._auth_headers()
+                used = self._token
+            status, _, data = self._send(method, path, body, headers, timeout)
+            if status == 401 and attempt == 0 and not self._basic_auth:
+                continue  # session expired
+            break
+        try:
+            decoded = json.loads(data) if data else None
+        except ValueError:
+            decoded = None
+        return status, decoded
+
+    def get(self, path: str, timeout: float) -> Dict[str, Any]:
+        status, doc = self.request("GET", path, timeout=timeout)
+        if status != 200 or not isinstance(doc, dict):
+            raise RedfishError(f"GET {path}: HTTP {status}")
+        return doc
+
+    def member(self, collection: str, timeout: float) -> str:
+        """URI of the first member of /redfish/v1/<collection> (cached)."""
+        uri = self._members.get(collection)
+        if uri is None:
+            members = self.get(f"/redfish/v1/{collection}", timeout).get("Members") or []
+            if not members:
+                raise RedfishError(f"no {collection} member")
+            uri = self._members[collection] = members[0]["@odata.id"]
+        return uri
+
+    def close(self, timeout: float = 5) -> None:
+        if self._session_uri:
+            try:
+                self._send("DELETE", self._session_uri, None, self._auth_headers(), timeout)
+            except (OSError, http.client.HTTPException):
+                pass
+        self._token = self._session_uri = None
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_clients: Dict[Tuple[str, int, str], RedfishClient] = {}
+_clients_lock = threading.Lock()
+
+
+def redfish_port(port: int) -> int:
+    """The IPMI default port means "not set": use HTTPS's."""
+    return HTTPS_PORT if port == DEFAULT_PORT else port
+
+
+def get_client(host: str, user: str, password: Optional[str], port: int) -> RedfishClient:
+    key = (host, redfish_port(port), user)
+    tls = tls_settings(host)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None or client.password != (password or "") or client.tls != tls:
+            client = _clients[key] = RedfishClient(host, key[1], user, password, tls=tls)
+        return client
+
+
+@atexit.register
+def close_all() -> None:
+    """Log out of every session: BMCs only allow a few at once."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for c in clients:
+        c.close()
+
+
+# --- ipmitool-compatible operations ----------------------------------------
+
+def _fmt(v: Optional[float]) -> str:
+    return "na" if v is None else f"{float(v):.3f}"
+
+
+def _power_state(c: RedfishClient, timeout: float) -> str:
+    state = str(c.get(c.member("Systems", timeout), timeout).get("PowerState", "")).lower()
+    # Transitional states report the state the host is still in, as IPMI does
+    return {"on": "on", "poweringoff": "on", "off": "off", "poweringon": "off"}.get(state, "unknown")
+
+
+def _power(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    mode = args[2] if len(args) > 2 else "status"
+    if mode == "status":
+        return f"Chassis Power is {_power_state(c, timeout)}"
+    if mode not in _RESET_TYPES:
+        raise RedfishError(f"unsupported power mode {mode}")
+    system = c.get(c.member("Systems", timeout), timeout)
+    action = system.get("Actions", {}).get("#ComputerSystem.Reset", {})
+    target = action.get("target", f"{system['@odata.id']}/Actions/ComputerSystem.Reset")
+    allowed = action.get("ResetType@Redfish.AllowableValues")
+    reset = next((r for r in _RESET_TYPES[mode] if allowed is None or r in allowed), _RESET_TYPES[mode][0])
+    status, _ = c.request("POST", target, {"ResetType": reset}, timeout=timeout)
+    if status not in (200, 202, 204):
+        raise RedfishError(f"{reset}: HTTP {status}")
+    return f"Chassis Power Control: {reset}"
+
+
+def _bootdev(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    device = args[2] if len(args) > 2 else ""
+    if device not in _BOOT_TARGETS:
+        raise RedfishError(f"boot device {device} has no Redfish equivalent")
+    opts: List[str] = []
+    for a in args[3:]:
+        if a.startswith("options="):
+            opts += a[len("options="):].split(",")
+    boot = {
+        "BootSourceOverrideTarget": _BOOT_TARGETS[device],
+        "BootSourceOverrideEnabled": "Continuous" if "persistent" in opts else "Once",
+    }
+    if "efiboot" in opts:
+        boot["BootSourceOverrideMode"] = "UEFI"
+    status, _ = c.request("PATCH", c.member("Systems", timeout), {"Boot": boot}, timeout=timeout)
+    if status not in (200, 202, 204):
+        raise RedfishError(f"boot override: HTTP {status}")
+    return f"Set Boot Device to {device}"
+
+
+def _readings(c: RedfishClient, timeout: float) -> List[Tuple[str, float, str, str, Optional[float], Optional[float]]]:
+    """(name, value, unit, status, lower critical, upper critical) of every numeric sensor."""
+    chassis = c.member("Chassis", timeout)
+    rows = []
+    thermal = c.get(f"{chassis}/Thermal", timeout)
+    for t in thermal.get("Temperatures", []):
+        rows.append((t.get("Name"), t.get("ReadingCelsius"), "degrees C", t))
+    for f in thermal.get("Fans", []):
+        unit = "RPM" if f.get("ReadingUnits", "RPM") == "RPM" else "percent"
+        rows.append((f.get("Name") or f.get("FanName"), f.get("Reading"), unit, f))
+    power = c.get(f"{chassis}/Power", timeout)
+    for v in power.get("Voltages", []):
+        rows.append((v.get("Name"), v.get("ReadingVolts"), "Volts", v))
+    for p in power.get("PowerControl", []):
+        rows.append((p.get("Name") or "Power Consumption", p.get("PowerConsumedWatts"), "Watts", p))
+    out = []
+    for name, value, unit, doc in rows:
+        if name is None or value is None:
+            continue
+        health = (doc.get("Status") or {}).get("Health", "OK")
+        out.append(
+            (name, float(value), unit, _HEALTH_STATUS.get(health, "ok"),
+             doc.get("LowerThresholdCritical"), doc.get("UpperThresholdCritical"))
+        )
+    return out
+
+
+def _sensor(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    # `ipmitool sensor` columns: name | value | unit | status | lnr | lcr | lnc | unc | ucr | unr
+    return "\n".join(
+        f"{name:<16} | {_fmt(v)} | {unit} | {st} | na | {_fmt(lcr)} | na | na | {_fmt(ucr)} | na"
+        for name, v, unit, st, lcr, ucr in _readings(c, timeout)
+    )
+
+
+def _sdr(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    return "\n".join(f"{name:<16} | {v:g} {unit} | {st}" for name, v, unit, st, _, _ in _readings(c, timeout))
+
+
+def _dcmi(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    power = c.get(f"{c.member('Chassis', timeout)}/Power", timeout)
+    for p in power.get("PowerControl", []):
+        if p.get("PowerConsumedWatts") is not None:
+            return f"    Instantaneous power reading:                 {p['PowerConsumedWatts']:g} Watts"
+    raise RedfishError("no power reading")
+
+
+def _kv(pairs: Sequence[Tuple[str, Any]]) -> str:
+    return "\n".join(f" {k:<22}: {v}" for k, v in pairs if v not in (None, ""))
+
+
+def _mc_info(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    manager = c.get(c.member("Managers", timeout), timeout)
+    system = c.get(c.member("Systems", timeout), timeout)
+    return _kv([
+        ("Firmware Revision", manager.get("FirmwareVersion")),
+        ("Manufacturer Name", system.get("Manufacturer")),
+        ("Product Name", system.get("Model")),
+    ])
+
+
+def _fru(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    system = c.get(c.member("Systems", timeout), timeout)
+    chassis = c.get(c.member("Chassis", timeout), timeout)
+    return _kv([
+        ("Board Mfg", chassis.get("Manufacturer")),
+        ("Board Product", chassis.get("Model")),
+        ("Board Serial", chassis.get("SerialNumber")),
+        ("Board Part Number", chassis.get("PartNumber")),
+        ("Product Manufacturer", system.get("Manufacturer")),
+        ("Product Name", system.get("Model")),
+        ("Product Part Number", system.get("SKU")),
+        ("Product Serial", system.get("SerialNumber")),
+        ("Product Version", system.get("BiosVersion")),
+    ])
+
+
+def _chassis_status(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    chassis = c.get(c.member("Chassis", timeout), timeout)
+    intrusion = (chassis.get("PhysicalSecurity") or {}).get("IntrusionSensor")
+    return _kv([
+        ("System Power", _power_state(c, timeout)),
+        ("Chassis Intrusion", "active" if intrusion == "HardwareIntrusion" else "inactive"),
+    ])
+
+
+def _lan_print(c: RedfishClient, args: Sequence[str], timeout: float) -> str:
+    nics = c.get(f"{c.member('Managers', timeout)}/EthernetInterfaces", timeout).get("Members") or []
+    if not nics:
+        raise RedfishError("no manager network interface")
+    nic = c.get(nics[0]["@odata.id"], timeout)
+    v4 = (nic.get("IPv4Addresses") or [{}])[0]
+    return _kv([
+        ("IP Address Source", v4.get("AddressOrigin")),
+        ("IP Address", v4.get("Address")),
+        ("Subnet Mask", v4.get("SubnetMask")),
+        ("MAC Address", (nic.get("MACAddress") or "").lower()),
+        ("Default Gateway IP", v4.get("Gateway")),
+    ])
+
+
+_OPERATIONS: List[Tuple[Tuple[str, ...], Callable[[RedfishClient, Sequence[str], float], str]]] = [
+    (("chassis", "power"), _power),
+    (("chassis", "bootdev"), _bootdev),
+    (("chassis", "status"), _chassis_status),
+    (("sensor",), _sensor),
+    (("sdr",), _sdr),
+    (("dcmi", "power", "reading"), _dcmi),
+    (("mc", "info"), _mc_info),
+    (("fru",), _fru),
+    (("lan", "print"), _lan_print),
+]
+
+
+def run(
+    host: str, user: str, password: Optional[str], port: int, timeout: int, args: Sequence[str]
+) -> Tuple[int, str, str]:
+    """Run ipmitool-style `args` over Redfish; same (rc, stdout, stderr) contract as run_cmd."""
+    op = next((fn for prefix, fn in _OPERATIONS if tuple(args[: len(prefix)]) == prefix), None)
+    if op is None:
+        return 1, "", f"not supported over Redfish: {' '.join(args)}"
+    start, t0 = time.time(), time.monotonic()
+    rc, out, err = _run_op(op, get_client(host, user, password, port), args, timeout, host)
+    profiler.record(host, " ".join(args), start, 0.0, time.monotonic() - t0, rc, len(out), len(err))
+    return rc, out, err
+
+
+def _run_op(
+    op: Callable[[RedfishClient, Sequence[str], float], str],
+    client: RedfishClient,
+    args: Sequence[str],
+    timeout: int,
+    host: str,
+) -> Tuple[int, str, str]:
+    try:
+        return 0, op(client, args, timeout), ""
+    except socket.timeout:
+        return 124, "", "timeout"
+    except ssl.SSLCertVerificationError as exc:
+        return 1, "", f"TLS certificate of {host} not trusted ({exc.verify_message}); see ipmi-menu redfish-tls"
+    except RedfishError as exc:
+        return 1, "", str(exc)
+    except (OSError, http.client.HTTPException, ValueError, KeyError) as exc:
+        logger.debug("Redfish %s %s failed: %r", host, " ".join(args), exc)
+        return 1, "", f"Redfish error: {exc}"
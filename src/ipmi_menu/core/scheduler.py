@@ -0,0 +1,79 @@
+"""Shared timer scheduler for polling many BMCs."""
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger("ipmi_menu")
+
+
+class Scheduler:
+    """
+    Run callables at given monotonic times on a bounded worker pool.
+
+    A single dispatcher thread owns the timer heap, so thousands of pending
+    polls cost one heap entry each instead of one sleeping thread each.
+    """
+
+    def __init__(self, max_workers: int = 32) -> None:
+        self._heap: List[Tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self._cv = threading.Condition()
+        self._stopped = False
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ipmi-sched")
+        self._thread = threading.Thread(target=self._loop, name="ipmi-scheduler", daemon=True)
+        self._thread.start()
+
+    def call_at(self, when: float, fn: Callable[[], None]) -> None:
+        """Schedule fn to run at time.monotonic() value `when`."""
+        with self._cv:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (when, next(self._seq), fn))
+            self._cv.notify()
+
+    def call_later(self, delay: float, fn: Callable[[], None]) -> None:
+        self.call_at(time.monotonic() + max(0.0, delay), fn)
+
+    def _run(self, fn: Callable[[], None]) -> None:
+        try:
+            fn()
+        except Exception:
+            logger.exception("Scheduled job failed")
+
+    def _loop(self) -> None:
+        while True:
+            with self._cv:
+                while not self._stopped:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cv.wait(self._heap[0][0] - now if self._heap else None)
+                if self._stopped:
+                    return
+                _, _, fn = heapq.heappop(self._heap)
+            try:
+                self._pool.submit(self._run, fn)
+            except RuntimeError:
+                return
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Drop pending timers and stop the worker pool."""
+        with self._cv:
+            self._stopped = True
+            self._heap.clear()
+            self._cv.notify_all()
+        self._thread.join()
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, *exc: object) -> Optional[bool]:
+        self.shutdown()
+        return None
@@ -0,0 +1,268 @@
+"""System Event Log reading with an incremental local cache."""
+from __future__ import annotations
+
+import calendar
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+
+from .ipmi import ipmi, parse_kv
+
+SEL_DB = CONFIG_DIR / "sel.db"
+
+SEVERITY_INFO = 0
+SEVERITY_WARNING = 1
+SEVERITY_CRITICAL = 2
+SEVERITY_NAMES = {SEVERITY_INFO: "info", SEVERITY_WARNING: "warning", SEVERITY_CRITICAL: "critical"}
+
+# Checked in order, so that "non-critical" is matched before "critical" and
+# "uncorrectable" before "correctable".
+_SEVERITY_RULES: List[Tuple[str, int]] = [
+    ("non-critical", SEVERITY_WARNING),
+    ("uncorrectable", SEVERITY_CRITICAL),
+    ("non-recoverable", SEVERITY_CRITICAL),
+    ("critical", SEVERITY_CRITICAL),
+    ("failure", SEVERITY_CRITICAL),
+    ("fault", SEVERITY_CRITICAL),
+    ("error", SEVERITY_CRITICAL),
+    ("correctable", SEVERITY_WARNING),
+    ("predictive", SEVERITY_WARNING),
+    ("degraded", SEVERITY_WARNING),
+    ("warning", SEVERITY_WARNING),
+]
+
+
+@dataclass
+class SelInfo:
+    entries: int
+    last_add: str
+    last_del: str
+
+
+@dataclass
+class SelEntry:
+    record_id: int
+    timestamp: Optional[int]
+    severity: int
+    sensor: str
+    event: str
+    direction: str
+
+    @property
+    def severity_name(self) -> str:
+        return SEVERITY_NAMES.get(self.severity, "info")
+
+
+@dataclass
+class SelSyncResult:
+    ok: bool
+    new: int
+    full: bool
+    error: str = ""
+
+
+def classify_severity(text: str) -> int:
+    t = text.lower()
+    for needle, sev in _SEVERITY_RULES:
+        if needle in t:
+            return sev
+    return SEVERITY_INFO
+
+
+def parse_sel_info(text: str) -> SelInfo:
+    kv = parse_kv(text)
+    try:
+        entries = int(kv.get("entries", "0"))
+    except ValueError:
+        entries = 0
+    return SelInfo(entries=entries, last_add=kv.get("last add time", ""), last_del=kv.get("last del time", ""))
+
+
+def _parse_timestamp(date: str, clock: str) -> Optional[int]:
+    try:
+        return calendar.timegm(time.strptime(f"{date} {clock}", "%m/%d/%Y %H:%M:%S"))
+    except ValueError:
+        return None
+
+
+def parse_sel_elist(text: str) -> List[SelEntry]:
+    """
+    Parse `sel elist` lines such as
+    `  1a | 05/20/2021 | 10:22:33 | Temperature #0x30 | Upper Critical going high | Asserted`.
+    """
+    entries: List[SelEntry] = []
+    for ln in text.splitlines():
+        parts = [p.strip() for p in ln.split("|")]
+        if len(parts) < 5:
+            continue
+        try:
+            record_id = int(parts[0], 16)
+        except ValueError:
+            continue
+        sensor, event = parts[3], parts[4]
+        direction = parts[5] if len(parts) > 5 else ""
+        entries.append(
+            SelEntry(
+                record_id=record_id,
+                timestamp=_parse_timestamp(parts[1], parts[2]),
+                severity=classify_severity(f"{sensor} {event}"),
+                sensor=sensor,
+                event=event,
+                direction=direction,
+            )
+        )
+    return entries
+
+
+class SelStore:
+    """
+    SQLite cache of SEL entries for many hosts.
+
+    Rows are keyed by (host, record_id) and indexed by severity and time, so
+    filtered queries never touch the BMC nor scan other hosts' entries.
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None) -> None:
+        self.path = Path(path) if path is not None else SEL_DB
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS sel_state (
+                host TEXT PRIMARY KEY,
+                entries INTEGER NOT NULL,
+                last_add TEXT NOT NULL,
+                last_del TEXT NOT NULL,
+                last_id INTEGER NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sel (
+                host TEXT NOT NULL,
+                record_id INTEGER NOT NULL,
+                ts INTEGER,
+                severity INTEGER NOT NULL,
+                sensor TEXT NOT NULL,
+                event TEXT NOT NULL,
+                direction TEXT NOT NULL,
+                PRIMARY KEY (host, record_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sel_by_severity ON sel (host, severity, ts);
+            CREATE INDEX IF NOT EXISTS sel_by_time ON sel (host, ts);
+            """
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def state(self, host: str) -> Optional[Tuple[SelInfo, int]]:
+        """Return the SEL info seen at the last sync and the last record id stored."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT entries, last_add, last_del, last_id FROM sel_state WHERE host = ?", (host,)
+            ).fetchone()
+        if row is None:
+            return None
+        return SelInfo(row[0], row[1], row[2]), row[3]
+
+    def store(self, host: str, info: SelInfo, entries: Iterable[SelEntry], *, replace: bool) -> int:
+        rows = [(host, e.record_id, e.timestamp, e.severity, e.sensor, e.event, e.direction) for e in entries]
+        with self._lock, self._db:
+            if replace:
+                self._db.execute("DELETE FROM sel WHERE host = ?", (host,))
+            self._db.executemany("INSERT OR REPLACE INTO sel VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            last_id = self._db.execute(
+                "SELECT COALESCE(MAX(record_id), 0) FROM sel WHERE host = ?", (host,)
+            ).fetchone()[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO sel_state VALUES (?, ?, ?, ?, ?, ?)",
+                (host, info.entries, info.last_add, info.last_del, last_id, time.time()),
+            )
+        return len(rows)
+
+    def query(
+        self,
+        host: str,
+        *,
+        min_severity: int = SEVERITY_INFO,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[SelEntry]:
+        """Entries of `host`, most recent first."""
+        sql = "SELECT record_id, ts, severity, sensor, event, direction FROM sel WHERE host = ?"
+        params: List[object] = [host]
+        if min_severity > SEVERITY_INFO:
+            sql += " AND severity >= ?"
+            params.append(min_severity)
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND ts <= ?"
+            params.append(until)
+        sql += " ORDER BY record_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [SelEntry(*row) for row in rows]
+
+
+def sync_sel(
+    host: str,
+    user: str,
+    password: Optional[str],
+    interface: str,
+    port: int,
+    timeout: int,
+    store: SelStore,
+) -> SelSyncResult:
+    """
+    Bring the cached SEL of `host` up to date.
+
+    `sel info` is compared with the state of the last sync: unchanged means
+    nothing to fetch, more entries means only `sel elist last <n>` is read.
+    A delete/clear (last del time changed, fewer entries) or a wrapped SEL
+    (same count, new add time) forces a full re-read.
+    """
+    rc, out, err = ipmi(host, user, password, interface, port, timeout, ["sel", "info"])
+    if rc != 0:
+        return SelSyncResult(False, 0, False, err or out)
+    info = parse_sel_info(out)
+
+    prev = store.state(host)
+    full = True
+    delta = 0
+    if prev is not None:
+        old, _ = prev
+        if info.last_del == old.last_del and info.entries >= old.entries:
+            if info.entries == old.entries and info.last_add == old.last_add:
+                store.store(host, info, [], replace=False)
+                return SelSyncResult(True, 0, False)
+            delta = info.entries - old.entries
+            full = delta <= 0
+
+    if not full:
+        rc, out, err = ipmi(host, user, password, interface, port, timeout, ["sel", "elist", "last", str(delta)])
+        entries = parse_sel_elist(out) if rc == 0 else []
+        _, last_id = prev  # type: ignore[misc]
+        # Record ids are normally increasing; anything else means we lost track.
+        if rc == 0 and all(e.record_id > last_id for e in entries):
+            return SelSyncResult(True, store.store(host, info, entries, replace=False), False)
+        full = True
+
+    if info.entries == 0:
+        store.store(host, info, [], replace=True)
+        return SelSyncResult(True, 0, True)
+    rc, out, err = ipmi(host, user, password, interface, port, timeout, ["sel", "elist"])
+    if rc != 0:
+        return SelSyncResult(False, 0, True, err or out)
+    return SelSyncResult(True, store.store(host, info, parse_sel_elist(out), replace=True), True)
@@ -0,0 +1,92 @@
+"""
+Sharded execution of per-host work over several processes.
+
+Threads are enough to wait on ipmitool, but parsing its output runs under
+one GIL. run_sharded() cuts the targets into shards and hands them to a
+process pool; every process runs its shard on its own thread pool, so a
+50k host job keeps all cores busy parsing while each core keeps a bounded
+number of BMC requests in flight.
+"""
+from __future__ import annotations
+
+import math
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from . import transcript
+from .fleet import Target
+from .ipmi import host_cipher, set_host_cipher
+from .transcript import TranscriptBuffer
+
+R = TypeVar("R")
+
+# Upper bound of a shard: smaller shards balance better and stream results sooner.
+MAX_SHARD_SIZE = 500
+
+
+def shard(items: Sequence[Target], size: int) -> List[List[Target]]:
+    size = max(1, size)
+    return [list(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+def _run_shard(
+    fn: Callable[[Target], R],
+    targets: List[Target],
+    workers: int,
+    ciphers: Dict[str, int],
+    recording: Optional[float],
+) -> Tuple[List[R], List[dict]]:
+    """Results of the shard, and the ipmitool calls it made when the parent records a transcript."""
+    # Cipher suites negotiated by the parent live in a module global: restate them here
+    for host, cipher in ciphers.items():
+        set_host_cipher(host, cipher)
+    # A forked child inherits the parent's recorder and its open file: never write to it
+    buffer = TranscriptBuffer(recording) if recording is not None else None
+    transcript.set_recorder(buffer)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(fn, targets))
+    finally:
+        transcript.set_recorder(None)
+    return results, buffer.records if buffer is not None else []
+
+
+def run_sharded(
+    fn: Callable[[Target], R],
+    targets: Sequence[Target],
+    *,
+    processes: int = 1,
+    workers: int = 8,
+    shard_size: Optional[int] = None,
+) -> Iterator[R]:
+    """
+    Yield fn(target) for every target, a shard at a time as shards finish.
+    `fn` must be picklable (a module-level function) when `processes` > 1;
+    with a single process everything runs on one thread pool, in order.
+    `workers` is the thread count of each process.
+    """
+    if processes <= 1 or len(targets) <= 1:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            yield from pool.map(fn, targets)
+        return
+
+    size = shard_size or min(MAX_SHARD_SIZE, math.ceil(len(targets) / (processes * 4)))
+    recorder = transcript.recorder()
+    recording = recorder.started if recorder is not None else None
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending: Set[Future] = set()
+        for part in shard(targets, size):
+            ciphers = {t.host: host_cipher(t.host) for t in part}
+            ciphers = {h: c for h, c in ciphers.items() if c is not None}
+            pending.add(pool.submit(_run_shard, fn, part, workers, ciphers, recording))
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    results, calls = fut.result()
+                    if calls and recorder is not None:
+                        recorder.add(calls)
+                    yield from results
+        finally:
+            for fut in pending:
+                fut.cancel()
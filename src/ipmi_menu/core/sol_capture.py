@@ -0,0 +1,289 @@
+"""Capture many SOL consoles at once, with interactive attach."""
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+import re
+import select
+import selectors
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from ipmi_menu.config.preferences import CONFIG_DIR
+
+try:
+    import pty
+    import termios
+    import tty
+except ImportError:  # pragma: no cover - not available on Windows
+    pty = None  # type: ignore[assignment]
+
+logger = logging.getLogger("ipmi_menu")
+
+SOL_LOG_DIR = CONFIG_DIR / "sol"
+
+# Ctrl-] detaches from an attached console (ipmitool's own "~." would end the session)
+DETACH_KEY = b"\x1d"
+
+_FLUSH_INTERVAL = 1.0
+
+
+class RotatingLog:
+    """
+    Console log of one host: `<name>.log` is appended to and, once it exceeds
+    `max_bytes`, gzipped to `<name>.<timestamp>.log.gz`. Only the `keep`
+    most recent compressed segments are kept.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        name: str,
+        *,
+        max_bytes: int = 16 * 1024 * 1024,
+        keep: int = 20,
+        compressor: Optional[ThreadPoolExecutor] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self._compressor = compressor
+        self.path = self.directory / f"{name}.log"
+        self._f = open(self.path, "ab")
+        self._size = self._f.tell()
+
+    def write(self, data: bytes) -> None:
+        self._f.write(data)
+        self._size += len(data)
+        if self._size >= self.max_bytes:
+            self.rotate()
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def segments(self) -> List[Path]:
+        """Compressed segments, oldest first."""
+        # Anchored: a glob on `<name>.*` would also match hosts named `<name>.<x>`
+        pattern = re.compile(re.escape(self.name) + r"\.\d+\.log\.gz")
+        return sorted(p for p in self.directory.glob(f"{self.name}.*.log.gz") if pattern.fullmatch(p.name))
+
+    def rotate(self) -> None:
+        self._f.close()
+        # Nanosecond suffix keeps names unique and sortable even for fast rotations.
+        rotated = self.directory / f"{self.name}.{time.time_ns()}.log"
+        os.replace(self.path, rotated)
+        self._f = open(self.path, "ab")
+        self._size = 0
+        if self._compressor is not None:
+            self._compressor.submit(self._compress, rotated)
+        else:
+            self._compress(rotated)
+
+    def _compress(self, path: Path) -> None:
+        with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.unlink(path)
+        for old in self.segments()[:-self.keep] if self.keep > 0 else []:
+            old.unlink()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+@dataclass
+class SolSession:
+    name: str
+    cmd: List[str]
+    log: RotatingLog
+    buffer_bytes: int
+    fd: int = -1
+    proc: Optional[subprocess.Popen] = None
+    buffer: bytearray = field(default_factory=bytearray)
+    received: int = 0
+    returncode: Optional[int] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.returncode is None
+
+    def feed(self, data: bytes) -> None:
+        self.received += len(data)
+        self.log.write(data)
+        self.buffer += data
+        if len(self.buffer) > self.buffer_bytes:
+            del self.buffer[: len(self.buffer) - self.buffer_bytes]
+
+
+class SolCapture:
+    """
+    Run many console commands (normally `ipmitool sol activate`) on ptys and
+    multiplex their output through a single selector thread.
+
+    Each console goes to its own RotatingLog; only the last `buffer_bytes`
+    of each stay in memory, to be replayed when the user attaches.
+    """
+
+    def __init__(
+        self,
+        commands: Dict[str, List[str]],
+        log_dir: Union[str, Path, None] = None,
+        *,
+        buffer_bytes: int = 64 * 1024,
+        max_log_bytes: int = 16 * 1024 * 1024,
+        keep: int = 20,
+    ) -> None:
+        if pty is None:
+            raise RuntimeError("SOL capture needs pseudo-terminal support")
+        self.log_dir = Path(log_dir) if log_dir is not None else SOL_LOG_DIR
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sol-gzip")
+        self.sessions: Dict[str, SolSession] = {
+            name: SolSession(
+                name,
+                cmd,
+                RotatingLog(self.log_dir, name, max_bytes=max_log_bytes, keep=keep, compressor=self._compressor),
+                buffer_bytes,
+            )
+            for name, cmd in commands.items()
+        }
+        self._by_fd: Dict[int, SolSession] = {}
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._attached: Optional[SolSession] = None
+        self._attached_out: int = 1
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="sol-capture", daemon=True)
+
+    def start(self) -> None:
+        for s in self.sessions.values():
+            master, slave = pty.openpty()
+            try:
+                s.proc = subprocess.Popen(
+                    s.cmd, stdin=slave, stdout=slave, stderr=slave, start_new_session=True
+                )
+            except FileNotFoundError:
+                os.close(master)
+                s.returncode = 127
+                continue
+            finally:
+                os.close(slave)
+            s.fd = master
+            self._by_fd[master] = s
+            self._sel.register(master, selectors.EVENT_READ)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            if not self._sel.get_map():
+                self._stop.wait(0.2)
+                continue
+            for key, _ in self._sel.select(0.2):
+                s = self._by_fd[key.fd]
+                try:
+                    data = os.read(key.fd, 65536)
+                except OSError:
+                    data = b""
+                if not data:
+                    with self._lock:
+                        self._release(s)
+                    self._reap(s)
+                    continue
+                with self._lock:
+                    s.feed(data)
+                    if self._attached is s:
+                        os.write(self._attached_out, data)
+            now = time.monotonic()
+            if now - last_flush >= _FLUSH_INTERVAL:
+                with self._lock:
+                    for s in self.sessions.values():
+                        s.log.flush()
+                last_flush = now
+
+    def _release(self, s: SolSession) -> None:
+        """Close the pty of an ended console; the caller holds the lock."""
+        self._sel.unregister(s.fd)
+        os.close(s.fd)
+        del self._by_fd[s.fd]
+        s.fd = -1
+
+    def _reap(self, s: SolSession) -> None:
+        # Waiting for the process outside the lock keeps attach/send responsive
+        rc = s.proc.wait() if s.proc is not None else s.returncode
+        with self._lock:
+            s.returncode = rc
+            s.log.flush()
+        logger.debug("SOL console %s ended (rc=%s)", s.name, rc)
+
+    def send(self, name: str, data: bytes) -> None:
+        s = self.sessions[name]
+        with self._lock:
+            if s.fd >= 0:
+                os.write(s.fd, data)
+
+    def attach(self, name: str, stdin_fd: int = 0, stdout_fd: int = 1) -> None:
+        """
+        Show one console live and forward keystrokes to it until DETACH_KEY
+        is pressed or the session ends. Other consoles keep being captured.
+        """
+        s = self.sessions[name]
+        old_attrs = termios.tcgetattr(stdin_fd) if os.isatty(stdin_fd) else None
+        with self._lock:
+            os.write(stdout_fd, bytes(s.buffer))
+            self._attached, self._attached_out = s, stdout_fd
+        try:
+            if old_attrs is not None:
+                tty.setraw(stdin_fd)
+            while s.alive:
+                r, _, _ = select.select([stdin_fd], [], [], 0.2)
+                if not r:
+                    continue
+                data = os.read(stdin_fd, 1024)
+                if not data or DETACH_KEY in data:
+                    head = data.split(DETACH_KEY, 1)[0]
+                    if head:
+                        self.send(name, head)
+                    break
+                self.send(name, data)
+        finally:
+            with self._lock:
+                self._attached = None
+            if old_attrs is not None:
+                termios.tcsetattr(stdin_fd, termios.TCSADRAIN, old_attrs)
+
+    def stop(self, grace: float = 2.0) -> None:
+        """Terminate all consoles, then close logs."""
+        for s in self.sessions.values():
+            if s.proc is not None and s.proc.poll() is None:
+                s.proc.terminate()
+        deadline = time.monotonic() + grace
+        for s in self.sessions.values():
+            if s.proc is None:
+                continue
+            try:
+                s.proc.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                s.proc.kill()
+                s.proc.wait()
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        with self._lock:
+            ended = [s for s in self.sessions.values() if s.fd >= 0]
+            for s in ended:
+                self._release(s)
+        for s in ended:
+            self._reap(s)
+        with self._lock:
+            for s in self.sessions.values():
+                s.log.close()
+        self._sel.close()
+        self._compressor.shutdown(wait=True)
@@ -0,0 +1,252 @@
+"""Boot-aware inverted index over captured SOL console logs."""
+from __future__ import annotations
+
+import gzip
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+_ANSI_RE = re.compile(rb"\x1b\[[0-9;?]*[A-Za-z]|\x1b[()][A-Za-z0-9]|\x1b[=>78]")
+_TOKEN_RE = re.compile(r"[a-z0-9_]{2,}")
+# Rotated segments carry a nanosecond timestamp, never mistaken for an IP octet
+_GZ_NAME_RE = re.compile(r"^(?P<host>.+)\.(?P<rank>\d{16,})\.log\.gz$")
+# Rotated segment not compressed yet: indexed once it becomes a .gz
+_ROTATING_RE = re.compile(r"\.\d{16,}\.log$")
+
+# Boot stages, in the order a console shows them. A marker of an earlier
+# stage than one already seen in the current segment means a new boot.
+STAGE_FIRMWARE = 0
+STAGE_BOOTLOADER = 1
+STAGE_KERNEL = 2
+_BOOT_MARKERS: List[Tuple[int, "re.Pattern[str]"]] = [
+    (
+        STAGE_FIRMWARE,
+        re.compile(
+            r"american megatrends|aptio setup|insydeh2o|phoenix ?bios|system bios|bios version"
+            r"|press <?(del|f1|f2|f10|f11|f12)>?|lifecycle controller|initializing intel\(r\) boot agent"
+        ),
+    ),
+    (STAGE_BOOTLOADER, re.compile(r"gnu grub|syslinux|pxelinux|ipxe|booting `|loading linux")),
+    (STAGE_KERNEL, re.compile(r"linux version \d|efi stub: ")),
+]
+
+# Non-boot segments are cut at this size so hits stay small to read back.
+MAX_SEGMENT_BYTES = 1024 * 1024
+# Rank of the live `<host>.log` file, after every rotated segment.
+_LIVE_RANK = 2 ** 62
+
+
+@dataclass(frozen=True)
+class Segment:
+    id: int
+    host: str
+    path: str
+    start: int
+    end: int
+    boot: bool
+
+
+def tokenize(text: str) -> Set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def clean_line(raw: bytes) -> str:
+    return _ANSI_RE.sub(b"", raw).decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def boot_stage(line: str) -> Optional[int]:
+    low = line.lower()
+    for stage, pat in _BOOT_MARKERS:
+        if pat.search(low):
+            return stage
+    return None
+
+
+def _open_log(path: Path) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.suffix == ".gz" else open(path, "rb")
+
+
+class SolIndex:
+    """
+    SQLite index of the logs written by `SolCapture`.
+
+    Logs are cut into segments at boot boundaries (firmware banner after a
+    bootloader/kernel was seen, etc.) and every segment's distinct tokens are
+    stored as postings. Queries only touch the index; log files are read back
+    (and decompressed) only for the segments that match.
+    """
+
+    def __init__(self, log_dir: Union[str, Path], db_path: Union[str, Path, None] = None) -> None:
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path or self.log_dir / "index.db"))
+        self._db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                host TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                indexed_bytes INTEGER NOT NULL,
+                stage INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY,
+                host TEXT NOT NULL,
+                path TEXT NOT NULL,
+                rank INTEGER NOT NULL,
+                start INTEGER NOT NULL,
+                end INTEGER NOT NULL,
+                boot INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS segments_by_host ON segments (host, rank, start);
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                PRIMARY KEY (token, segment)
+            ) WITHOUT ROWID;
+            """
+        )
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _log_files(self) -> Iterator[Tuple[Path, str, int]]:
+        for path in self.log_dir.iterdir():
+            m = _GZ_NAME_RE.match(path.name)
+            if m:
+                yield path, m.group("host"), int(m.group("rank"))
+            elif path.name.endswith(".log") and not _ROTATING_RE.search(path.name):
+                yield path, path.name[: -len(".log")], _LIVE_RANK
+
+    def _forget(self, path: str) -> None:
+        self._db.execute(
+            "DELETE FROM postings WHERE segment IN (SELECT id FROM segments WHERE path = ?)", (path,)
+        )
+        self._db.execute("DELETE FROM segments WHERE path = ?", (path,))
+        self._db.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def update(self) -> int:
+        """Index new log data; return the number of bytes read."""
+        total = 0
+        seen: Set[str] = set()
+        # Boot stage reached at the end of each host's previous file, so a
+        # boot split across a rotation is not counted twice.
+        host_stage: Dict[str, int] = {}
+        with self._db:
+            for path, host, rank in sorted(self._log_files(), key=lambda f: f[2]):
+                key = str(path)
+                seen.add(key)
+                st = path.stat()
+                row = self._db.execute(
+                    "SELECT inode, indexed_bytes, stage FROM files WHERE path = ?", (key,)
+                ).fetchone()
+                offset, stage = 0, host_stage.get(host, -1)
+                if row is not None:
+                    inode, indexed, prev_stage = row
+                    if rank != _LIVE_RANK:
+                        host_stage[host] = prev_stage
+                        continue  # rotated segments never change
+                    if inode == st.st_ino and st.st_size >= indexed:
+                        offset, stage = indexed, prev_stage
+                    else:
+                        self._forget(key)  # live log was rotated: start over
+                if rank == _LIVE_RANK and offset == st.st_size:
+                    continue
+                end, stage = self._index_file(path, host, rank, offset, stage)
+                host_stage[host] = stage
+                total += end - offset
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, host, rank, st.st_ino, end, stage),
+                )
+            for (key,) in self._db.execute("SELECT path FROM files").fetchall():
+                if key not in seen:
+                    self._forget(key)
+        return total
+
+    def _index_file(self, path: Path, host: str, rank: int, offset: int, stage: int) -> Tuple[int, int]:
+        """Index complete lines from `offset`; return (new offset, boot stage)."""
+        seg_start = offset
+        seg_boot = False
+        tokens: Set[str] = set()
+
+        def flush(end: int) -> None:
+            if end <= seg_start:
+                return
+            cur = self._db.execute(
+                "INSERT INTO segments (host, path, rank, start, end, boot) VALUES (?, ?, ?, ?, ?, ?)",
+                (host, str(path), rank, seg_start, end, int(seg_boot)),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO postings VALUES (?, ?)", ((t, cur.lastrowid) for t in tokens)
+            )
+
+        pos = offset
+        with _open_log(path) as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n") and rank == _LIVE_RANK:
+                    break  # partial line still being written
+                line = clean_line(raw)
+                marker = boot_stage(line)
+                new_boot = marker is not None and (stage < 0 or marker < stage)
+                if new_boot or pos - seg_start >= MAX_SEGMENT_BYTES:
+                    if pos > seg_start:
+                        flush(pos)
+                        seg_start, tokens = pos, set()
+                    seg_boot = new_boot
+                if new_boot:
+                    stage = marker  # type: ignore[assignment]
+                elif marker is not None:
+                    stage = max(stage, marker)
+                tokens |= tokenize(line)
+                pos += len(raw)
+        flush(pos)
+        return pos, stage
+
+    def _segments(self, where: str, params: Tuple[object, ...]) -> List[Segment]:
+        rows = self._db.execute(
+            f"SELECT id, host, path, start, end, boot FROM segments WHERE {where} ORDER BY host, rank, start",
+            params,
+        ).fetchall()
+        return [Segment(r[0], r[1], r[2], r[3], r[4], bool(r[5])) for r in rows]
+
+    def search(self, query: str, host: Optional[str] = None) -> List[Segment]:
+        """Segments containing every token of `query` (no file is read)."""
+        tokens = sorted(tokenize(query))
+        if not tokens:
+            return []
+        sql = " INTERSECT ".join(["SELECT segment FROM postings WHERE token = ?"] * len(tokens))
+        where = f"id IN ({sql})"
+        params: Tuple[object, ...] = tuple(tokens)
+        if host is not None:
+            where += " AND host = ?"
+            params += (host,)
+        return self._segments(where, params)
+
+    def boots(self, host: str) -> List[Segment]:
+        """Segments that start a boot of `host`, oldest first."""
+        return self._segments("host = ? AND boot = 1", (host,))
+
+    def read_segment(self, seg: Segment) -> List[str]:
+        with _open_log(Path(seg.path)) as f:
+            f.seek(seg.start)
+            data = f.read(seg.end - seg.start)
+        return [clean_line(ln) for ln in data.splitlines()]
+
+    def grep(self, query: str, host: Optional[str] = None) -> Dict[Segment, List[str]]:
+        """Lines containing `query` (case-insensitive), read only from matching segments."""
+        needle = query.lower()
+        out: Dict[Segment, List[str]] = {}
+        for seg in self.search(query, host):
+            try:
+                lines = [ln for ln in self.read_segment(seg) if needle in ln.lower()]
+            except OSError:
+                continue  # rotated away since the last update
+            if lines:
+                out[seg] = lines
+        return out
@@ -0,0 +1,185 @@
+"""
+Record/replay of ipmitool calls.
+
+A recorder captures every command run_cmd executes (sanitised argv,
+timing, exit code and output) to a JSON lines transcript, gzip-compressed
+when the name ends in `.gz`. A player serves such a transcript back in
+place of ipmitool, with the recorded latencies scaled by a factor, so a
+slow or misbehaving BMC can be reproduced and benchmarked offline.
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import IO, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .profiling import describe
+
+logger = logging.getLogger("ipmi_menu")
+
+TRANSCRIPT_VERSION = 1
+
+# ipmitool options whose value is a secret (password, Kg and K keys)
+_SECRET_OPTS = {"-P", "-k", "-K", "-y"}
+
+
+def sanitize(cmd: Sequence[str]) -> List[str]:
+    """argv with the values of secret options replaced by '****'."""
+    out = list(cmd)
+    for i, arg in enumerate(out[:-1]):
+        if arg in _SECRET_OPTS:
+            out[i + 1] = "****"
+    return out
+
+
+def _open(path: Path, mode: str) -> IO[str]:
+    if path.suffix == ".gz":
+        return io.TextIOWrapper(gzip.open(path, mode + "b"), encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _entry(started: float, cmd: Sequence[str], start: float, wall_s: float, rc: int, out: str, err: str) -> dict:
+    host, command = describe(cmd)
+    rec = {"t": round(start - started, 3), "host": host, "cmd": command, "argv": sanitize(cmd),
+           "wall": round(wall_s, 4), "rc": rc}
+    # Empty streams are left out: most calls have no stderr
+    if out:
+        rec["out"] = out
+    if err:
+        rec["err"] = err
+    return rec
+
+
+class TranscriptRecorder:
+    """Appends one JSON line per call; safe to share between threads."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.started = time.time()
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._f: Optional[IO[str]] = _open(self.path, "w")
+        self._write({"transcript": TRANSCRIPT_VERSION, "started": round(self.started, 3)})
+
+    def _write(self, obj: dict) -> None:
+        self._f.write(json.dumps(obj, separators=(",", ":"), ensure_ascii=False) + "\n")  # type: ignore[union-attr]
+
+    def record(self, cmd: Sequence[str], start: float, wall_s: float, rc: int, out: str, err: str) -> None:
+        self.add([_entry(self.started, cmd, start, wall_s, rc, out, err)])
+
+    def add(self, records: Iterable[dict]) -> None:
+        """Write calls recorded elsewhere (a TranscriptBuffer of a worker process)."""
+        with self._lock:
+            if self._f is None:
+                return
+            for rec in records:
+                self._write(rec)
+                self.calls += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+class TranscriptBuffer:
+    """
+    Recorder of a worker process: keeps the calls in memory so the parent,
+    which owns the transcript file, can add() them once the work returns.
+    """
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.records: List[dict] = []
+        self._lock = threading.Lock()
+
+    def record(self, cmd: Sequence[str], start: float, wall_s: float, rc: int, out: str, err: str) -> None:
+        self.add([_entry(self.started, cmd, start, wall_s, rc, out, err)])
+
+    def add(self, records: Iterable[dict]) -> None:
+        with self._lock:
+            self.records.extend(records)
+
+
+class TranscriptPlayer:
+    """
+    Answers commands from a transcript. Calls are matched on (host,
+    command) and served in recorded order; once a host has replayed all
+    its recorded answers to a command, the last one is repeated (polling
+    loops may run longer than the recording). `scale` multiplies the
+    recorded latencies: 1 replays them as recorded, 0 answers at once.
+    """
+
+    def __init__(self, path: Union[str, Path], scale: float = 1.0) -> None:
+        self.path = Path(path)
+        self.scale = max(0.0, scale)
+        self._calls: Dict[Tuple[str, str], List[dict]] = defaultdict(list)
+        self._next: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._lock = threading.Lock()
+        with _open(self.path, "r") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("transcript") != TRANSCRIPT_VERSION:
+                raise ValueError(f"{self.path}: not an ipmi-menu transcript")
+            for lineno, ln in enumerate(f, start=2):
+                if not ln.strip():
+                    continue
+                try:
+                    rec = json.loads(ln)
+                    self._calls[(rec["host"], rec["cmd"])].append(rec)
+                except (ValueError, KeyError) as exc:
+                    raise ValueError(f"{self.path}: line {lineno}: {exc}") from None
+
+    @property
+    def calls(self) -> int:
+        return sum(len(v) for v in self._calls.values())
+
+    def play(self, cmd: Sequence[str], timeout: Optional[int]) -> Tuple[int, str, str]:
+        host, command = describe(cmd)
+        key = (host, command)
+        with self._lock:
+            recs = self._calls.get(key)
+            if not recs:
+                rec = None
+            else:
+                i = self._next[key]
+                rec = recs[min(i, len(recs) - 1)]
+                self._next[key] = i + 1
+        if rec is None:
+            logger.warning("No recorded answer for %s on %s", command, host)
+            return 1, "", f"no recorded answer for '{command}' on {host}"
+        wall = rec["wall"]
+        if timeout and wall > timeout:
+            time.sleep(timeout * self.scale)
+            return 124, "", "timeout"
+        time.sleep(wall * self.scale)
+        return rec["rc"], rec.get("out", ""), rec.get("err", "")
+
+
+_recorder: Optional[Union[TranscriptRecorder, TranscriptBuffer]] = None
+_player: Optional[TranscriptPlayer] = None
+
+
+def set_recorder(recorder: Optional[Union[TranscriptRecorder, TranscriptBuffer]]) -> None:
+    global _recorder
+    _recorder = recorder
+
+
+def set_player(player: Optional[TranscriptPlayer]) -> None:
+    global _player
+    _player = player
+
+
+def recorder() -> Optional[Union[TranscriptRecorder, TranscriptBuffer]]:
+    return _recorder
+
+
+def player() -> Optional[TranscriptPlayer]:
+    return _player
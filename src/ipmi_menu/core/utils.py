@@ -1,8 +1,19 @@
 from __future__ import annotations
 
 import logging
+import os
+import selectors
 import subprocess
-from typing import List, Optional, Tuple
+import time
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import pty
+except ImportError:  # pragma: no cover - not available on Windows
+    pty = None  # type: ignore[assignment]
+
+from . import transcript
+from .profiling import profiler
 
 logger = logging.getLogger("ipmi_menu")
 
@@ -23,20 +34,150 @@ def _sanitize_cmd(cmd: List[str]) -> List[str]:
     return sanitized
 
 
+def _replay(cmd: List[str], timeout: Optional[int]) -> Optional[Tuple[int, str, str]]:
+    """Answer of the transcript player (see core.transcript), None when not replaying."""
+    player = transcript.player()
+    if player is None:
+        return None
+    start, t0 = time.time(), time.monotonic()
+    rc, out, err = player.play(cmd, timeout)
+    profiler.record_cmd(cmd, start, 0.0, time.monotonic() - t0, rc, out, err)
+    return rc, out, err
+
+
+def _finish(cmd: List[str], start: float, t0: float, spawn: float, rc: int, out: str, err: str) -> None:
+    wall = time.monotonic() - t0
+    profiler.record_cmd(cmd, start, spawn, wall, rc, out, err)
+    recorder = transcript.recorder()
+    if recorder is not None:
+        recorder.record(cmd, start, wall, rc, out, err)
+
+
 def run_cmd(cmd: List[str], timeout: Optional[int]) -> Tuple[int, str, str]:
     logger.debug("Running: %s (timeout=%s)", " ".join(_sanitize_cmd(cmd)), timeout)
+    replayed = _replay(cmd, timeout)
+    if replayed is not None:
+        return replayed
+    start, t0 = time.time(), time.monotonic()
+    spawn = 0.0
+    try:
+        p = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        spawn = time.monotonic() - t0
+        try:
+            out, err = p.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.communicate()
+            raise
+        rc, out, err = p.returncode, (out or "").strip(), (err or "").strip()
+    except subprocess.TimeoutExpired:
+        logger.warning("Command timed out after %ss: %s", timeout, " ".join(_sanitize_cmd(cmd)))
+        rc, out, err = 124, "", "timeout"
+    except FileNotFoundError:
+        logger.error("Command not found: %s", cmd[0] if cmd else "<empty>")
+        rc, out, err = 127, "", "command not found"
+    _finish(cmd, start, t0, spawn, rc, out, err)
+    return rc, out, err
+
+
+def run_cmd_stream(cmd: List[str], timeout: Optional[int], on_line: Callable[[str], None]) -> Tuple[int, str, str]:
+    """
+    Like run_cmd, but call on_line() for every stdout line as soon as it is printed.
+
+    stdout is attached to a pseudo-terminal when available: ipmitool (like
+    most stdio programs) block-buffers a pipe and would only flush its first
+    lines after several KiB, or at exit.
+    """
+    logger.debug("Streaming: %s (timeout=%s)", " ".join(_sanitize_cmd(cmd)), timeout)
+    replayed = _replay(cmd, timeout)
+    if replayed is not None:
+        for ln in replayed[1].splitlines():
+            on_line(ln)
+        return replayed
+    start, t0 = time.time(), time.monotonic()
+    master: Optional[int] = None
+    slave: Optional[int] = None
+    if pty is not None:
+        master, slave = pty.openpty()
     try:
-        p = subprocess.run(
+        p = subprocess.Popen(
             cmd,
-            stdout=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            stdout=slave if slave is not None else subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True,
-            timeout=timeout,
         )
-        return p.returncode, (p.stdout or "").strip(), (p.stderr or "").strip()
-    except subprocess.TimeoutExpired:
-        logger.warning("Command timed out after %ss: %s", timeout, " ".join(_sanitize_cmd(cmd)))
-        return 124, "", "timeout"
     except FileNotFoundError:
+        if master is not None:
+            os.close(master)
         logger.error("Command not found: %s", cmd[0] if cmd else "<empty>")
+        _finish(cmd, start, t0, 0.0, 127, "", "command not found")
         return 127, "", "command not found"
+    finally:
+        if slave is not None:
+            os.close(slave)
+    spawn = time.monotonic() - t0
+
+    out_fd = master if master is not None else p.stdout.fileno()  # type: ignore[union-attr]
+    err_fd = p.stderr.fileno()  # type: ignore[union-attr]
+    deadline = time.monotonic() + timeout if timeout else None
+    lines: List[str] = []
+    err_chunks: List[bytes] = []
+    partial = b""
+
+    def emit(raw: bytes) -> None:
+        text = raw.decode("utf-8", errors="replace").rstrip("\r")
+        lines.append(text)
+        on_line(text)
+
+    sel = selectors.DefaultSelector()
+    sel.register(out_fd, selectors.EVENT_READ)
+    sel.register(err_fd, selectors.EVENT_READ)
+    timed_out = False
+    try:
+        while sel.get_map():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                break
+            for key, _ in sel.select(remaining):
+                try:
+                    data = os.read(key.fd, 65536)
+                except OSError:
+                    # EIO on the pty master once the child has exited
+                    data = b""
+                if not data:
+                    sel.unregister(key.fd)
+                elif key.fd == err_fd:
+                    err_chunks.append(data)
+                else:
+                    partial += data
+                    *complete, partial = partial.split(b"\n")
+                    for raw in complete:
+                        emit(raw)
+        if partial:
+            emit(partial)
+        if not timed_out:
+            try:
+                p.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                timed_out = True
+    finally:
+        sel.close()
+        if master is not None:
+            os.close(master)
+        # Also when on_line() raised (e.g. Ctrl-C in the menu): never leave the child running
+        if p.poll() is None:
+            p.kill()
+            p.wait()
+        p.stderr.close()  # type: ignore[union-attr]
+        if p.stdout is not None:
+            p.stdout.close()
+
+    out = "\n".join(lines).strip()
+    if timed_out:
+        logger.warning("Command timed out after %ss: %s", timeout, " ".join(_sanitize_cmd(cmd)))
+        rc, err = 124, "timeout"
+    else:
+        rc, err = p.returncode, b"".join(err_chunks).decode("utf-8", errors="replace").strip()
+    _finish(cmd, start, t0, spawn, rc, out, err)
+    return rc, out, err
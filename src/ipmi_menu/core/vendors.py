@@ -0,0 +1,83 @@
+"""Per-vendor BMC profiles, keyed by the IANA manufacturer ID of `mc info`."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional, Tuple
+
+from .ipmi import ipmi, parse_kv
+from .profiling import profiler
+
+
+@dataclass(frozen=True)
+class VendorProfile:
+    """
+    What is known to work best on one vendor's BMCs.
+
+    `lan_channel` is the channel `lan print` must be given, `timeouts`
+    overrides the default timeout of slow operations ("sdr", "fru", "sel")
+    and `power_summary` the command printing power figures (DCMI unless
+    ipmitool has an OEM command for the vendor). The interface and cipher
+    suite are not part of it: they are negotiated before the vendor is known.
+    """
+
+    key: str
+    name: str
+    lan_channel: Optional[int] = None
+    timeouts: Mapping[str, int] = field(default_factory=dict)
+    power_summary: Tuple[str, ...] = ("dcmi", "power", "reading")
+
+    def timeout(self, op: str, default: int) -> int:
+        """Timeout of `op`, never shorter than `default`."""
+        return max(default, self.timeouts.get(op, 0))
+
+
+GENERIC = VendorProfile("unknown", "Generic IPMI")
+
+_DELL = VendorProfile(
+    "dell",
+    "Dell",
+    lan_channel=1,
+    timeouts={"sdr": 90, "fru": 60},
+    # ipmitool's Dell OEM extension: instantaneous, peak and cumulative energy
+    power_summary=("delloem", "powermonitor"),
+)
+_SUPERMICRO = VendorProfile("supermicro", "Supermicro", lan_channel=1, timeouts={"sdr": 90})
+_HPE = VendorProfile("hp", "HPE", lan_channel=2, timeouts={"sel": 600})
+_LENOVO = VendorProfile("lenovo", "Lenovo", lan_channel=1, timeouts={"fru": 90})
+_INTEL = VendorProfile("intel", "Intel", lan_channel=1)
+
+VENDOR_PROFILES: Dict[int, VendorProfile] = {
+    674: _DELL,
+    10876: _SUPERMICRO,
+    11: _HPE,  # Hewlett-Packard
+    47196: _HPE,  # Hewlett Packard Enterprise
+    19046: _LENOVO,
+    343: _INTEL,
+}
+
+
+def parse_manufacturer_id(text: str) -> Optional[int]:
+    """IANA enterprise number from `mc info` ("Manufacturer ID : 674")."""
+    value = parse_kv(text).get("manufacturer id", "")
+    try:
+        return int(value.split()[0], 0) if value else None
+    except ValueError:
+        return None
+
+
+def profile_for(manufacturer_id: Optional[int]) -> VendorProfile:
+    if manufacturer_id is None:
+        return GENERIC
+    return VENDOR_PROFILES.get(manufacturer_id, GENERIC)
+
+
+def power_summary(
+    host: str, user: str, password: Optional[str], interface: str, port: int, timeout: int, profile: VendorProfile
+) -> Tuple[int, str, str]:
+    """Power figures: `delloem powermonitor` on Dell (DCMI if it fails), DCMI elsewhere."""
+    args = list(profile.power_summary)
+    rc, out, err = ipmi(host, user, password, interface, port, timeout, args)
+    if rc != 0 and args != list(GENERIC.power_summary):
+        with profiler.retrying():
+            return ipmi(host, user, password, interface, port, timeout, list(GENERIC.power_summary))
+    return rc, out, err
@@ -0,0 +1,296 @@
+"""
+Full-screen fleet dashboard: power state, faults and key sensors per host.
+
+Hosts are polled on the shared Scheduler (chassis status often, sensors
+less often). The screen is redrawn at most a few times per second and only
+when something changed; `Screen` then sends just the cells that differ from
+what the terminal already shows, so a refresh of a few hosts costs a few
+dozen bytes on the wire however large the fleet.
+"""
+from __future__ import annotations
+
+import os
+import random
+import select
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+
+from ipmi_menu.config.messages import Messages
+from ipmi_menu.config.settings import TIMEOUT_FAST, TIMEOUT_SLOW
+from ipmi_menu.core.anomaly import parse_sensor_list, sensor_type
+from ipmi_menu.core.chassis import chassis_snapshot
+from ipmi_menu.core.fleet import Target
+from ipmi_menu.core.ipmi import ipmi
+from ipmi_menu.core.scheduler import Scheduler
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows: no key handling, Ctrl+C to quit
+    termios = None  # type: ignore[assignment]
+    tty = None  # type: ignore[assignment]
+
+RED = "\033[91m"
+YELLOW = "\033[93m"
+GREEN = "\033[92m"
+DIM = "\033[2m"
+RESET = "\033[0m"
+
+# (title, width); the last column takes the rest of the line
+COLUMNS: Sequence[Tuple[str, int]] = (
+    ("HOST", 22),
+    ("POWER", 8),
+    ("TEMP", 8),
+    ("FAN", 9),
+    ("WATTS", 7),
+    ("AGE", 6),
+    ("STATUS", 0),
+)
+
+MAX_FPS = 4
+
+
+@dataclass
+class HostState:
+    power: str = "?"
+    faults: List[str] = field(default_factory=list)
+    max_temp: Optional[float] = None
+    min_fan: Optional[float] = None
+    watts: Optional[float] = None
+    critical: List[str] = field(default_factory=list)  # sensors out of their thresholds
+    error: str = ""
+    updated: float = 0.0  # time.monotonic() of the last answer
+
+
+def summarize_sensors(text: str) -> Tuple[Optional[float], Optional[float], Optional[float], List[str]]:
+    """(hottest temperature, slowest fan, total watts, sensors not "ok") of `sensor` output."""
+    temps: List[float] = []
+    fans: List[float] = []
+    watts: List[float] = []
+    bad: List[str] = []
+    for r in parse_sensor_list(text):
+        kind = sensor_type(r.unit)
+        if kind == "temperature":
+            temps.append(r.value)
+        elif kind == "fan":
+            fans.append(r.value)
+        elif kind == "power":
+            watts.append(r.value)
+        if r.status and r.status not in ("ok", "na"):
+            bad.append(r.name)
+    return (
+        max(temps) if temps else None,
+        min(fans) if fans else None,
+        sum(watts) if watts else None,
+        bad,
+    )
+
+
+def _fit(text: str, width: int) -> str:
+    return text[:width].ljust(width) if width else text
+
+
+def _num(v: Optional[float], unit: str = "") -> str:
+    return "-" if v is None else f"{v:.0f}{unit}"
+
+
+def format_row(host: str, st: HostState, now: float, width: int) -> List[str]:
+    """Cells of one host, padded to their column width (colors do not count)."""
+    age = "-" if not st.updated else f"{now - st.updated:.0f}s"
+    status = st.error or ", ".join(st.faults + st.critical) or ("ok" if st.updated else "-")
+    texts = [host, st.power, _num(st.max_temp, "C"), _num(st.min_fan), _num(st.watts), age, status]
+    last = max(0, width - sum(w + 1 for _, w in COLUMNS[:-1]))
+    cells = [_fit(t, w or last) for t, (_, w) in zip(texts, COLUMNS)]
+    if st.power == "on":
+        cells[1] = f"{GREEN}{cells[1]}{RESET}"
+    elif st.power == "off":
+        cells[1] = f"{YELLOW}{cells[1]}{RESET}"
+    if st.error or st.faults or st.critical:
+        cells[6] = f"{RED}{cells[6]}{RESET}"
+    if st.updated and now - st.updated > 60:
+        cells[5] = f"{DIM}{cells[5]}{RESET}"
+    return cells
+
+
+class Screen:
+    """
+    Differential ANSI renderer: remembers every cell on the terminal and,
+    for a new frame, emits cursor moves and text for the changed ones only.
+    """
+
+    def __init__(self) -> None:
+        self._cells: Dict[Tuple[int, int], str] = {}
+        self._size: Tuple[int, int] = (0, 0)
+
+    def invalidate(self) -> None:
+        self._cells.clear()
+        self._size = (0, 0)
+
+    def render(self, lines: Sequence[Sequence[str]], size: Tuple[int, int]) -> str:
+        """
+        Escape sequence turning the previous frame into `lines`, each a list
+        of cells laid out on COLUMNS. Returns "" when nothing changed.
+        """
+        cols, rows = size
+        out: List[str] = []
+        if size != self._size:
+            self._cells.clear()
+            self._size = size
+            out.append("\033[2J")
+        seen = set()
+        for r, cells in enumerate(lines[:rows]):
+            x = 1
+            for c, cell in enumerate(cells):
+                key = (r, c)
+                seen.add(key)
+                if self._cells.get(key) != cell:
+                    self._cells[key] = cell
+                    out.append(f"\033[{r + 1};{x}H{cell}")
+                x += COLUMNS[c][1] + 1
+        for key in [k for k in self._cells if k not in seen]:  # rows that went away
+            del self._cells[key]
+            out.append(f"\033[{key[0] + 1};1H\033[2K")
+        return "".join(out)
+
+
+class Dashboard:
+    def __init__(
+        self,
+        targets: Sequence[Target],
+        *,
+        interval: float = 10.0,
+        sensor_interval: float = 60.0,
+        workers: int = 16,
+        scheduler: Optional[Scheduler] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.targets = list(targets)
+        self.interval = interval
+        self.sensor_interval = sensor_interval
+        self.states: Dict[str, HostState] = {t.host: HostState() for t in self.targets}
+        self.changed = threading.Event()
+        self.offset = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._own_scheduler = scheduler is None
+        self._sched = scheduler or Scheduler(max_workers=workers)
+        self._stopped = False
+
+    def poll_status(self, t: Target) -> None:
+        rc, st, err = chassis_snapshot(t.host, t.user, t.password, t.interface, t.port, TIMEOUT_FAST)
+        with self._lock:
+            s = self.states[t.host]
+            if st is None:
+                s.error = (err or f"rc={rc}").strip().splitlines()[-1]
+            else:
+                s.power, s.faults, s.error = st.power, st.faults, ""
+                s.updated = self._clock()
+        self.changed.set()
+
+    def poll_sensors(self, t: Target) -> None:
+        rc, out, _ = ipmi(t.host, t.user, t.password, t.interface, t.port, TIMEOUT_SLOW, ["sensor"])
+        if rc != 0:
+            return
+        temp, fan, watts, bad = summarize_sensors(out)
+        with self._lock:
+            s = self.states[t.host]
+            s.max_temp, s.min_fan, s.watts, s.critical = temp, fan, watts, bad
+            s.updated = self._clock()
+        self.changed.set()
+
+    def _every(self, period: float, fn: Callable[[Target], None], t: Target) -> Callable[[], None]:
+        def job() -> None:
+            if self._stopped:
+                return
+            try:
+                fn(t)
+            finally:
+                if not self._stopped:
+                    self._sched.call_later(period, job)
+
+        return job
+
+    def start(self) -> None:
+        rng = random.Random()
+        for t in self.targets:
+            # spread the first polls so a large fleet does not answer in one burst
+            self._sched.call_later(rng.uniform(0, min(self.interval, 2.0)), self._every(self.interval, self.poll_status, t))
+            self._sched.call_later(rng.uniform(0, min(self.sensor_interval, 5.0)),
+                                   self._every(self.sensor_interval, self.poll_sensors, t))
+
+    def stop(self) -> None:
+        self._stopped = True
+        if self._own_scheduler:
+            self._sched.shutdown(wait=False)
+
+    def frame(self, msg: Messages, size: Tuple[int, int]) -> List[List[str]]:
+        """Lines of the screen: summary, column titles, one line per visible host, help."""
+        cols, rows = size[0] - 1, size[1]  # never write the last column: it would wrap and scroll
+        now = self._clock()
+        body = max(1, rows - 3)
+        with self._lock:
+            states = {h: HostState(**vars(s)) for h, s in self.states.items()}
+        self.offset = max(0, min(self.offset, len(self.targets) - body))
+        on = sum(1 for s in states.values() if s.power == "on")
+        off = sum(1 for s in states.values() if s.power == "off")
+        bad = sum(1 for s in states.values() if s.error or s.faults or s.critical)
+        summary = msg.t("labels.dashboard.summary", hosts=len(states), on=on, off=off, problems=bad)
+        lines = [[_fit(summary, cols)], [_fit(" ".join(_fit(t, w) for t, w in COLUMNS), cols)]]
+        for t in self.targets[self.offset:self.offset + body]:
+            lines.append(format_row(t.host, states[t.host], now, cols))
+        first, last = self.offset + 1, min(self.offset + body, len(self.targets))
+        lines.append([_fit(msg.t("labels.dashboard.help", first=first, last=last, total=len(self.targets)), cols)])
+        return lines
+
+    def scroll(self, key: str, page: int) -> None:
+        step = {"j": 1, "k": -1, " ": page, "b": -page, "g": -len(self.targets), "G": len(self.targets)}.get(key, 0)
+        self.offset = max(0, self.offset + step)
+        self.changed.set()
+
+    def run(self, msg: Messages, out: TextIO = sys.stdout, inp: TextIO = sys.stdin) -> None:
+        """Show the dashboard until `q` or Ctrl+C."""
+        screen = Screen()
+        interactive = termios is not None and inp.isatty()
+        saved = termios.tcgetattr(inp.fileno()) if interactive else None
+        out.write("\033[?1049h\033[?25l")  # alternate screen, hidden cursor
+        try:
+            if interactive:
+                tty.setcbreak(inp.fileno())
+            self.start()
+            self.changed.set()
+            last_size = None
+            tick = 0.0
+            while True:
+                size = tuple(shutil.get_terminal_size())
+                if self.changed.is_set() or size != last_size:
+                    self.changed.clear()
+                    last_size = size
+                    data = screen.render(self.frame(msg, size), size)  # type: ignore[arg-type]
+                    if data:
+                        out.write(data)
+                        out.flush()
+                # Wake up for a key, or a bit later to redraw the ages
+                ready = select.select([inp], [], [], 1.0 / MAX_FPS)[0] if interactive else []
+                if not ready:
+                    if not interactive:
+                        time.sleep(1.0 / MAX_FPS)
+                    if self._clock() - tick >= 1.0:
+                        tick = self._clock()
+                        self.changed.set()
+                    continue
+                key = os.read(inp.fileno(), 1).decode(errors="ignore")
+                if key in ("q", "Q"):
+                    break
+                self.scroll(key, max(1, size[1] - 3))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            out.write("\033[?25h\033[?1049l")
+            out.flush()
+            if saved is not None:
+                termios.tcsetattr(inp.fileno(), termios.TCSADRAIN, saved)
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import random
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import anomaly
+from ipmi_menu.core.anomaly import (
+    SensorFrame,
+    SensorReading,
+    find_outliers,
+    parse_sdr_list,
+    parse_sensor_list,
+    sensor_type,
+)
+
+SENSOR_OUTPUT = """CPU1 Temp        | 45.000     | degrees C  | ok    | na        | 0.000     | na        | 85.000    | 90.000    | na
+FAN1             | 5400.000   | RPM        | ok    | na        | 600.000   | 800.000   | na        | na        | na
+PS1 Status       | 0x1        | discrete   | 0x0100| na        | na        | na        | na        | na        | na
+VBAT             | na         | Volts      | na    | na        | na        | na        | na        | na        | na
+"""
+
+
+def _rack(n=8, hot=None, base=45.0):
+    rng = random.Random(0)
+    readings = {}
+    for i in range(n):
+        host = f"h{i}"
+        temp = base + rng.uniform(-1, 1) + (15.0 if host == hot else 0.0)
+        readings[host] = [
+            SensorReading("CPU1 Temp", temp, "degrees C", "ok", 0.0, 90.0),
+            SensorReading("FAN1", 5400.0 + rng.uniform(-100, 100), "RPM", "ok", 600.0, None),
+        ]
+    return readings
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request):
+    if request.param == "numpy":
+        if anomaly.np is None:
+            pytest.skip("numpy not installed")
+        yield
+    else:
+        with mock.patch.object(anomaly, "np", None):
+            yield
+
+
+class TestParsing:
+    def test_sensor_list(self):
+        rows = parse_sensor_list(SENSOR_OUTPUT)
+        assert [r.name for r in rows] == ["CPU1 Temp", "FAN1"]
+        assert rows[0].upper_critical == 90.0
+        assert rows[1].lower_critical == 600.0
+
+    def test_sdr_list(self):
+        rows = parse_sdr_list("CPU1 Temp | 45 degrees C | ok\nPS1 Status | 0x01 | ok\n")
+        assert len(rows) == 1 and rows[0].unit == "degrees C"
+
+    def test_sensor_type(self):
+        assert sensor_type("degrees C") == "temperature"
+        assert sensor_type("RPM") == "fan"
+
+
+class TestFindOutliers:
+    def test_hot_node_ranked_first(self, backend):
+        frame = SensorFrame.from_readings(_rack(hot="h3"))
+        out = find_outliers(frame)
+        assert out[0].host == "h3" and out[0].sensor == "CPU1 Temp"
+        assert out[0].zscore > 3
+        assert all(o.host == "h3" for o in out)
+
+    def test_quiet_rack(self, backend):
+        assert find_outliers(SensorFrame.from_readings(_rack())) == []
+
+    def test_threshold_proximity(self, backend):
+        readings = _rack(base=84.0)
+        out = find_outliers(SensorFrame.from_readings(readings))
+        assert out and all(o.proximity >= 0.9 for o in out)
+
+    def test_nominal_rails_are_not_near_thresholds(self, backend):
+        rails = [("3.3VCC", 3.31, 2.97, 3.63), ("5VCC", 5.02, 4.5, 5.5), ("12V", 12.1, 10.8, 13.2)]
+        readings = {
+            f"h{i}": [SensorReading(name, v, "Volts", "ok", lcr, ucr) for name, v, lcr, ucr in rails]
+            for i in range(20)
+        }
+        assert find_outliers(SensorFrame.from_readings(readings)) == []
+        readings["h7"][0] = SensorReading("3.3VCC", 3.6, "Volts", "ok", 2.97, 3.63)
+        out = find_outliers(SensorFrame.from_readings(readings))
+        assert [(o.host, o.sensor) for o in out] == [("h7", "3.3VCC")] and out[0].proximity > 0.9
+
+    def test_rate_of_change(self, backend):
+        readings = _rack()
+        previous = {h: {"CPU1 Temp": rows[0].value - (20.0 if h == "h1" else 0.0)} for h, rows in readings.items()}
+        out = find_outliers(SensorFrame.from_readings(readings, previous=previous), minutes_since_previous=2.0)
+        assert [o.host for o in out] == ["h1"]
+        assert out[0].rate == pytest.approx(10.0)
+
+    def test_rate_uses_per_host_age(self, backend):
+        readings = _rack()
+        previous = {h: {"CPU1 Temp": rows[0].value - 20.0} for h, rows in readings.items()}
+        # h1 did not answer the last scans: its reading is 20 min old, the others 1 min
+        ages = {h: (20.0 if h == "h1" else 1.0) for h in readings}
+        out = find_outliers(SensorFrame.from_readings(readings, previous=previous, previous_minutes=ages))
+        assert "h1" not in {o.host for o in out}
+        assert len(out) == 7 and all(o.rate == pytest.approx(20.0) for o in out)
+
+    def test_groups_are_compared_separately(self, backend):
+        readings = {**_rack(n=5), **{f"g{i}": [SensorReading("CPU1 Temp", 70.0, "degrees C")] for i in range(5)}}
+        groups = {h: ("hot-aisle" if h.startswith("g") else "cold-aisle") for h in readings}
+        assert find_outliers(SensorFrame.from_readings(readings, groups)) == []
+
+    def test_top(self, backend):
+        frame = SensorFrame.from_readings(_rack(base=86.0))
+        assert len(find_outliers(frame, top=3)) == 3
+
+    def test_empty(self, backend):
+        assert find_outliers(SensorFrame()) == []
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import http.client
+import json
+import socket
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import api
+from ipmi_menu.core import ipmi as ipmi_mod
+from ipmi_menu.core.api import ApiServer, HostLimiter, fan_out, load_token
+from ipmi_menu.core.fleet import Target
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost", timeout=10)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(self.path))
+
+
+class FakeBmc:
+    """run_cmd replacement: slow hosts and concurrency accounting."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.active = {}
+        self.max_active = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, cmd, timeout):
+        host = cmd[cmd.index("-H") + 1]
+        args = cmd[cmd.index("-P") + 2:] if "-P" in cmd else cmd[cmd.index("-U") + 2:]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+        try:
+            time.sleep(self.delays.get(host, 0.01))
+            if host.startswith("dead"):
+                return 1, "", "Unable to establish IPMI v2 / RMCP+ session"
+            if args == ["chassis", "power", "status"]:
+                return 0, "Chassis Power is on", ""
+            if args == ["sensor"]:
+                return 0, "CPU Temp | 45.000 | degrees C | ok | na | na | na | 85.000 | 90.000 | na\n", ""
+            if args[:2] == ["chassis", "bootdev"]:
+                return 0, f"Set Boot Device to {args[2]}", ""
+            return 1, "", "Invalid command"
+        finally:
+            with self.lock:
+                self.active[host] -= 1
+
+
+@pytest.fixture
+def bmc():
+    fake = FakeBmc()
+    with mock.patch.object(ipmi_mod, "run_cmd", fake):
+        yield fake
+
+
+@pytest.fixture
+def server(tmp_path, bmc):
+    srv = ApiServer(socket_path=tmp_path / "api.sock", per_bmc=2)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.stop()
+    thread.join(5)
+
+
+def post(server, path, body, conn=None):
+    conn = conn or UnixHTTPConnection(server.socket_path)
+    conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    if resp.getheader("Content-Type") != "application/x-ndjson":
+        return resp.status, json.loads(resp.read())
+    return resp.status, [json.loads(ln) for ln in resp.read().splitlines()]
+
+
+class TestApi:
+    def test_health(self, server):
+        conn = UnixHTTPConnection(server.socket_path)
+        conn.request("GET", "/v1/health")
+        resp = conn.getresponse()
+        assert resp.status == 200
+        assert json.loads(resp.read())["operations"] == ["bootdev", "detect", "power", "sensors"]
+
+    def test_power_status_streamed_in_completion_order(self, server, bmc):
+        bmc.delays["10.0.0.1"] = 0.3
+        status, lines = post(server, "/v1/power", {"hosts": ["10.0.0.1", "10.0.0.2", "dead1"], "interface": "lanplus"})
+        assert status == 200
+        *results, summary = lines
+        assert results[-1]["host"] == "10.0.0.1"
+        by_host = {r["host"]: r for r in results}
+        assert by_host["10.0.0.2"]["result"] == {"state": "on"}
+        assert not by_host["dead1"]["ok"] and "RMCP+" in by_host["dead1"]["error"]
+        assert summary == {"done": True, "hosts": 3, "failed": 1}
+
+    def test_sensors_and_bootdev(self, server):
+        _, lines = post(server, "/v1/sensors", {"hosts": ["h1"], "interface": "lan"})
+        assert lines[0]["result"][0]["name"] == "CPU Temp"
+        assert lines[0]["result"][0]["upper_critical"] == 90.0
+        _, lines = post(server, "/v1/bootdev", {"hosts": ["h1"], "interface": "lan", "device": "pxe"})
+        assert lines[0]["ok"]
+
+    def test_bad_requests(self, server):
+        assert post(server, "/v1/power", {"hosts": []})[0] == 400
+        assert post(server, "/v1/power", {"hosts": ["h"], "action": "explode"})[0] == 400
+        assert post(server, "/v1/bootdev", {"hosts": ["h"], "device": "floppy"})[0] == 400
+        assert post(server, "/v1/nope", {"hosts": ["h"]})[0] == 404
+
+    def test_per_bmc_limit(self, server, bmc):
+        bmc.delays["busy"] = 0.1
+        _, lines = post(server, "/v1/power", {"hosts": ["busy"] * 6 + ["other"], "interface": "lanplus"})
+        assert lines[-1]["hosts"] == 7
+        assert bmc.max_active["busy"] == 2
+
+    def test_interface_negotiated_per_host_in_the_stream(self, server):
+        with mock.patch.object(api, "negotiate", return_value=None) as neg:
+            results = server.run("power", {"hosts": ["h1", "h2"]})
+            assert neg.call_count == 0  # nothing probed before the first result can be streamed
+            assert sorted(r.host for r in results) == ["h1", "h2"]
+        assert sorted(c[0][0] for c in neg.call_args_list) == ["h1", "h2"]
+
+    def test_body_size_capped(self, server):
+        with mock.patch.object(api, "MAX_BODY", 64):
+            status, doc = post(server, "/v1/power", {"hosts": ["h%d" % i for i in range(20)]})
+        assert status == 413 and "body" in doc["error"]
+
+
+class TestTcpToken:
+    @pytest.fixture
+    def tcp(self, bmc):
+        srv = ApiServer(address=("127.0.0.1", 0), token="s3cret")
+        thread = threading.Thread(target=srv.serve_forever, daemon=True)
+        thread.start()
+        yield srv
+        srv.stop()
+        thread.join(5)
+
+    def test_token_required(self, tcp):
+        port = int(tcp.address.rsplit(":", 1)[1])
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/v1/health")
+        assert conn.getresponse().status == 401
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        conn.request("GET", "/v1/health", headers={"Authorization": "Bearer s3cret"})
+        assert conn.getresponse().status == 200
+
+    def test_token_created_once(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("IPMI_MENU_API_TOKEN", raising=False)
+        token = load_token(tmp_path / "api.token")
+        assert len(token) > 20
+        assert load_token(tmp_path / "api.token") == token
+        assert (tmp_path / "api.token").stat().st_mode & 0o077 == 0
+
+
+class TestFanOut:
+    def test_closing_cancels_pending(self):
+        started = []
+
+        def run(t):
+            started.append(t.host)
+            time.sleep(0.05)
+            return 0, None, ""
+
+        targets = [Target(f"h{i}", "u", "p") for i in range(50)]
+        it = fan_out(targets, run, workers=2, limiter=HostLimiter(1))
+        next(it)
+        it.close()
+        time.sleep(0.2)
+        assert len(started) < 10
+
+    def test_exception_becomes_failed_result(self):
+        def run(t):
+            raise RuntimeError("boom")
+
+        (res,) = list(fan_out([Target("h", "u", "p")], run))
+        assert not res.ok and res.error == "boom"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from ipmi_menu.core import chassis
+from ipmi_menu.core.chassis import chassis_snapshot, parse_chassis_status
+
+STATUS = """System Power         : on
+Power Overload       : false
+Power Interlock      : inactive
+Main Power Fault     : false
+Power Control Fault  : false
+Power Restore Policy : always-off
+Last Power Event     : ac-failed
+Chassis Intrusion    : active
+Front-Panel Lockout  : inactive
+Drive Fault          : false
+Cooling/Fan Fault    : true
+Sleep Button Disable : not allowed
+Diag Button Disable  : allowed
+Reset Button Disable : allowed
+Power Button Disable : allowed
+"""
+
+
+class TestParseChassisStatus:
+    def test_full(self):
+        st = parse_chassis_status(STATUS)
+        assert st.power == "on"
+        assert st.last_power_event == "ac-failed"
+        assert st.restore_policy == "always-off"
+        assert st.intrusion is True
+        assert st.fan_fault is True
+        assert st.interlock is False
+        assert st.faults == ["intrusion", "fan-fault"]
+
+    def test_healthy_off(self):
+        text = STATUS.replace("System Power         : on", "System Power         : off")
+        text = text.replace("Chassis Intrusion    : active", "Chassis Intrusion    : inactive")
+        text = text.replace("Cooling/Fan Fault    : true", "Cooling/Fan Fault    : false")
+        st = parse_chassis_status(text)
+        assert st.power == "off"
+        assert st.faults == []
+
+    def test_empty_last_event(self):
+        st = parse_chassis_status(STATUS.replace("ac-failed", ""))
+        assert st.last_power_event == ""
+
+    def test_garbage(self):
+        st = parse_chassis_status("nothing useful")
+        assert st.power == "unknown"
+        assert st.faults == []
+
+
+class TestChassisSnapshot:
+    def test_single_request(self):
+        calls = []
+
+        def fake(host, user, password, interface, port, timeout, args):
+            calls.append(args)
+            return 0, STATUS, ""
+
+        with mock.patch.object(chassis, "ipmi", fake):
+            rc, st, err = chassis_snapshot("h", "u", "p", "lanplus", 623, 10)
+        assert rc == 0 and err == ""
+        assert st is not None and st.power == "on"
+        assert calls == [["chassis", "status"]]
+
+    def test_failure(self):
+        with mock.patch.object(chassis, "ipmi", lambda *a: (1, "", "Unable to establish IPMI v2 / RMCP+ session")):
+            rc, st, err = chassis_snapshot("h", "u", "p", "lanplus", 623, 10)
+        assert rc == 1 and st is None
+        assert "RMCP+" in err
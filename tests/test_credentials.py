@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.config import preferences
+from ipmi_menu.core import ipmi as ipmi_mod
+from ipmi_menu.core import negotiate as neg
+from ipmi_menu.core.credentials import (
+    AttemptLimiter,
+    CredentialSet,
+    configured_sets,
+    no_answer,
+    remembered_set,
+    resolve,
+    resolve_many,
+)
+from ipmi_menu.core.ipmi import set_host_cipher
+from ipmi_menu.core.negotiate import LinkProfile
+
+OLD = CredentialSet("old", "ADMIN", "ADMIN")
+NEW = CredentialSet("new", "root", "calvin")
+
+
+@pytest.fixture(autouse=True)
+def tmp_prefs(tmp_path):
+    with mock.patch.object(preferences, "PREFERENCES_FILE", tmp_path / "preferences.json"), \
+         mock.patch.object(preferences, "CONFIG_DIR", tmp_path):
+        yield
+    for h in ("a", "b", "dead", "ipmi15"):
+        set_host_cipher(h, None)
+
+
+class FakeFleet:
+    """run_cmd replacement: `users` maps host -> the only user it accepts."""
+
+    def __init__(self, users):
+        self.users = users
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, cmd, timeout):
+        host, user, iface = cmd[cmd.index("-H") + 1], cmd[cmd.index("-U") + 1], cmd[cmd.index("-I") + 1]
+        with self.lock:
+            self.calls.append((host, user, time.monotonic(), iface, "-C" in cmd and cmd[cmd.index("-C") + 1]))
+        if host == "dead":
+            return 1, "", "No response from remote controller"
+        if host == "ipmi15" and iface != "lan":
+            return 1, "", "Error: Unable to establish IPMI v2 / RMCP+ session"
+        if self.users.get(host) != user:
+            return 1, "", "Error: Unable to establish IPMI v2 / RMCP+ session\nRAKP 2 HMAC is invalid"
+        return 0, "Device ID : 32", ""
+
+    def handshakes(self, host):
+        return [c for c in self.calls if c[0] == host]
+
+
+@pytest.fixture
+def fleet():
+    fake = FakeFleet({"a": "root", "b": "ADMIN", "ipmi15": "ADMIN"})
+    with mock.patch.object(ipmi_mod, "run_cmd", fake), mock.patch.object(neg, "run_cmd", fake):
+        yield fake
+
+
+class TestSets:
+    def test_saved_encoded_and_env(self, monkeypatch):
+        preferences.set_credential_sets([
+            {"name": "old", "user": "ADMIN", "password": "ADMIN"},
+            {"name": "new", "user": "root", "password_env": "NEW_PW"},
+        ])
+        assert "ADMIN" not in str(preferences.get_store().get("credential_sets")[0]["password"])
+        monkeypatch.setenv("NEW_PW", "calvin")
+        assert configured_sets() == [OLD, NEW]
+
+    def test_no_answer(self):
+        assert no_answer("No response from remote controller")
+        assert not no_answer("Unable to establish IPMI v2 / RMCP+ session\nRAKP 2 HMAC is invalid")
+
+
+class TestResolve:
+    def test_tries_in_order_and_remembers(self, fleet):
+        res = resolve_many(["a", "b"], [OLD, NEW], 623, interface="lanplus", limiter=AttemptLimiter(0))
+        assert (res["a"].credentials, res["a"].attempts) == (NEW, 2)
+        assert (res["b"].credentials, res["b"].attempts) == (OLD, 1)
+        assert preferences.get_host_profile("a") == {"credentials": "new"}
+        assert remembered_set("a", [OLD, NEW]) == NEW
+
+        # Next run: the remembered set of `a` is used first, one handshake each
+        fleet.calls.clear()
+        res = resolve_many(["a", "b"], [OLD, NEW], 623, interface="lanplus", refresh=True, limiter=AttemptLimiter(0))
+        assert [c[1] for c in fleet.calls if c[0] == "a"] == ["root"]
+        assert res["a"].attempts == 1
+
+    def test_remembered_with_link_needs_no_handshake(self, fleet):
+        profile = {"interface": "lanplus", "cipher": 17, "credentials": "new"}
+        res = resolve("a", [OLD, NEW], 623, profile=profile)
+        assert (res.credentials, res.link, res.attempts) == (NEW, LinkProfile("lanplus", 17), 0)
+        assert fleet.calls == []
+
+    def test_probes_link_once_then_reuses_it(self, fleet):
+        wrong = [CredentialSet(f"w{i}", f"u{i}", "x") for i in range(2)]
+        res = resolve("b", wrong + [OLD], 623, limiter=AttemptLimiter(0))
+        assert (res.credentials, res.link, res.attempts) == (OLD, LinkProfile("lanplus", 17), 3)
+        # one handshake per set, all on the link the first refusal proved
+        assert [(c[1], c[3], c[4]) for c in fleet.handshakes("b")] == [
+            ("u0", "lanplus", "17"), ("u1", "lanplus", "17"), ("ADMIN", "lanplus", "17")]
+
+    def test_unsupported_candidates_are_not_failed_logins(self, fleet):
+        res = resolve("ipmi15", [NEW, OLD], 623, limiter=AttemptLimiter(0, max_failures=2))
+        assert res.credentials == OLD and res.link == LinkProfile("lan")
+        assert [(c[1], c[3]) for c in fleet.handshakes("ipmi15")] == [
+            ("root", "lanplus"), ("root", "lanplus"), ("root", "lanplus"), ("root", "lan"), ("ADMIN", "lan")]
+
+    def test_unreachable_without_link_stops_at_once(self, fleet):
+        res = resolve("dead", [OLD, NEW], 623, limiter=AttemptLimiter(0))
+        assert res.attempts == 1 and "No response" in res.error
+
+    def test_unreachable_stops_early(self, fleet):
+        res = resolve("dead", [OLD, NEW], 623, interface="lanplus", limiter=AttemptLimiter(0))
+        assert res.credentials is None and res.attempts == 1 and "No response" in res.error
+
+    def test_failure_cap_and_spacing(self, fleet):
+        sets = [CredentialSet(f"s{i}", f"u{i}", "x") for i in range(5)]
+        t0 = time.monotonic()
+        res = resolve("a", sets, 623, interface="lanplus", limiter=AttemptLimiter(0.1, max_failures=2))
+        assert res.attempts == 2 and res.error == "too many failed attempts"
+        times = [c[2] for c in fleet.handshakes("a")]
+        assert times[1] - times[0] >= 0.09
+        assert time.monotonic() - t0 < 1
+
+    def test_hosts_in_parallel(self, fleet):
+        hosts = [f"h{i}" for i in range(8)]
+        fleet.users.update({h: "root" for h in hosts})
+        t0 = time.monotonic()
+        res = resolve_many(hosts, [OLD, NEW], 623, interface="lanplus", workers=8, limiter=AttemptLimiter(0.3))
+        assert all(r.credentials == NEW for r in res.values())
+        assert time.monotonic() - t0 < 1.0  # spacing is per host, not global
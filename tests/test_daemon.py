@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+import stat
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import daemon as daemon_mod
+from ipmi_menu.core import ipmi as ipmi_mod
+from ipmi_menu.core.daemon import Daemon, ResponseCache, attach, cache_ttl, connect
+from ipmi_menu.core.detect import detect
+from ipmi_menu.core.inventory import FRU_AREA_INFO
+from ipmi_menu.core.ipmi import ipmi, ipmi_stream, parse_power_state, power, set_host_cipher, set_runner
+
+
+class FakeBmc:
+    """run_cmd replacement counting the ipmitool calls per command."""
+
+    def __init__(self):
+        self.calls = []
+        self.power = "off"
+        self.lock = threading.Lock()
+
+    def __call__(self, cmd, timeout):
+        args = cmd[cmd.index("-U") + 2:]
+        if "-P" in args:
+            args = args[2:]
+        if "-C" in cmd:
+            args = [a for a in args if a not in ("-C", cmd[cmd.index("-C") + 1])]
+        with self.lock:
+            self.calls.append((cmd[cmd.index("-H") + 1], " ".join(args), cmd))
+        if args[:2] == ["mc", "info"]:
+            return 0, "Manufacturer ID : 674\nManufacturer Name : DELL Inc\nProduct Name : PowerEdge R640\n", ""
+        if args[:3] == ["chassis", "power", "status"]:
+            return 0, f"Chassis Power is {self.power}", ""
+        if args[:3] == ["chassis", "power", "on"]:
+            self.power = "on"
+            return 0, "Chassis Power Control: Up/On", ""
+        if args[:2] == ["chassis", "status"]:
+            return 0, f"System Power : {self.power}\n", ""
+        return 1, "", "Invalid command"
+
+    def count(self, command):
+        return sum(1 for _, c, _ in self.calls if c == command)
+
+
+@pytest.fixture
+def bmc():
+    fake = FakeBmc()
+    with mock.patch.object(ipmi_mod, "run_cmd", fake):
+        yield fake
+
+
+@pytest.fixture
+def running(tmp_path, bmc):
+    path = tmp_path / "d.sock"
+    d = Daemon(path, poll_interval=0.05)
+    d.bind()
+    thread = threading.Thread(target=d.serve_forever, daemon=True)
+    thread.start()
+    yield d
+    set_runner(None)
+    d.stop()
+    thread.join(5)
+
+
+def call(args, host="10.0.0.1", password="pw"):
+    return ipmi(host, "root", password, "lanplus", 623, 5, args)
+
+
+class TestResponseCache:
+    def test_ttl_by_prefix(self):
+        assert cache_ttl(["mc", "info"]) == 3600
+        assert cache_ttl(["sdr", "list", "all"]) == 60
+        assert cache_ttl(["chassis", "power", "on"]) is None
+        assert cache_ttl(FRU_AREA_INFO) == 600
+
+    def test_inventory_fingerprint_read_keeps_host_entries(self, bmc):
+        cache = ResponseCache()
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])
+        cache.call("h", "u", "p", "lanplus", 623, 5, FRU_AREA_INFO)
+        assert cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])[3] is True
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["raw", "0x00", "0x08", "0x05", "0x80", "0x04"])
+        assert cache.stats()["entries"] == 0  # other raw requests may write
+
+    def test_hit_and_expiry(self, bmc):
+        cache = ResponseCache()
+        assert cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])[3] is False
+        assert cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])[3] is True
+        assert bmc.count("mc info") == 1
+        with mock.patch.object(daemon_mod.time, "monotonic", return_value=time.monotonic() + 4000):
+            assert cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])[3] is False
+        assert bmc.count("mc info") == 2
+
+    def test_failures_not_cached(self, bmc):
+        cache = ResponseCache()
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["sdr", "list"])
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["sdr", "list"])
+        assert bmc.count("sdr list") == 2
+
+    def test_password_is_part_of_the_key(self, bmc):
+        cache = ResponseCache()
+        cache.call("h", "u", "good", "lanplus", 623, 5, ["mc", "info"])
+        assert cache.call("h", "u", "bad", "lanplus", 623, 5, ["mc", "info"])[3] is False
+
+    def test_write_invalidates_host(self, bmc):
+        cache = ResponseCache()
+        assert cache.call("h", "u", "p", "lanplus", 623, 5, ["chassis", "power", "status"])[1].endswith("off")
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["chassis", "power", "on"])
+        rc, out, _, cached = cache.call("h", "u", "p", "lanplus", 623, 5, ["chassis", "power", "status"])
+        assert not cached and out.endswith("on")
+
+    def test_uncached_read_keeps_host_entries(self, bmc):
+        cache = ResponseCache()
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["chassis", "status"])
+        cache.call("h", "u", "p", "lanplus", 623, 5, ["sel", "info"])
+        assert cache.stats()["entries"] == 2
+        assert cache.call("h", "u", "p", "lanplus", 623, 5, ["mc", "info"])[3] is True
+
+    def test_concurrent_identical_requests_coalesce(self, bmc):
+        cache = ResponseCache()
+        threads = [
+            threading.Thread(target=cache.call, args=("h", "u", "p", "lanplus", 623, 5, ["mc", "info"]))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert bmc.count("mc info") == 1
+
+
+class TestDaemon:
+    def test_socket_is_private(self, running):
+        assert stat.S_IMODE(os.stat(running.socket_path).st_mode) == 0o600
+
+    def test_no_daemon(self, tmp_path):
+        assert connect(tmp_path / "none.sock") is None
+        assert attach(tmp_path / "none.sock") is None
+
+    def test_second_daemon_refused(self, running):
+        with pytest.raises(OSError):
+            Daemon(running.socket_path).bind()
+
+    def test_attached_calls_are_cached(self, running, bmc):
+        assert attach(running.socket_path) is not None
+        first = call(["mc", "info"])
+        assert call(["mc", "info"]) == first
+        assert bmc.count("mc info") == 1
+        assert running.cache.stats()["hits"] == 1
+
+    def test_detect_twice_hits_the_bmc_once(self, running, bmc):
+        attach(running.socket_path)
+        for _ in range(2):
+            di = detect("10.0.0.1", "root", "pw", "lanplus", 623, 5)
+            assert di.vendor == "dell"
+        assert bmc.count("mc info") == 1
+
+    def test_cipher_forwarded(self, running, bmc):
+        attach(running.socket_path)
+        set_host_cipher("10.0.0.9", 17)
+        try:
+            call(["mc", "info"], host="10.0.0.9")
+        finally:
+            set_host_cipher("10.0.0.9", None)
+        cmd = bmc.calls[-1][2]
+        assert cmd[cmd.index("-C") + 1] == "17"
+
+    def test_power_polls_bypass_the_cache(self, running, bmc):
+        running.poll_interval = 60
+        time.sleep(0.1)  # let the poller pick up the new interval
+        attach(running.socket_path)
+        args = ("10.0.0.1", "root", "pw", "lanplus", 623, 5, "status")
+        assert parse_power_state(power(*args)[1]) == "off"
+        bmc.power = "on"
+        assert parse_power_state(power(*args)[1]) == "off"  # cached
+        assert parse_power_state(power(*args, refresh=True)[1]) == "on"
+        assert bmc.count("chassis power status") == 2
+
+    def test_streamed_commands_run_locally(self, running, bmc):
+        attach(running.socket_path)
+        lines = []
+
+        def stream(cmd, timeout, on_line):
+            for ln in ("a", "b"):
+                on_line(ln)
+            return 0, "a\nb\n", ""
+
+        with mock.patch.object(ipmi_mod, "run_cmd_stream", stream):
+            rc, _, _ = ipmi_stream("10.0.0.1", "root", "pw", "lanplus", 623, 5, ["fru", "print"], lines.append)
+        assert rc == 0 and lines == ["a", "b"]
+        assert running.cache.stats()["misses"] == 0
+
+    def test_background_poll(self, running, bmc):
+        attach(running.socket_path)
+        call(["chassis", "status"])
+        deadline = time.monotonic() + 2
+        while bmc.count("chassis status") < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert bmc.count("chassis status") >= 3
+
+    def test_falls_back_when_daemon_stops(self, running, bmc):
+        client = attach(running.socket_path)
+        call(["mc", "info"])
+        client.request({"op": "shutdown"})
+        deadline = time.monotonic() + 2
+        while running.socket_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        rc, _, _ = call(["mc", "info"])
+        assert rc == 0
+        assert bmc.count("mc info") == 2  # ran locally
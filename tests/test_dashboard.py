@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import io
+import time
+from unittest import mock
+
+from ipmi_menu.config.messages import load_messages
+from ipmi_menu.core.fleet import Target
+from ipmi_menu.core.scheduler import Scheduler
+from ipmi_menu.ui import dashboard
+from ipmi_menu.ui.dashboard import Dashboard, HostState, Screen, format_row, summarize_sensors
+
+SENSORS = """CPU1 Temp | 45.000 | degrees C | ok | na | na | na | 85.000 | 90.000 | na
+CPU2 Temp | 61.000 | degrees C | ok | na | na | na | 85.000 | 90.000 | na
+FAN1 | 4200.000 | RPM | ok | na | 500.000 | na | na | na | na
+FAN2 | 300.000 | RPM | cr | na | 500.000 | na | na | na | na
+PSU1 Input | 180.000 | Watts | ok | na | na | na | na | na | na
+PSU2 Input | 170.000 | Watts | ok | na | na | na | na | na | na
+"""
+
+CHASSIS_ON = """System Power         : on
+Power Overload       : false
+Main Power Fault     : false
+Power Control Fault  : false
+Power Restore Policy : always-off
+Last Power Event     :
+Chassis Intrusion    : inactive
+Front-Panel Lockout  : inactive
+Drive Fault          : false
+Cooling/Fan Fault    : true
+"""
+
+
+class TestRows:
+    def test_summarize_sensors(self):
+        assert summarize_sensors(SENSORS) == (61.0, 300.0, 350.0, ["FAN2"])
+
+    def test_cells_padded_and_colored(self):
+        st = HostState(power="on", faults=["fan-fault"], max_temp=61, min_fan=300, watts=350, updated=100.0)
+        cells = format_row("10.0.0.1", st, 103.0, 100)
+        assert cells[0] == "10.0.0.1".ljust(22)
+        assert cells[1] == f"{dashboard.GREEN}{'on'.ljust(8)}{dashboard.RESET}"
+        assert cells[5].strip() == "3s"
+        assert cells[6].startswith(dashboard.RED) and "fan-fault" in cells[6]
+
+    def test_unknown_host(self):
+        cells = format_row("h", HostState(), 0.0, 80)
+        assert [c.strip() for c in cells[1:]] == ["?", "-", "-", "-", "-", "-"]
+
+
+class TestScreen:
+    def test_only_changed_cells_are_sent(self):
+        screen = Screen()
+        first = screen.render([["a" * 22, "on      "], ["b" * 22, "off     "]], (80, 24))
+        assert first.startswith("\033[2J")
+        assert screen.render([["a" * 22, "on      "], ["b" * 22, "off     "]], (80, 24)) == ""
+        update = screen.render([["a" * 22, "on      "], ["b" * 22, "on      "]], (80, 24))
+        assert update == "\033[2;24Hon      "
+
+    def test_resize_redraws_everything(self):
+        screen = Screen()
+        screen.render([["x"]], (80, 24))
+        out = screen.render([["x"]], (100, 30))
+        assert out == "\033[2J\033[1;1Hx"
+
+    def test_vanished_rows_are_cleared(self):
+        screen = Screen()
+        screen.render([["x"], ["y"]], (80, 24))
+        assert screen.render([["x"]], (80, 24)) == "\033[2;1H\033[2K"
+
+    def test_rows_beyond_screen_are_dropped(self):
+        out = Screen().render([["x"], ["y"], ["z"]], (80, 2))
+        assert "z" not in out
+
+
+class TestDashboard:
+    def fake_ipmi(self, host, user, password, interface, port, timeout, args):
+        if host == "dead":
+            return 1, "", "Unable to establish IPMI v2 / RMCP+ session"
+        if args == ["chassis", "status"]:
+            return 0, CHASSIS_ON, ""
+        return 0, SENSORS, ""
+
+    def test_polls_fill_states(self):
+        targets = [Target("a", "u", "p"), Target("dead", "u", "p")]
+        dash = Dashboard(targets, clock=lambda: 50.0)
+        with mock.patch("ipmi_menu.core.chassis.ipmi", self.fake_ipmi), mock.patch.object(dashboard, "ipmi", self.fake_ipmi):
+            for t in targets:
+                dash.poll_status(t)
+                dash.poll_sensors(t)
+        dash.stop()
+        a, dead = dash.states["a"], dash.states["dead"]
+        assert (a.power, a.faults, a.max_temp, a.critical, a.updated) == ("on", ["fan-fault"], 61.0, ["FAN2"], 50.0)
+        assert dead.power == "?" and "RMCP+" in dead.error and not dead.updated
+        assert dash.changed.is_set()
+
+    def test_frame_and_scroll(self):
+        targets = [Target(f"h{i}", "u", "p") for i in range(30)]
+        dash = Dashboard(targets, clock=lambda: 0.0)
+        dash.stop()
+        msg = load_messages("en")
+        lines = dash.frame(msg, (120, 13))
+        assert len(lines) == 13
+        assert lines[0][0].startswith("30 hosts")
+        assert lines[2][0].startswith("h0 ")
+        assert all(len(line[0]) == 119 for line in (lines[0], lines[1], lines[-1]))
+        dash.scroll(" ", 10)
+        assert dash.frame(msg, (120, 13))[2][0].startswith("h10 ")
+        dash.scroll("G", 10)
+        assert dash.frame(msg, (120, 13))[-2][0].startswith("h29 ")
+
+    def test_scheduled_polling_repeats(self):
+        calls = []
+
+        def count(host, user, password, interface, port, timeout, args):
+            calls.append(args[0])
+            return self.fake_ipmi(host, user, password, interface, port, timeout, args)
+
+        sched = Scheduler(max_workers=2)
+        dash = Dashboard([Target("a", "u", "p")], interval=0.05, sensor_interval=0.05, scheduler=sched)
+        with mock.patch("ipmi_menu.core.chassis.ipmi", count), mock.patch.object(dashboard, "ipmi", count):
+            dash.start()
+            time.sleep(0.5)
+            dash.stop()
+            sched.shutdown()
+        assert calls.count("chassis") >= 2 and calls.count("sensor") >= 1
+
+    def test_run_restores_terminal(self):
+        out = io.StringIO()
+        dash = Dashboard([Target("a", "u", "p")], clock=lambda: 0.0)
+        with mock.patch.object(dash, "start"), mock.patch.object(dashboard.time, "sleep", side_effect=KeyboardInterrupt):
+            dash.run(load_messages("en"), out=out, inp=io.StringIO())
+        text = out.getvalue()
+        assert text.startswith("\033[?1049h\033[?25l")
+        assert text.endswith("\033[?25h\033[?1049l")
+        assert "1 hosts" in text
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import math
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import dcmi
+from ipmi_menu.core.dcmi import (
+    PowerSampler,
+    parse_dcmi_power,
+    rack_matrix,
+    summarize_matrix,
+    write_summaries,
+)
+from ipmi_menu.core.fleet import Target
+
+NAN = float("nan")
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request):
+    if request.param == "numpy":
+        if dcmi.np is None:
+            pytest.skip("numpy not installed")
+        yield
+    else:
+        with mock.patch.object(dcmi, "np", None):
+            yield
+
+READING = """
+    Instantaneous power reading:                   250 Watts
+    Minimum during sampling period:                 90 Watts
+    Maximum during sampling period:                460 Watts
+    Power reading state is:                   activated
+"""
+
+
+class TestParse:
+    def test_reading(self):
+        assert parse_dcmi_power(READING) == 250.0
+
+    def test_no_reading(self):
+        assert parse_dcmi_power("DCMI request failed") is None
+
+
+class TestSummaries:
+    def test_stats(self):
+        (st,) = summarize_matrix(["h"], [[100.0, 200.0, 300.0, NAN]], interval=900)
+        assert st.samples == 3
+        assert st.mean_w == 200.0
+        assert st.p50_w == 200.0
+        assert math.isclose(st.p95_w, 290.0)
+        # 4 ticks of 15 min at a mean of 200 W
+        assert math.isclose(st.energy_wh, 200.0)
+
+    def test_pure_python_matches_numpy_definition(self):
+        with mock.patch.object(dcmi, "np", None):
+            (st,) = summarize_matrix(["h"], [[1.0, 2.0, 3.0, 4.0, 5.0]], interval=1)
+        assert math.isclose(st.p95_w, 4.8)
+
+    def test_no_samples(self):
+        (st,) = summarize_matrix(["h"], [[NAN, NAN]], interval=1)
+        assert st.samples == 0 and st.energy_wh == 0.0
+
+    def test_rack_matrix_fills_missing_with_host_mean(self, backend):
+        keys, rows = rack_matrix(
+            ["a", "b", "c"],
+            [[100.0, NAN], [50.0, 70.0], [NAN, NAN]],
+            {"a": "r1", "b": "r1", "c": "r2"},
+        )
+        assert keys == ["r1", "r2"]
+        assert rows[0] == [150.0, 170.0]
+        assert math.isnan(rows[1][0])
+
+    def test_rack_matrix_no_hosts(self, backend):
+        assert rack_matrix([], [], {}) == ([], [])
+
+    def test_write_summaries(self, tmp_path):
+        path = tmp_path / "s.jsonl"
+        stats = summarize_matrix(["h", "dead"], [[100.0], [NAN]], interval=60)
+        write_summaries(stats, scope="host", window_start=0, window_s=60, path=path)
+        recs = [json.loads(ln) for ln in path.read_text().splitlines()]
+        assert recs[0]["key"] == "h" and recs[0]["mean_w"] == 100.0
+        assert recs[1]["mean_w"] is None
+
+
+class TestSampler:
+    def test_fixed_cadence(self):
+        def fake(host, user, password, interface, port, timeout):
+            return 0, READING.replace("250", "300" if host == "b" else "250"), ""
+
+        targets = [Target("a", "root", None), Target("b", "root", None)]
+        with mock.patch.object(dcmi, "dcmi_power_reading", fake):
+            matrix = PowerSampler(targets, 0.05).sample_window(3)
+        assert matrix == [[250.0] * 3, [300.0] * 3]
+
+    def test_failed_reading_is_missing(self):
+        with mock.patch.object(dcmi, "dcmi_power_reading", lambda *a: (1, "", "timeout")):
+            matrix = PowerSampler([Target("a", "root", None)], 0.01).sample_window(2)
+        assert all(math.isnan(v) for v in matrix[0])
+
+    def test_one_scheduler_for_every_window(self):
+        fake = lambda *a: (0, READING, "")  # noqa: E731
+        with mock.patch.object(dcmi, "dcmi_power_reading", fake), \
+             mock.patch.object(dcmi, "Scheduler", wraps=dcmi.Scheduler) as sched:
+            with PowerSampler([Target("a", "root", None)], 0.01) as sampler:
+                for _ in range(3):
+                    assert sampler.sample_window(2) == [[250.0, 250.0]]
+        assert sched.call_count == 1
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from ipmi_menu.core.fleet import entry_target
+from ipmi_menu.core.hosts import (
+    HostEntry,
+    is_valid_bmc_address,
+    load_hosts,
+    load_inventory,
+    parse_hosts,
+    parse_inventory_csv,
+    parse_inventory_json,
+    tag_value,
+)
+
+
+class TestIsValidBmcAddress:
+    def test_ipv4(self):
+        assert is_valid_bmc_address("10.0.0.1")
+
+    def test_ipv6(self):
+        assert is_valid_bmc_address("fe80::1")
+
+    def test_hostname(self):
+        assert is_valid_bmc_address("bmc-01.rack3.example")
+
+    def test_invalid(self):
+        assert not is_valid_bmc_address("-bad-")
+        assert not is_valid_bmc_address("a b")
+
+
+class TestParseHosts:
+    def test_comments_blanks_and_duplicates(self):
+        lines = ["# rack 3", "10.0.0.1", "", "10.0.0.2  # spare", "10.0.0.1"]
+        assert parse_hosts(lines) == ["10.0.0.1", "10.0.0.2"]
+
+    def test_invalid_reports_line(self):
+        with pytest.raises(ValueError, match="line 2"):
+            parse_hosts(["10.0.0.1", "not valid!"])
+
+    def test_load_file(self, tmp_path):
+        f = tmp_path / "hosts.txt"
+        f.write_text("bmc1\nbmc2\n")
+        assert load_hosts(f) == ["bmc1", "bmc2"]
+
+
+class TestInventory:
+    def test_csv_columns_and_extra_tags(self):
+        inv = parse_inventory_csv([
+            "Host,Group,Tags,Port,Rack",
+            "10.0.0.1,gen9,gpu;prod,,r12",
+            "# 10.0.0.9,old,,,",
+            "10.0.0.2,gen10,prod,6230,",
+            "10.0.0.1,gen10,,,r99",
+        ])
+        assert inv.hosts == [
+            HostEntry("10.0.0.1", "gen9", ("gpu", "prod", "rack=r12")),
+            HostEntry("10.0.0.2", "gen10", ("prod",), port=6230),
+        ]
+        assert [e.address for e in inv.select(["gpu"])] == ["10.0.0.1"]
+        assert tag_value(inv.hosts[0].tags, "rack") == "r12"
+        assert tag_value(inv.hosts[1].tags, "rack") == "-"
+
+    def test_csv_errors(self):
+        with pytest.raises(ValueError, match="no host"):
+            parse_inventory_csv(["name,rack", "a,1"])
+        with pytest.raises(ValueError, match="line 3: invalid BMC"):
+            parse_inventory_csv(["host", "a", "not valid!"])
+        with pytest.raises(ValueError, match="line 2: invalid port"):
+            parse_inventory_csv(["host,port", "a,99999"])
+
+    def test_json_groups(self, monkeypatch):
+        inv = parse_inventory_json({
+            "groups": {"gen-9": {"user": "ADMIN", "interface": "lan"}},
+            "hosts": ["bmc1", {"host": "bmc2", "group": "gen-9", "tags": "a b"}, "bmc1"],
+        })
+        assert [e.address for e in inv.hosts] == ["bmc1", "bmc2"]
+        assert inv.hosts[1].tags == ("a", "b")
+        group = inv.group("gen-9")
+        assert group.password_env == "IPMI_PASSWORD_GEN_9"
+        monkeypatch.setenv("IPMI_PASSWORD_GEN_9", "s3cret")
+        monkeypatch.setenv("IPMI_PASSWORD", "default")
+        t = entry_target(inv.hosts[1], group, "root", None, 623)
+        assert (t.user, t.password, t.interface, t.tags) == ("ADMIN", "s3cret", "lan", ("a", "b"))
+        t = entry_target(inv.hosts[0], None, "root", "lanplus", 623)
+        assert (t.user, t.password, t.interface) == ("root", "default", "lanplus")
+
+    def test_load_by_suffix(self, tmp_path):
+        (tmp_path / "inv.json").write_text(json.dumps(["bmc1", "bmc2"]))
+        (tmp_path / "inv.csv").write_text("bmc,model\nbmc3,r640\n")
+        (tmp_path / "bad.json").write_text("[\n  \"bmc1\",\n")
+        assert load_hosts(tmp_path / "inv.json") == ["bmc1", "bmc2"]
+        assert load_inventory(tmp_path / "inv.csv").hosts[0].tags == ("model=r640",)
+        with pytest.raises(ValueError, match="line"):
+            load_inventory(tmp_path / "bad.json")
+
+    def test_large_inventory(self):
+        lines = ["host,group"] + [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255},g{i % 3}" for i in range(60000)]
+        inv = parse_inventory_csv(lines + lines[1:1000])
+        assert len(inv.hosts) == 60000
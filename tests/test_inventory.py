@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import inventory
+from ipmi_menu.core.inventory import (
+    FRU_AREA_INFO,
+    InventoryStore,
+    fingerprint,
+    parse_fru_devices,
+    parse_inventory,
+    record_inventory,
+    sync_inventory,
+)
+
+MC_INFO = """Device ID                 : 32
+Device Revision           : 1
+Firmware Revision         : 4.40
+IPMI Version              : 2.0
+Manufacturer ID           : 674
+Manufacturer Name         : DELL Inc
+Product ID                : 256 (0x0100)
+Product Name              : Unknown (0x100)
+Device Available          : yes
+"""
+
+FRU = """FRU Device Description : Builtin FRU Device (ID 0)
+ Board Mfg Date        : Mon Jan  1 00:00:00 2018
+ Board Mfg             : DELL
+ Board Product         : PowerEdge R640
+ Board Serial          : CN7016385F0123
+ Product Manufacturer  : DELL
+ Product Name          : PowerEdge R640
+ Product Serial        : 7XK4ABC
+
+FRU Device Description : PSU1 (ID 1)
+ Board Mfg             : DELL
+ Board Product         : PWR SPLY,750W
+ Board Serial          : CNDED0083H0ZZZ
+"""
+
+
+class FakeBmc:
+    def __init__(self, firmware="4.40", area="00 10 00"):
+        self.firmware = firmware
+        self.area = area
+        self.fru = FRU
+        self.calls = []
+
+    def __call__(self, host, user, password, interface, port, timeout, args):
+        self.calls.append(" ".join(args))
+        if args == ["mc", "info"]:
+            return 0, MC_INFO.replace("4.40", self.firmware), ""
+        if args == FRU_AREA_INFO:
+            return 0, self.area, ""
+        if args == ["fru", "print"]:
+            return 0, self.fru.replace("7XK4ABC", f"7XK4{host[-1]}"), ""
+        return 1, "", "Invalid command"
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = InventoryStore(tmp_path / "inventory.db")
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def bmc():
+    fake = FakeBmc()
+    with mock.patch.object(inventory, "ipmi", fake):
+        yield fake
+
+
+def sync(store, host="10.0.0.1", **kw):
+    return sync_inventory(host, "root", "pw", "lanplus", 623, 5, store, **kw)
+
+
+class TestParsing:
+    def test_devices_kept_apart(self):
+        devices = parse_fru_devices(FRU)
+        assert list(devices) == ["Builtin FRU Device (ID 0)", "PSU1 (ID 1)"]
+        assert devices["PSU1 (ID 1)"]["board serial"] == "CNDED0083H0ZZZ"
+
+    def test_record_uses_main_device(self):
+        r = parse_inventory("h", MC_INFO, FRU)
+        assert r.vendor == "dell" and r.manufacturer_id == 674
+        assert r.firmware == "4.40"
+        assert r.board_serial == "CN7016385F0123"  # not the PSU's
+        assert r.serial == "7XK4ABC"
+
+    def test_fingerprint_tracks_firmware_and_fru_size(self):
+        fp = fingerprint(MC_INFO, "00 10 00")
+        assert fp == fingerprint(MC_INFO + "Device Available : no\n", "00  10 00")
+        assert fp != fingerprint(MC_INFO.replace("4.40", "4.41"), "00 10 00")
+        assert fp != fingerprint(MC_INFO, "00 20 00")
+
+
+class TestSync:
+    def test_unchanged_fingerprint_skips_fru(self, store, bmc):
+        first = sync(store)
+        assert first.ok and first.fetched and first.changed
+        second = sync(store)
+        assert second.ok and not second.fetched
+        assert bmc.calls.count("fru print") == 1
+
+    def test_firmware_update_refetches(self, store, bmc):
+        sync(store)
+        bmc.firmware = "4.50"
+        res = sync(store)
+        assert res.fetched and res.changed
+        assert store.get("10.0.0.1").firmware == "4.50"
+
+    def test_refetch_without_change(self, store, bmc):
+        sync(store)
+        res = sync(store, force=True)
+        assert res.fetched and not res.changed
+
+    def test_old_fru_is_refetched(self, store, bmc):
+        sync(store)
+        with mock.patch.object(inventory.time, "time", return_value=time.time() + inventory.FRU_MAX_AGE + 1):
+            assert sync(store).fetched
+
+    def test_unreachable(self, store):
+        with mock.patch.object(inventory, "ipmi", return_value=(1, "", "Unable to establish session")):
+            res = sync(store)
+        assert not res.ok and "Unable" in res.error
+        assert store.get("10.0.0.1") is None
+
+    def test_info_menu_data_not_fetched_again_by_sync(self, store, bmc):
+        record_inventory(store, "10.0.0.1", MC_INFO, FRU, "00 10 00")
+        assert store.get("10.0.0.1").product == "Unknown (0x100)"
+        assert store.get("10.0.0.1").fingerprint == fingerprint(MC_INFO, "00 10 00")
+        assert not sync(store).fetched
+        bmc.area = "00 20 00"  # FRU rewritten since
+        assert sync(store).fetched
+
+
+class TestSearch:
+    @pytest.fixture
+    def filled(self, store, bmc):
+        for i in range(1, 6):
+            bmc.firmware = "4.40" if i < 4 else "5.00"
+            sync(store, host=f"10.0.0.{i}")
+        return store
+
+    def test_filters(self, filled):
+        assert [r.host for r in filled.search(firmware="5.00")] == ["10.0.0.4", "10.0.0.5"]
+        assert len(filled.search(vendor="DELL")) == 5
+        assert [r.host for r in filled.search(serial="7xk42")] == ["10.0.0.2"]
+        assert len(filled.search(serial="CN7016*")) == 5
+        assert filled.search(vendor="dell", firmware="4.4*", limit=2)[1].host == "10.0.0.2"
+
+    def test_wildcards_only_from_star(self, filled):
+        assert filled.search(firmware="4_40") == []
+
+    def test_fru_fields(self, filled):
+        assert filled.find_by_field("Board Serial", "CNDED0083H0ZZZ") == [f"10.0.0.{i}" for i in range(1, 6)]
+        assert filled.fru("10.0.0.1")["PSU1 (ID 1)"]["board product"] == "PWR SPLY,750W"
+
+    def test_indexes_used(self, filled):
+        plan = filled._db.execute(
+            "EXPLAIN QUERY PLAN SELECT host FROM hosts WHERE firmware LIKE ? ESCAPE '\\'", ("4.4%",)
+        ).fetchall()
+        assert any("hosts_by_firmware" in row[-1] for row in plan)
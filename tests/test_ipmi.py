@@ -1,6 +1,13 @@
 from __future__ import annotations
 
-from ipmi_menu.core.ipmi import looks_like_auth_error, normalize_vendor, parse_kv
+from ipmi_menu.core.ipmi import (
+    ipmi_base,
+    looks_like_auth_error,
+    normalize_vendor,
+    parse_kv,
+    parse_power_state,
+    set_host_cipher,
+)
 
 
 class TestParseKv:
@@ -65,3 +72,32 @@ class TestLooksLikeAuthError:
 
     def test_none(self):
         assert not looks_like_auth_error(None)
+
+
+class TestParsePowerState:
+    def test_on(self):
+        assert parse_power_state("Chassis Power is on") == "on"
+
+    def test_off(self):
+        assert parse_power_state("Chassis Power is off\n") == "off"
+
+    def test_garbage(self):
+        assert parse_power_state("Error: timeout") == "unknown"
+
+
+class TestIpmiBaseCipher:
+    def test_no_cipher_by_default(self):
+        assert "-C" not in ipmi_base("10.9.9.9", "root", "pw", "lanplus", 623)
+
+    def test_registered_cipher(self):
+        set_host_cipher("10.9.9.9", 17)
+        try:
+            cmd = ipmi_base("10.9.9.9", "root", "pw", "lanplus", 623)
+            assert cmd[cmd.index("-C") + 1] == "17"
+            # cipher suites only exist for lanplus
+            assert "-C" not in ipmi_base("10.9.9.9", "root", "pw", "lan", 623)
+            # an explicit cipher wins over the registered one
+            cmd = ipmi_base("10.9.9.9", "root", "pw", "lanplus", 623, cipher=3)
+            assert cmd[cmd.index("-C") + 1] == "3"
+        finally:
+            set_host_cipher("10.9.9.9", None)
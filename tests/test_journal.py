@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from ipmi_menu.core.journal import Journal, read_journal
+
+
+class TestJournal:
+    def test_record_and_resume(self, tmp_path):
+        path = tmp_path / "job.journal"
+        with Journal(path, "provision", {"hosts_file": "h.txt"}) as j:
+            j.record("a", True, 1.5, "restore")
+            j.record("b", False, 2.0, "Error:\tno\nresponse")
+
+        with Journal(path, "provision") as j2:
+            assert j2.completed() == {"a"}
+            assert j2.entries["b"].detail == "Error: no response"
+
+    def test_latest_entry_wins(self, tmp_path):
+        path = tmp_path / "job.journal"
+        with Journal(path, "provision") as j:
+            j.record("a", False, 1.0, "timeout")
+            j.record("a", True, 3.0, "")
+        header, entries, count = read_journal(path)
+        assert header["job"] == "provision"
+        assert entries["a"].ok
+        assert count == 2
+
+    def test_truncated_last_line_ignored(self, tmp_path):
+        path = tmp_path / "job.journal"
+        with Journal(path, "provision") as j:
+            j.record("a", True, 1.0)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("b\tok\t1.0")
+        _, entries, _ = read_journal(path)
+        assert set(entries) == {"a"}
+
+    def test_resume_after_cut_line_keeps_new_records(self, tmp_path):
+        path = tmp_path / "job.journal"
+        with Journal(path, "provision") as j:
+            j.record("a", True, 1.0)
+            j.record("b", True, 1.0)
+        data = path.read_bytes()
+        path.write_bytes(data[:-4])  # crash in the middle of the "b" line
+        with Journal(path, "provision") as j:
+            assert j.completed() == {"a"}
+            j.record("c", True, 2.0)
+        _, entries, _ = read_journal(path)
+        assert set(entries) == {"a", "c"}
+        assert path.read_bytes().endswith(b"\n")
+
+    def test_job_mismatch(self, tmp_path):
+        path = tmp_path / "job.journal"
+        Journal(path, "provision").close()
+        with pytest.raises(ValueError):
+            Journal(path, "audit")
+
+    def test_compaction(self, tmp_path):
+        path = tmp_path / "job.journal"
+        with Journal(path, "provision") as j:
+            for _ in range(5):
+                j.record("a", False, 1.0, "retry")
+        with Journal(path, "provision") as j2:
+            assert "a" in j2.entries
+        _, _, count = read_journal(path)
+        assert count == 1
+
+    def test_large_journal_is_fast(self, tmp_path):
+        path = tmp_path / "job.journal"
+        with Journal(path, "provision") as j:
+            for i in range(50000):
+                j.record(f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}", i % 7 != 0, 12.5, "ok")
+        start = time.perf_counter()
+        with Journal(path, "provision") as j2:
+            done = j2.completed()
+        assert len(done) == 50000 - len(range(0, 50000, 7))
+        assert time.perf_counter() - start < 2.0
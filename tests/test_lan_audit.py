@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import lan_audit
+from ipmi_menu.core.lan_audit import LanAuditStore, audit, collect, normalize, parse_user_list, snapshot
+
+LAN = """Set in Progress         : Set Complete
+Auth Type Support       : MD5 PASSWORD
+Auth Type Enable        : Callback : MD5 PASSWORD
+                        : User     : MD5 PASSWORD
+                        : Admin    : MD5 PASSWORD
+IP Address Source       : Static Address
+IP Address              : 10.0.0.11
+Subnet Mask             : 255.255.255.0
+MAC Address             : 0c:c4:7a:11:22:33
+Default Gateway IP      : 10.0.0.1
+802.1q VLAN ID          : Disabled
+"""
+
+USERS = """ID  Name	     Callin  Link Auth	IPMI Msg   Channel Priv Limit
+1                    true    false      false      NO ACCESS
+2   root             true    true       true       ADMINISTRATOR
+3   ops              true    false      true       USER
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = LanAuditStore(tmp_path / "audit.db")
+    yield s
+    s.close()
+
+
+class TestNormalize:
+    def test_user_list(self):
+        users = parse_user_list(USERS)
+        assert list(users) == ["user 2", "user 3"]
+        assert users["user 2"] == "root, callin=true, link=true, ipmi=true, priv=ADMINISTRATOR"
+
+    def test_record(self):
+        rec = normalize(snapshot("h", LAN, USERS))
+        assert rec["ip address source"] == "Static Address"
+        assert rec["auth type enable"] == "Callback : MD5 PASSWORD; User : MD5 PASSWORD; Admin : MD5 PASSWORD"
+        assert "set in progress" not in rec
+        assert rec["user 3"].endswith("priv=USER")
+
+    def test_digest_ignores_volatile_and_spacing(self):
+        base = snapshot("h", LAN, USERS).digest
+        busy = LAN.replace("Set Complete", "Set In Progress").replace("10.0.0.11", "10.0.0.11   ")
+        assert snapshot("h", busy, USERS).digest == base
+        assert snapshot("h", LAN.replace("Disabled", "100"), USERS).digest != base
+
+
+class TestAudit:
+    def test_first_run_then_only_drift(self, store):
+        drifts = audit([snapshot("a", LAN, USERS), snapshot("b", LAN, USERS)], store)
+        assert [(d.host, d.new) for d in drifts] == [("a", True), ("b", True)]
+        assert audit([snapshot("a", LAN, USERS), snapshot("b", LAN, USERS)], store) == []
+
+        changed = LAN.replace("802.1q VLAN ID          : Disabled", "802.1q VLAN ID          : 100")
+        (d,) = audit([snapshot("a", LAN, USERS), snapshot("b", changed, USERS.replace("USER", "OPERATOR"))], store)
+        assert d.host == "b" and not d.new
+        assert d.changes == [
+            ("802.1q vlan id", "Disabled", "100"),
+            ("user 3", "ops, callin=true, link=false, ipmi=true, priv=USER",
+             "ops, callin=true, link=false, ipmi=true, priv=OPERATOR"),
+        ]
+
+    def test_unchanged_hosts_are_not_parsed(self, store):
+        audit([snapshot("a", LAN, USERS)], store)
+        with mock.patch.object(lan_audit, "normalize", wraps=normalize) as norm:
+            audit([snapshot("a", LAN, USERS)], store)
+        assert norm.call_count == 0
+
+    def test_unreachable_host_keeps_its_record(self, store):
+        audit([snapshot("a", LAN, USERS)], store)
+        audit([], store)
+        assert store.digests() == {"a": snapshot("a", LAN, USERS).digest}
+
+
+class TestCollect:
+    def test_lan_and_users(self):
+        calls = []
+
+        def fake(host, user, password, interface, port, timeout, args):
+            calls.append(args)
+            if args[0] == "lan":
+                return 0, LAN, ""
+            return 0, USERS, ""
+
+        with mock.patch.object(lan_audit, "ipmi", fake), mock.patch("ipmi_menu.core.ipmi.ipmi", fake):
+            snap, err = collect("h", "u", "p", "lanplus", 623, 5, channel=2)
+        assert err == "" and snap is not None
+        assert calls == [["lan", "print", "2"], ["user", "list", "2"]]
+
+    def test_failure(self):
+        with mock.patch("ipmi_menu.core.ipmi.ipmi", return_value=(1, "", "Unable to establish session")):
+            snap, err = collect("h", "u", "p", "lanplus", 623, 5)
+        assert snap is None and "Unable" in err
+
+    def test_user_list_failure_fails_the_host(self):
+        def fake(host, user, password, interface, port, timeout, args):
+            if args[0] == "lan":
+                return 0, LAN, ""
+            return 1, "", "Insufficient privilege level"
+
+        with mock.patch.object(lan_audit, "ipmi", fake), mock.patch("ipmi_menu.core.ipmi.ipmi", fake):
+            snap, err = collect("h", "u", "p", "lanplus", 623, 5)
+        assert snap is None and "privilege" in err
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.config import preferences
+from ipmi_menu.core import negotiate as neg
+from ipmi_menu.core.ipmi import ipmi_base, set_host_cipher
+from ipmi_menu.core.negotiate import LinkProfile, negotiate, negotiate_many, probe_link
+
+
+@pytest.fixture(autouse=True)
+def tmp_prefs(tmp_path):
+    with mock.patch.object(preferences, "PREFERENCES_FILE", tmp_path / "preferences.json"), \
+         mock.patch.object(preferences, "CONFIG_DIR", tmp_path):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    yield
+    for h in ("a", "b", "c"):
+        set_host_cipher(h, None)
+
+
+def fake_bmc(behaviour):
+    """
+    behaviour maps (interface, cipher) to (delay, ok); cipher None means no -C,
+    and ok may be the error text of a failure. Returns the run_cmd
+    replacement and the list of commands seen.
+    """
+    seen = []
+
+    def run(cmd, timeout):
+        iface = cmd[cmd.index("-I") + 1]
+        cipher = int(cmd[cmd.index("-C") + 1]) if "-C" in cmd else None
+        seen.append((cmd[cmd.index("-H") + 1], iface, cipher))
+        delay, ok = behaviour.get((iface, cipher), (0.0, False))
+        time.sleep(delay)
+        if ok is True:
+            return 0, "Device ID : 32", ""
+        return 1, "", ok or "Unable to establish IPMI v2 / RMCP+ session"
+
+    return run, seen
+
+
+class TestProbeLink:
+    def test_preferred_first(self):
+        run, seen = fake_bmc({("lanplus", 17): (0.3, True), ("lanplus", 3): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert probe_link("a", "u", "p", 623) == LinkProfile("lanplus", 17)
+        assert seen == [("a", "lanplus", 17)]
+
+    def test_slow_preferred_is_staggered(self):
+        run, seen = fake_bmc({("lanplus", 17): (0.5, True), ("lanplus", 3): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert probe_link("a", "u", "p", 623, stagger=0.1) == LinkProfile("lanplus", 3)
+        assert seen == [("a", "lanplus", 17), ("a", "lanplus", 3)]
+
+    def test_only_lan(self):
+        run, _ = fake_bmc({("lan", None): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert probe_link("a", "u", "p", 623) == LinkProfile("lan")
+
+    def test_nothing_works(self):
+        run, seen = fake_bmc({})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert probe_link("a", "u", "p", 623) is None
+        assert len(seen) == len(neg.CANDIDATES)
+
+    def test_bad_credentials_cost_one_login(self):
+        refused = "Error: Unable to establish IPMI v2 / RMCP+ session\nRAKP 2 HMAC is invalid"
+        run, seen = fake_bmc({("lanplus", 17): (0.0, refused)})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert probe_link("a", "u", "p", 623) is None
+        assert seen == [("a", "lanplus", 17)]
+
+    def test_inflight_capped(self):
+        inflight, peak, lock = [0], [0], threading.Lock()
+        slow, _ = fake_bmc({(c.interface, c.cipher): (0.1, c.interface == "lan") for c in neg.CANDIDATES})
+
+        def run(cmd, timeout):
+            with lock:
+                inflight[0] += 1
+                peak[0] = max(peak[0], inflight[0])
+            try:
+                return slow(cmd, timeout)
+            finally:
+                with lock:
+                    inflight[0] -= 1
+
+        with mock.patch.object(neg, "run_cmd", run):
+            assert probe_link("a", "u", "p", 623, stagger=0.01) == LinkProfile("lan")
+        assert peak[0] == neg.PROBE_MAX_INFLIGHT
+
+
+class TestNegotiate:
+    def test_probe_then_cache(self):
+        run, seen = fake_bmc({("lanplus", 17): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert negotiate("a", "u", "p", 623) == LinkProfile("lanplus", 17)
+            n = len(seen)
+            assert negotiate("a", "u", "p", 623) == LinkProfile("lanplus", 17)
+        assert len(seen) == n  # second call served from the cache
+        assert preferences.get_host_profile("a") == {"interface": "lanplus", "cipher": 17}
+        cmd = ipmi_base("a", "u", "p", "lanplus", 623)
+        assert cmd[cmd.index("-C") + 1] == "17"
+
+    def test_verify_reprobes_stale_cache(self):
+        preferences.set_host_profile("a", {"interface": "lanplus", "cipher": 17})
+        run, _ = fake_bmc({("lanplus", 3): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert negotiate("a", "u", "p", 623, verify=True) == LinkProfile("lanplus", 3)
+        assert preferences.get_host_profile("a")["cipher"] == 3
+
+    def test_link_cached_per_port(self):
+        run, seen = fake_bmc({("lanplus", 17): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            negotiate("a", "u", "p", 623)
+            assert negotiate("a", "u", "p", 6230) == LinkProfile("lanplus", 17)
+        assert len(seen) == 2  # the link probed on 623 says nothing about 6230
+        assert preferences.get_host_profile("a") == {"interface": "lanplus", "cipher": 17, "port": 6230}
+        assert neg.cached_link("a", 623) is None
+
+    def test_unreachable_not_cached(self):
+        run, _ = fake_bmc({})
+        with mock.patch.object(neg, "run_cmd", run):
+            assert negotiate("a", "u", "p", 623) is None
+        assert preferences.get_host_profile("a") is None
+
+
+class TestNegotiateMany:
+    def test_probes_only_unknown_hosts(self):
+        preferences.set_host_profile("a", {"interface": "lan", "cipher": None})
+        run, seen = fake_bmc({("lanplus", None): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            links = negotiate_many(["a", "b", "c"], "u", "p", 623, workers=2)
+        assert links == {"a": LinkProfile("lan"), "b": LinkProfile("lanplus"), "c": LinkProfile("lanplus")}
+        assert {h for h, _, _ in seen} == {"b", "c"}
+        assert preferences.get_host_profile("c") == {"interface": "lanplus", "cipher": None}
+
+    def test_refresh(self):
+        preferences.set_host_profile("a", {"interface": "lan", "cipher": None})
+        run, _ = fake_bmc({("lanplus", 17): (0.0, True)})
+        with mock.patch.object(neg, "run_cmd", run):
+            links = negotiate_many(["a"], "u", "p", 623, refresh=True)
+        assert links == {"a": LinkProfile("lanplus", 17)}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import random
+import threading
+from unittest import mock
+
+from ipmi_menu.core import power_wait
+from ipmi_menu.core.fleet import Target
+from ipmi_menu.core.power_wait import backoff_delay, wait_for_power_state
+from ipmi_menu.core.scheduler import Scheduler
+
+
+def _fake_power(states):
+    """Return a power() stand-in replaying a list of states per host."""
+    lock = threading.Lock()
+    calls = {h: 0 for h in states}
+
+    def fake(host, user, password, interface, port, timeout, mode, refresh=False):
+        assert mode == "status" and refresh
+        with lock:
+            seq = states[host]
+            st = seq[min(calls[host], len(seq) - 1)]
+            calls[host] += 1
+        return 0, f"Chassis Power is {st}", ""
+
+    return fake, calls
+
+
+class TestBackoff:
+    def test_bounded_by_cap(self):
+        rng = random.Random(1)
+        for attempt in range(20):
+            d = backoff_delay(attempt, 0.5, 4.0, rng)
+            assert 0 < d <= 4.0
+
+    def test_grows(self):
+        rng = random.Random(1)
+        assert backoff_delay(0, 1.0, 60.0, rng) <= 1.0
+        assert backoff_delay(4, 1.0, 60.0, rng) >= 8.0
+
+
+class TestWaitForPowerState:
+    def test_reached(self):
+        fake, calls = _fake_power({"a": ["off", "off", "on"]})
+        with mock.patch.object(power_wait, "power", fake):
+            res = wait_for_power_state([Target("a", "root", "x")], "on", 5, base_interval=0.01, max_interval=0.02)
+        assert res[0].reached
+        assert res[0].polls == 3
+        assert calls["a"] == 3
+
+    def test_timeout(self):
+        fake, _ = _fake_power({"a": ["off"]})
+        with mock.patch.object(power_wait, "power", fake):
+            res = wait_for_power_state([Target("a", "root", "x")], "on", 0.2, base_interval=0.01, max_interval=0.05)
+        assert not res[0].reached
+        assert res[0].state == "off"
+        assert res[0].elapsed >= 0.2
+
+    def test_many_hosts_shared_scheduler(self):
+        states = {f"h{i}": ["off"] * (i % 3) + ["on"] for i in range(20)}
+        fake, _ = _fake_power(states)
+        targets = [Target(h, "root", None) for h in states]
+        with mock.patch.object(power_wait, "power", fake), Scheduler(max_workers=4) as sched:
+            res = wait_for_power_state(targets, "on", 5, base_interval=0.01, max_interval=0.02, scheduler=sched)
+        assert [r.host for r in res] == list(states)
+        assert all(r.reached for r in res)
+
+    def test_empty(self):
+        assert wait_for_power_state([], "on", 1) == []
+
+    def test_poll_exception_is_retried(self):
+        fake, calls = _fake_power({"a": ["on"]})
+        failures = [RuntimeError("daemon reply garbled")]
+
+        def flaky(*args, **kw):
+            if failures:
+                raise failures.pop()
+            return fake(*args, **kw)
+
+        with mock.patch.object(power_wait, "power", flaky):
+            res = wait_for_power_state([Target("a", "root", "x")], "on", 5, base_interval=0.01, max_interval=0.02)
+        assert res[0].reached and res[0].polls == 2
+
+    def test_via_requires_the_transition(self):
+        fake, _ = _fake_power({"a": ["on", "off", "on"], "b": ["on"]})
+        targets = [Target("a", "root", "x"), Target("b", "root", "x")]
+        with mock.patch.object(power_wait, "power", fake):
+            res = wait_for_power_state(
+                targets, "on", 5, base_interval=0.01, max_interval=0.02, via="off", via_window=0.2
+            )
+        assert (res[0].reached, res[0].verified, res[0].polls) == (True, True, 3)
+        assert (res[1].reached, res[1].verified) == (True, False)
+        assert res[1].elapsed >= 0.2
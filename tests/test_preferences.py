@@ -89,3 +89,74 @@ class TestMigration:
 
         pw = preferences.get_preferred_password()
         assert pw == "mypass"
+
+
+class TestHostProfiles:
+    def test_roundtrip(self, tmp_prefs):
+        preferences.set_host_profile("10.0.0.1", {"interface": "lanplus", "cipher": 17})
+        assert preferences.get_host_profile("10.0.0.1") == {"interface": "lanplus", "cipher": 17}
+        assert preferences.get_host_profile("10.0.0.2") is None
+
+    def test_batch_and_forget(self, tmp_prefs):
+        preferences.set_preferred_username("admin")
+        preferences.set_host_profiles({"a": {"interface": "lan"}, "b": {"interface": "lanplus"}})
+        preferences.set_host_profile("a", None)
+        assert preferences.get_host_profile("a") is None
+        assert preferences.get_host_profile("b") == {"interface": "lanplus"}
+        assert preferences.get_preferred_username() == "admin"
+
+    def test_update_keeps_other_fields(self, tmp_prefs):
+        preferences.set_host_profile("a", {"interface": "lan", "user": "ops"})
+        preferences.update_host_profiles({"a": {"interface": "lanplus", "cipher": 17}, "b": {"interface": "lan"}})
+        assert preferences.get_host_profile("a") == {"interface": "lanplus", "cipher": 17, "user": "ops"}
+        assert preferences.get_host_profiles(["a", "b", "c"]).keys() == {"a", "b"}
+
+
+class TestPreferencesStore:
+    def test_loads_once(self, tmp_prefs):
+        preferences.set_host_profiles({f"10.0.{i // 256}.{i % 256}": {"interface": "lanplus"} for i in range(3000)})
+        store = preferences.PreferencesStore(tmp_prefs)
+        with mock.patch.object(store, "_read", wraps=store._read) as read:
+            for i in range(3000):
+                assert store.host(f"10.0.{i // 256}.{i % 256}") == {"interface": "lanplus"}
+            assert store.get("language", "fr") == "fr"
+        assert read.call_count == 1
+
+    def test_reloads_when_file_replaced(self, tmp_prefs):
+        store = preferences.PreferencesStore(tmp_prefs)
+        assert store.get("language") is None
+        other = preferences.PreferencesStore(tmp_prefs)  # another process
+        other.set("language", "en")
+        assert store.get("language") == "en"
+
+    def test_concurrent_writers_merge(self, tmp_prefs):
+        a = preferences.PreferencesStore(tmp_prefs)
+        b = preferences.PreferencesStore(tmp_prefs)
+        a.get("language")
+        b.get("language")
+        a.set("username", "admin")
+        b.set("language", "en")  # b's copy predates a's write
+        raw = json.loads(tmp_prefs.read_text())
+        assert raw["username"] == "admin" and raw["language"] == "en"
+
+    def test_batch_writes_once(self, tmp_prefs):
+        store = preferences.get_store()
+        with mock.patch.object(preferences.os, "replace", wraps=os.replace) as replace:
+            with store.batch():
+                preferences.set_preferred_username("admin")
+                preferences.set_preferred_language("en")
+                preferences.set_host_profile("a", {"interface": "lan"})
+                assert preferences.get_preferred_username() == "admin"  # visible before the flush
+                assert not tmp_prefs.exists()
+        assert replace.call_count == 1
+        raw = json.loads(tmp_prefs.read_text())
+        assert raw["username"] == "admin" and raw["hosts"] == {"a": {"interface": "lan"}}
+
+    def test_atomic_write_leaves_no_temp_file(self, tmp_prefs):
+        preferences.set_preferred_language("en")
+        assert sorted(p.name for p in tmp_prefs.parent.iterdir()) == ["preferences.json", "preferences.json.lock"]
+
+    def test_snapshot_is_a_copy(self, tmp_prefs):
+        preferences.set_host_profile("a", {"interface": "lan"})
+        preferences.load_preferences()["hosts"]["a"]["interface"] = "x"
+        assert preferences.get_host_profile("a") == {"interface": "lan"}
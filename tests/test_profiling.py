@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import ipmi as ipmi_mod
+from ipmi_menu.core.profiling import Profiler, describe, profiler
+from ipmi_menu.core.utils import run_cmd
+
+
+@pytest.fixture
+def enabled():
+    profiler.reset()
+    profiler.enable()
+    yield profiler
+    profiler.enabled = False
+    profiler.reset()
+
+
+class TestDescribe:
+    def test_ipmitool(self):
+        cmd = ["ipmitool", "-I", "lanplus", "-H", "10.0.0.5", "-p", "623", "-U", "root", "-C", "17", "-P", "pw",
+               "chassis", "power", "status"]
+        assert describe(cmd) == ("10.0.0.5", "chassis power status")
+
+    def test_password_never_in_command(self):
+        _, command = describe(["ipmitool", "-H", "h", "-P", "hunter2", "mc", "info"])
+        assert "hunter2" not in command
+
+    def test_other_program(self):
+        assert describe(["/usr/bin/echo", "hi"]) == ("-", "echo")
+
+
+class TestHistogram:
+    def test_buckets_and_percentiles(self):
+        p = Profiler()
+        p.enable()
+        for ms in (5, 5, 5, 40, 3000):
+            p.record("h", "mc info", time.time(), 0.001, ms / 1000, 0, 10, 0)
+        h = p.by_command["mc info"]
+        assert h.n == 5
+        assert h.counts[0] == 3  # < 10ms
+        assert h.percentile(0.5) == 10  # upper bound of the bucket
+        assert h.percentile(0.95) == 3000.0
+        assert p.by_host[("h", "mc info")].n == 5
+
+    def test_disabled_records_nothing(self):
+        p = Profiler()
+        p.record("h", "mc info", time.time(), 0.0, 0.1, 0, 0, 0)
+        assert p.records == [] and p.by_command == {}
+
+
+class TestInstrumentation:
+    def test_run_cmd_records_call(self, enabled):
+        rc, _, _ = run_cmd(["echo", "hello"], timeout=5)
+        assert rc == 0
+        (r,) = enabled.records
+        assert r.command == "echo"
+        assert r.rc == 0 and r.out_bytes == 5
+        assert 0 <= r.spawn_s <= r.wall_s
+
+    def test_fallback_marked_as_retry(self, enabled):
+        def fake(cmd, timeout):
+            ok = cmd[-1] == "1"
+            enabled.record_cmd(cmd, time.time(), 0.0, 0.01, 0 if ok else 1, "IP Address : x" if ok else "", "")
+            return (0, "IP Address : x", "") if ok else (1, "", "error")
+
+        with mock.patch.object(ipmi_mod, "run_cmd", fake):
+            rc, _, _ = ipmi_mod.ipmi_lan_print("h", "u", "p", "lanplus", 623, 5)
+        assert rc == 0
+        assert [(r.command, r.retry) for r in enabled.records] == [("lan print", False), ("lan print 1", True)]
+        assert enabled.by_command["lan print 1"].retries == 1
+
+    def test_summary_and_trace(self, enabled, tmp_path):
+        enabled.record("10.0.0.1", "chassis status", time.time(), 0.002, 0.12, 0, 200, 0)
+        enabled.record("10.0.0.2", "chassis status", time.time(), 0.002, 0.30, 1, 0, 20)
+        text = enabled.summary()
+        assert "chassis status" in text and "10.0.0.2" in text
+
+        path = tmp_path / "trace.json"
+        enabled.write_trace(path)
+        events = json.loads(path.read_text())["traceEvents"]
+        names = [e["args"]["name"] for e in events if e["ph"] == "M"]
+        calls = [e for e in events if e["ph"] == "X"]
+        assert names == ["10.0.0.1", "10.0.0.2"]
+        assert [c["dur"] for c in calls] == [120000, 300000]
+        assert calls[1]["args"]["rc"] == 1
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import threading
+import time
+from unittest import mock
+
+from ipmi_menu.core import power_wait, provision
+from ipmi_menu.core.fleet import Target
+from ipmi_menu.core.provision import ProvisionPipeline, StageStats
+
+
+class FakeBmc:
+    """Records calls and answers like ipmitool would for a set of hosts."""
+
+    def __init__(self, off_hosts=(), broken_hosts=(), cycle_lag=0):
+        self.off = set(off_hosts)
+        self.broken = set(broken_hosts)
+        # Status answers after a cycle: still on for `cycle_lag` polls, then off once
+        self.cycle_lag = cycle_lag
+        self.pending = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def bootdev(self, host, user, password, interface, port, timeout, device, *, uefi, persistent):
+        with self.lock:
+            self.calls.append((host, "bootdev", device))
+        if host in self.broken:
+            return 1, "", "Error setting Chassis Boot Parameter"
+        return 0, f"Set Boot Device to {device}", ""
+
+    def power(self, host, user, password, interface, port, timeout, mode, refresh=False):
+        with self.lock:
+            self.calls.append((host, "power", mode))
+            if mode == "status":
+                script = self.pending.get(host)
+                state = script.pop(0) if script else ("off" if host in self.off else "on")
+                return 0, f"Chassis Power is {state}", ""
+            if mode == "cycle" and host in self.off:
+                return 1, "", "Command not supported in present state"
+            if mode == "cycle":
+                self.pending[host] = ["on"] * self.cycle_lag + ["off"]
+            if mode == "on":
+                self.off.discard(host)
+        return 0, f"Chassis Power Control: {mode}", ""
+
+
+def _run(bmc, hosts, **kw):
+    targets = [Target(h, "root", "x") for h in hosts]
+    with mock.patch.object(provision, "bootdev", bmc.bootdev), \
+         mock.patch.object(provision, "power", bmc.power), \
+         mock.patch.object(power_wait, "power", bmc.power):
+        pipeline = ProvisionPipeline(targets, settle=0, wait_timeout=2, workers=3, poll_interval=0.01, **kw)
+        return pipeline, pipeline.run()
+
+
+class TestProvisionPipeline:
+    def test_all_stages(self):
+        bmc = FakeBmc()
+        pipeline, results = _run(bmc, ["a", "b", "c", "d"], restore_disk=True)
+        assert [r.host for r in results] == ["a", "b", "c", "d"]
+        assert all(r.ok and r.stage == "restore" for r in results)
+        assert pipeline.stats["cycle"].ok == 4
+        assert ("a", "bootdev", "disk") in bmc.calls
+
+    def test_failure_stops_host(self):
+        bmc = FakeBmc(broken_hosts={"b"})
+        pipeline, results = _run(bmc, ["a", "b"])
+        assert results[0].ok
+        assert not results[1].ok and results[1].stage == "bootdev"
+        assert not any(c[0] == "b" and c[1] == "power" for c in bmc.calls)
+        assert pipeline.stats["bootdev"].failed == 1
+
+    def test_powered_off_host_is_powered_on(self):
+        bmc = FakeBmc(off_hosts={"a"})
+        _, results = _run(bmc, ["a"])
+        assert results[0].ok
+        assert ("a", "power", "on") in bmc.calls
+
+    def test_cycle_not_started_yet_is_not_on(self):
+        bmc = FakeBmc(cycle_lag=3)
+        _, results = _run(bmc, ["a"], restore_disk=True)
+        assert results[0].ok and "not seen" not in results[0].detail
+        polls = [c for c in bmc.calls if c[1:] == ("power", "status")]
+        # disk boot is restored only after the off phase, not on the first "on"
+        assert len(polls) == 5
+        assert bmc.calls.index(("a", "bootdev", "disk")) > bmc.calls.index(("a", "power", "cycle")) + 5
+
+    def test_empty(self):
+        assert ProvisionPipeline([]).run() == []
+
+    def test_power_waits_hold_no_worker(self):
+        bmc = FakeBmc(off_hosts=set("abcd"))  # powered on, then waited for after `settle`
+        targets = [Target(h, "root", "x") for h in "abcd"]
+        with mock.patch.object(provision, "bootdev", bmc.bootdev), \
+             mock.patch.object(provision, "power", bmc.power), \
+             mock.patch.object(power_wait, "power", bmc.power):
+            started = time.monotonic()
+            results = ProvisionPipeline(targets, settle=0.3, wait_timeout=2, workers=1).run()
+        assert all(r.ok for r in results)
+        # one worker: blocking waits would take 4 x 0.3 s in a row
+        assert time.monotonic() - started < 0.9
+
+
+class TestStageStats:
+    def test_percentile_and_throughput(self):
+        st = StageStats("x")
+        for i in range(10):
+            st.record(float(i), float(i) + 1.0 + i, True)
+        assert st.ok == 10
+        assert st.percentile(0.5) == 6.0
+        assert st.throughput > 0
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import json
+import shutil
+import ssl
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.config import preferences
+from ipmi_menu.core import redfish
+from ipmi_menu.core.anomaly import parse_sensor_list
+from ipmi_menu.core.chassis import parse_chassis_status
+from ipmi_menu.core.dcmi import parse_dcmi_power
+from ipmi_menu.core.ipmi import bootdev, ipmi, parse_kv, parse_power_state, power
+
+
+class MockBmc:
+    """A minimal Redfish service: one system, chassis and manager."""
+
+    def __init__(self):
+        self.power_state = "Off"
+        self.boot = {}
+        self.resets = []
+        self.tokens = set()
+        self.logins = 0
+        self.connections = 0
+        self.requests = 0
+        self.allowed_resets = ["On", "ForceOff", "GracefulShutdown", "ForceRestart", "PowerCycle"]
+        self.docs = {
+            "/redfish/v1/Systems": {"Members": [{"@odata.id": "/redfish/v1/Systems/1"}]},
+            "/redfish/v1/Chassis": {"Members": [{"@odata.id": "/redfish/v1/Chassis/1"}]},
+            "/redfish/v1/Managers": {"Members": [{"@odata.id": "/redfish/v1/Managers/1"}]},
+            "/redfish/v1/Chassis/1": {
+                "Manufacturer": "Acme", "Model": "Board X", "SerialNumber": "CH123",
+                "PhysicalSecurity": {"IntrusionSensor": "HardwareIntrusion"},
+            },
+            "/redfish/v1/Managers/1": {"FirmwareVersion": "2.10"},
+            "/redfish/v1/Chassis/1/Thermal": {
+                "Temperatures": [
+                    {"Name": "CPU1 Temp", "ReadingCelsius": 45, "UpperThresholdCritical": 90,
+                     "Status": {"Health": "OK"}},
+                    {"Name": "Absent", "ReadingCelsius": None},
+                ],
+                "Fans": [{"Name": "FAN1", "Reading": 5400, "ReadingUnits": "RPM", "LowerThresholdCritical": 600,
+                          "Status": {"Health": "Warning"}}],
+            },
+            "/redfish/v1/Chassis/1/Power": {
+                "Voltages": [{"Name": "12V", "ReadingVolts": 12.1}],
+                "PowerControl": [{"Name": "System Power", "PowerConsumedWatts": 215}],
+            },
+        }
+
+    def system(self):
+        return {
+            "@odata.id": "/redfish/v1/Systems/1",
+            "PowerState": self.power_state,
+            "Manufacturer": "Acme", "Model": "Server 1", "SerialNumber": "SYS42",
+            "Actions": {"#ComputerSystem.Reset": {
+                "target": "/redfish/v1/Systems/1/Actions/ComputerSystem.Reset",
+                "ResetType@Redfish.AllowableValues": self.allowed_resets,
+            }},
+        }
+
+    def handler(bmc):  # noqa: N805 - closes over the mock
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                bmc.connections += 1
+                super().setup()
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, doc=None, headers=()):
+                body = json.dumps(doc).encode() if doc is not None else b""
+                self.send_response(status)
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def body(self):
+                n = int(self.headers.get("Content-Length", 0))
+                return json.loads(self.rfile.read(n)) if n else None
+
+            def authorized(self):
+                bmc.requests += 1
+                if self.headers.get("X-Auth-Token") in bmc.tokens:
+                    return True
+                self.reply(401, {"error": "unauthorized"})
+                return False
+
+            def do_POST(self):
+                data = self.body()
+                if self.path == "/redfish/v1/SessionService/Sessions":
+                    if data != {"UserName": "admin", "Password": "secret"}:
+                        return self.reply(401, {})
+                    bmc.logins += 1
+                    token = f"tok{bmc.logins}"
+                    bmc.tokens.add(token)
+                    return self.reply(201, {}, [("X-Auth-Token", token), ("Location", f"/sessions/{token}")])
+                if not self.authorized():
+                    return
+                if self.path.endswith("ComputerSystem.Reset"):
+                    bmc.resets.append(data["ResetType"])
+                    bmc.power_state = "Off" if data["ResetType"] in ("ForceOff", "GracefulShutdown") else "On"
+                    return self.reply(204)
+                self.reply(404, {})
+
+            def do_PATCH(self):
+                data = self.body()
+                if not self.authorized():
+                    return
+                if self.path == "/redfish/v1/Systems/1":
+                    bmc.boot = data["Boot"]
+                    return self.reply(204)
+                self.reply(404, {})
+
+            def do_GET(self):
+                if not self.authorized():
+                    return
+                if self.path == "/redfish/v1/Systems/1":
+                    return self.reply(200, bmc.system())
+                doc = bmc.docs.get(self.path)
+                self.reply(200 if doc is not None else 404, doc or {})
+
+            def do_DELETE(self):
+                token = self.path.rsplit("/", 1)[-1]
+                bmc.tokens.discard(token)
+                self.reply(204)
+
+        return Handler
+
+
+@pytest.fixture
+def bmc():
+    mock_bmc = MockBmc()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_bmc.handler())
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    mock_bmc.port = server.server_address[1]
+    with mock.patch.object(redfish, "SCHEME", "http"):
+        yield mock_bmc
+        redfish.close_all()
+    server.shutdown()
+    server.server_close()
+
+
+def call(bmc, args, password="secret"):
+    return ipmi("127.0.0.1", "admin", password, "redfish", bmc.port, 5, args)
+
+
+class TestRedfishOperations:
+    def test_power_status_and_on(self, bmc):
+        rc, out, _ = power("127.0.0.1", "admin", "secret", "redfish", bmc.port, 5, "status")
+        assert rc == 0 and parse_power_state(out) == "off"
+        rc, _, _ = power("127.0.0.1", "admin", "secret", "redfish", bmc.port, 5, "on")
+        assert rc == 0 and bmc.resets == ["On"]
+        _, out, _ = power("127.0.0.1", "admin", "secret", "redfish", bmc.port, 5, "status")
+        assert parse_power_state(out) == "on"
+
+    def test_cycle_falls_back_to_allowed_reset(self, bmc):
+        bmc.allowed_resets = ["On", "ForceOff", "ForceRestart"]
+        rc, _, _ = power("127.0.0.1", "admin", "secret", "redfish", bmc.port, 5, "cycle")
+        assert rc == 0 and bmc.resets == ["ForceRestart"]
+
+    def test_bootdev_override(self, bmc):
+        rc, _, _ = bootdev(
+            "127.0.0.1", "admin", "secret", "redfish", bmc.port, 5, "pxe", uefi=True, persistent=False
+        )
+        assert rc == 0
+        assert bmc.boot == {
+            "BootSourceOverrideTarget": "Pxe",
+            "BootSourceOverrideEnabled": "Once",
+            "BootSourceOverrideMode": "UEFI",
+        }
+
+    def test_sensors_in_ipmitool_format(self, bmc):
+        rc, out, _ = call(bmc, ["sensor"])
+        assert rc == 0
+        readings = {r.name: r for r in parse_sensor_list(out)}
+        assert set(readings) == {"CPU1 Temp", "FAN1", "12V", "System Power"}
+        assert readings["CPU1 Temp"].upper_critical == 90.0
+        assert readings["FAN1"].status == "nc"
+        assert readings["FAN1"].lower_critical == 600.0
+
+    def test_fru_mc_info_and_power_reading(self, bmc):
+        fru = parse_kv(call(bmc, ["fru", "print"])[1])
+        assert fru["product name"] == "Server 1"
+        assert fru["board serial"] == "CH123"
+        assert parse_kv(call(bmc, ["mc", "info"])[1])["firmware revision"] == "2.10"
+        assert parse_dcmi_power(call(bmc, ["dcmi", "power", "reading"])[1]) == 215.0
+
+    def test_chassis_status(self, bmc):
+        st = parse_chassis_status(call(bmc, ["chassis", "status"])[1])
+        assert st.power == "off"
+        assert st.intrusion is True
+
+    def test_unsupported(self, bmc):
+        rc, _, err = call(bmc, ["sel", "elist"])
+        assert rc == 1 and "not supported" in err
+
+    def test_bad_password(self, bmc):
+        rc, _, err = call(bmc, ["mc", "info"], password="wrong")
+        assert rc == 1 and "Unauthorized" in err
+
+
+class TestRedfishSession:
+    def test_connection_and_token_reuse(self, bmc):
+        for _ in range(10):
+            assert call(bmc, ["chassis", "power", "status"])[0] == 0
+        assert bmc.logins == 1
+        assert bmc.connections == 1
+
+    def test_expired_token_relogin(self, bmc):
+        assert call(bmc, ["mc", "info"])[0] == 0
+        bmc.tokens.clear()  # the BMC dropped the session
+        assert call(bmc, ["mc", "info"])[0] == 0
+        assert bmc.logins == 2
+
+    def test_parallel_requests_share_session(self, bmc):
+        results = []
+
+        def worker():
+            results.append(call(bmc, ["sensor"])[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [0] * 8
+        assert bmc.logins == 1
+        assert bmc.connections <= 8
+
+    def test_close_all_logs_out(self, bmc):
+        call(bmc, ["mc", "info"])
+        assert bmc.tokens
+        redfish.close_all()
+        assert not bmc.tokens
+
+
+@pytest.fixture
+def tls_bmc(tmp_path):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl not available")
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=bmc",
+         "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    mock_bmc = MockBmc()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock_bmc.handler())
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(cert, key)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    mock_bmc.port = server.server_address[1]
+    mock_bmc.der = ssl.PEM_cert_to_DER_cert(cert.read_text())
+    with mock.patch.object(preferences, "PREFERENCES_FILE", tmp_path / "preferences.json"), \
+         mock.patch.object(preferences, "CONFIG_DIR", tmp_path):
+        yield mock_bmc
+        redfish.close_all()
+    server.shutdown()
+    server.server_close()
+
+
+def set_tls(tls):
+    preferences.update_host_profiles({"127.0.0.1": {"redfish_tls": tls}})
+
+
+class TestRedfishTls:
+    def test_contexts(self):
+        ctx = redfish.tls_context({})
+        assert ctx.verify_mode == ssl.CERT_REQUIRED and ctx.check_hostname
+        for tls in ({"verify": False}, {"fingerprint": "ab"}):
+            assert redfish.tls_context(tls).verify_mode == ssl.CERT_NONE
+        assert redfish.normalize_fingerprint("AB:cd 01") == "abcd01"
+
+    def test_self_signed_refused_by_default(self, tls_bmc):
+        rc, _, err = call(tls_bmc, ["chassis", "power", "status"])
+        assert rc == 1 and "not trusted" in err and tls_bmc.logins == 0
+
+    def test_pinned_fingerprint(self, tls_bmc):
+        assert redfish.fetch_fingerprint("127.0.0.1", tls_bmc.port, 5) == redfish.cert_fingerprint(tls_bmc.der)
+        set_tls({"fingerprint": redfish.cert_fingerprint(tls_bmc.der)})
+        assert call(tls_bmc, ["chassis", "power", "status"])[0] == 0
+
+        set_tls({"fingerprint": "00" * 32})
+        rc, _, err = call(tls_bmc, ["chassis", "power", "status"])
+        assert rc == 1 and "fingerprint mismatch" in err
+
+    def test_insecure_opt_out(self, tls_bmc):
+        set_tls({"verify": False})
+        assert call(tls_bmc, ["chassis", "power", "status"])[0] == 0
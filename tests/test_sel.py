@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import sel
+from ipmi_menu.core.sel import (
+    SEVERITY_CRITICAL,
+    SEVERITY_INFO,
+    SEVERITY_WARNING,
+    SelStore,
+    classify_severity,
+    parse_sel_elist,
+    parse_sel_info,
+    sync_sel,
+)
+
+SEL_INFO = """SEL Information
+Version          : 1.5 (v1.5, v2 compliant)
+Entries          : {entries}
+Free Space       : 10000 bytes
+Last Add Time    : {last_add}
+Last Del Time    : {last_del}
+Overflow         : false
+"""
+
+LINES = [
+    "   1 | 05/20/2021 | 10:22:33 | Temperature #0x30 | Upper Critical going high | Asserted",
+    "   2 | 05/20/2021 | 10:23:00 | Temperature #0x30 | Upper Non-critical going high | Asserted",
+    "   3 | 05/21/2021 | 08:00:00 | Power Unit #0x01 | Power off/down | Asserted",
+    "   4 | 05/22/2021 | 09:00:00 | Memory #0x53 | Uncorrectable ECC | Asserted",
+    "   a | Pre-Init  |0000000012| System Event #0x01 | Timestamp Clock Sync | Asserted",
+]
+
+
+class FakeSel:
+    """Emulates `sel info` / `sel elist [last n]` for a SEL that can grow and be cleared."""
+
+    def __init__(self, lines):
+        self.lines = list(lines)
+        self.last_add = "05/20/2021 10:22:33"
+        self.last_del = "Not Available"
+        self.calls = []
+
+    def ipmi(self, host, user, password, interface, port, timeout, args):
+        self.calls.append(args)
+        if args == ["sel", "info"]:
+            return 0, SEL_INFO.format(entries=len(self.lines), last_add=self.last_add, last_del=self.last_del), ""
+        if args[:2] == ["sel", "elist"]:
+            lines = self.lines[-int(args[3]):] if len(args) == 4 else self.lines
+            return 0, "\n".join(lines), ""
+        return 1, "", "unexpected"
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SelStore(tmp_path / "sel.db")
+    yield s
+    s.close()
+
+
+class TestParsing:
+    def test_parse_info(self):
+        info = parse_sel_info(SEL_INFO.format(entries=42, last_add="x", last_del="y"))
+        assert info.entries == 42
+        assert info.last_add == "x"
+
+    def test_parse_elist(self):
+        entries = parse_sel_elist("\n".join(LINES))
+        assert [e.record_id for e in entries] == [1, 2, 3, 4, 10]
+        assert entries[0].timestamp == 1621506153
+        assert entries[4].timestamp is None
+        assert entries[0].direction == "Asserted"
+
+    def test_severity(self):
+        assert classify_severity("Upper Critical going high") == SEVERITY_CRITICAL
+        assert classify_severity("Upper Non-critical going high") == SEVERITY_WARNING
+        assert classify_severity("Correctable ECC") == SEVERITY_WARNING
+        assert classify_severity("Uncorrectable ECC") == SEVERITY_CRITICAL
+        assert classify_severity("Power off/down") == SEVERITY_INFO
+
+    def test_empty_sel(self):
+        assert parse_sel_elist("SEL has no entries") == []
+
+
+class TestSync:
+    def _sync(self, fake, store):
+        with mock.patch.object(sel, "ipmi", fake.ipmi):
+            return sync_sel("bmc1", "root", "x", "lanplus", 623, 10, store)
+
+    def test_first_sync_is_full(self, store):
+        fake = FakeSel(LINES[:3])
+        res = self._sync(fake, store)
+        assert res.ok and res.full and res.new == 3
+        assert ["sel", "elist"] in fake.calls
+
+    def test_unchanged_fetches_nothing(self, store):
+        fake = FakeSel(LINES[:3])
+        self._sync(fake, store)
+        fake.calls.clear()
+        res = self._sync(fake, store)
+        assert res.new == 0 and not res.full
+        assert fake.calls == [["sel", "info"]]
+
+    def test_incremental(self, store):
+        fake = FakeSel(LINES[:2])
+        self._sync(fake, store)
+        fake.lines = LINES[:4]
+        fake.last_add = "05/22/2021 09:00:00"
+        fake.calls.clear()
+        res = self._sync(fake, store)
+        assert res.new == 2 and not res.full
+        assert ["sel", "elist", "last", "2"] in fake.calls
+        assert len(store.query("bmc1")) == 4
+
+    def test_clear_forces_full(self, store):
+        fake = FakeSel(LINES[:3])
+        self._sync(fake, store)
+        fake.lines = LINES[3:4]
+        fake.last_del = "05/23/2021 00:00:00"
+        res = self._sync(fake, store)
+        assert res.full
+        assert [e.record_id for e in store.query("bmc1")] == [4]
+
+    def test_wrap_forces_full(self, store):
+        fake = FakeSel(LINES[:3])
+        self._sync(fake, store)
+        fake.lines = LINES[1:4]
+        fake.last_add = "05/22/2021 09:00:00"
+        res = self._sync(fake, store)
+        assert res.full
+        assert [e.record_id for e in store.query("bmc1")] == [4, 3, 2]
+
+
+class TestQuery:
+    def test_filters(self, store):
+        info = parse_sel_info(SEL_INFO.format(entries=5, last_add="", last_del=""))
+        store.store("bmc1", info, parse_sel_elist("\n".join(LINES)), replace=True)
+        store.store("bmc2", info, parse_sel_elist(LINES[0]), replace=True)
+        crit = store.query("bmc1", min_severity=SEVERITY_CRITICAL)
+        assert [e.record_id for e in crit] == [4, 1]
+        warn = store.query("bmc1", min_severity=SEVERITY_WARNING)
+        assert len(warn) == 3
+        recent = store.query("bmc1", since=1621555200)
+        assert [e.record_id for e in recent] == [4, 3]
+        assert len(store.query("bmc1", limit=2)) == 2
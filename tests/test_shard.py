@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import stat
+from unittest import mock
+
+from ipmi_menu.core import ipmi as ipmi_mod
+from ipmi_menu.core import transcript
+from ipmi_menu.core.fleet import Target
+from ipmi_menu.core.ipmi import host_cipher
+from ipmi_menu.core.shard import run_sharded, shard
+from ipmi_menu.core.transcript import TranscriptRecorder
+from ipmi_menu.core.utils import run_cmd
+
+
+def where(t: Target):
+    return t.host, os.getpid(), host_cipher(t.host)
+
+
+def mc_info(ipmitool: str, t: Target):
+    return run_cmd([ipmitool, "-H", t.host, "mc", "info"], 5)[1].strip()
+
+
+class TestShard:
+    def test_shard_sizes(self):
+        targets = [Target(f"h{i}", "u", "p") for i in range(7)]
+        assert [len(s) for s in shard(targets, 3)] == [3, 3, 1]
+
+    def test_single_process_keeps_order(self):
+        targets = [Target(f"h{i}", "u", "p") for i in range(20)]
+        out = list(run_sharded(where, targets, workers=4))
+        assert [h for h, _, _ in out] == [t.host for t in targets]
+        assert {pid for _, pid, _ in out} == {os.getpid()}
+
+    def test_processes_cover_every_target_once(self):
+        targets = [Target(f"h{i}", "u", "p") for i in range(40)]
+        with mock.patch.dict(ipmi_mod._host_ciphers, {"h3": 17}):
+            out = list(run_sharded(where, targets, processes=2, workers=2, shard_size=5))
+        assert sorted(h for h, _, _ in out) == sorted(t.host for t in targets)
+        assert os.getpid() not in {pid for _, pid, _ in out}
+        assert {h: c for h, _, c in out if c is not None} == {"h3": 17}
+
+    def test_worker_calls_are_recorded_by_the_parent(self, tmp_path):
+        ipmitool = tmp_path / "ipmitool"
+        ipmitool.write_text("#!/bin/sh\necho \"Device ID : $2\"\n")
+        ipmitool.chmod(ipmitool.stat().st_mode | stat.S_IEXEC)
+        targets = [Target(f"h{i}", "u", "p") for i in range(12)]
+        recorder = TranscriptRecorder(tmp_path / "calls.jsonl")
+        transcript.set_recorder(recorder)
+        try:
+            out = list(run_sharded(functools.partial(mc_info, str(ipmitool)), targets, processes=2, shard_size=3))
+        finally:
+            transcript.set_recorder(None)
+            recorder.close()
+        assert sorted(out) == sorted(f"Device ID : {t.host}" for t in targets)
+        lines = (tmp_path / "calls.jsonl").read_text().splitlines()
+        calls = [json.loads(ln) for ln in lines[1:]]
+        assert recorder.calls == 12
+        assert sorted(c["host"] for c in calls) == sorted(t.host for t in targets)
+        assert all(c["cmd"] == "mc info" and c["out"].startswith("Device ID") for c in calls)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import gzip
+import os
+import threading
+import time
+
+from ipmi_menu.core.sol_capture import DETACH_KEY, RotatingLog, SolCapture
+
+
+def _wait_for(cond, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class TestRotatingLog:
+    def test_rotation_and_retention(self, tmp_path):
+        log = RotatingLog(tmp_path, "bmc1", max_bytes=100, keep=2)
+        for i in range(5):
+            log.write(f"line {i} ".encode() * 20)
+        log.close()
+        segments = log.segments()
+        assert len(segments) == 2
+        with gzip.open(segments[-1], "rb") as f:
+            assert f.read().startswith(b"line 4")
+        assert (tmp_path / "bmc1.log").read_bytes() == b""
+
+    def test_retention_ignores_other_hosts(self, tmp_path):
+        other = tmp_path / "node.b.1700000000000000000.log.gz"
+        other.write_bytes(b"")
+        log = RotatingLog(tmp_path, "node", max_bytes=10, keep=1)
+        for _ in range(3):
+            log.write(b"x" * 10)
+        log.close()
+        assert len(log.segments()) == 1 and other not in log.segments()
+        assert other.exists()
+
+    def test_appends_to_existing(self, tmp_path):
+        (tmp_path / "bmc1.log").write_bytes(b"old\n")
+        log = RotatingLog(tmp_path, "bmc1")
+        log.write(b"new\n")
+        log.close()
+        assert (tmp_path / "bmc1.log").read_bytes() == b"old\nnew\n"
+
+
+class TestSolCapture:
+    def test_captures_many_consoles(self, tmp_path):
+        cmds = {f"h{i}": ["sh", "-c", f"echo boot h{i}; sleep 0.2; echo login h{i}"] for i in range(5)}
+        cap = SolCapture(cmds, tmp_path, buffer_bytes=1024)
+        cap.start()
+        assert _wait_for(lambda: not any(s.alive for s in cap.sessions.values()))
+        cap.stop()
+        for i in range(5):
+            text = (tmp_path / f"h{i}.log").read_bytes()
+            assert b"boot h" in text and f"login h{i}".encode() in text
+
+    def test_buffer_is_bounded(self, tmp_path):
+        cap = SolCapture({"h": ["sh", "-c", "yes console | head -c 100000"]}, tmp_path, buffer_bytes=500)
+        cap.start()
+        assert _wait_for(lambda: not cap.sessions["h"].alive)
+        cap.stop()
+        s = cap.sessions["h"]
+        assert len(s.buffer) == 500
+        assert s.received >= 100000
+
+    def test_missing_command(self, tmp_path):
+        cap = SolCapture({"h": ["nonexistent_command_xyz"]}, tmp_path)
+        cap.start()
+        cap.stop()
+        assert cap.sessions["h"].returncode == 127
+
+    def test_attach_forwards_input_and_detaches(self, tmp_path):
+        cap = SolCapture({"h": ["sh", "-c", "read x; echo got $x; sleep 5"]}, tmp_path)
+        cap.start()
+        in_r, in_w = os.pipe()
+        out_r, out_w = os.pipe()
+        os.write(in_w, b"hello\n")
+        try:
+            os.set_blocking(out_r, False)
+            writer = threading.Timer(0.5, lambda: os.write(in_w, DETACH_KEY))
+            writer.start()
+            cap.attach("h", stdin_fd=in_r, stdout_fd=out_w)
+            writer.join()
+            assert _wait_for(lambda: b"got hello" in cap.sessions["h"].buffer)
+        finally:
+            cap.stop()
+            for fd in (in_r, in_w, out_r, out_w):
+                os.close(fd)
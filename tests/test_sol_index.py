@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import gzip
+
+import pytest
+
+from ipmi_menu.core.sol_index import SolIndex, boot_stage, clean_line, tokenize
+
+BOOT = (
+    "\x1b[2J\x1b[1;1HAmerican Megatrends Inc.\r\n"
+    "Press <DEL> to enter setup\r\n"
+    "GNU GRUB  version 2.06\r\n"
+    "[    0.000000] Linux version 5.15.0-91-generic\r\n"
+    "[    1.234567] systemd[1]: Started Journal Service.\r\n"
+)
+
+
+@pytest.fixture
+def logdir(tmp_path):
+    return tmp_path
+
+
+@pytest.fixture
+def index(logdir):
+    idx = SolIndex(logdir)
+    yield idx
+    idx.close()
+
+
+class TestHelpers:
+    def test_clean_line_strips_ansi(self):
+        assert clean_line(b"\x1b[1;1HAmerican Megatrends\r\n") == "American Megatrends"
+
+    def test_tokenize(self):
+        assert tokenize("Kernel panic - not syncing: VFS") == {"kernel", "panic", "not", "syncing", "vfs"}
+
+    def test_boot_stage(self):
+        assert boot_stage("Press F2 to enter BIOS") == 0
+        assert boot_stage("GNU GRUB  version 2.06") == 1
+        assert boot_stage("Linux version 6.1.0") == 2
+        assert boot_stage("login:") is None
+
+
+class TestSolIndex:
+    def test_boot_segments_and_search(self, logdir, index):
+        panic = "[   12.0] Kernel panic - not syncing: VFS: Unable to mount root fs\r\n"
+        (logdir / "10.0.0.1.log").write_bytes((BOOT + panic + BOOT).encode())
+        (logdir / "10.0.0.2.log").write_bytes(BOOT.encode())
+        index.update()
+
+        assert len(index.boots("10.0.0.1")) == 2
+        assert len(index.boots("10.0.0.2")) == 1
+
+        hits = index.grep("Kernel panic")
+        assert list({seg.host for seg in hits}) == ["10.0.0.1"]
+        assert any("not syncing" in ln for lines in hits.values() for ln in lines)
+        assert index.search("panic", host="10.0.0.2") == []
+
+    def test_incremental_append(self, logdir, index):
+        log = logdir / "bmc.log"
+        log.write_bytes(BOOT.encode())
+        first = index.update()
+        assert first == len(BOOT.encode())
+        with open(log, "ab") as f:
+            f.write(b"watchdog: BUG: soft lockup\r\npartial line without newline")
+        second = index.update()
+        assert second == len(b"watchdog: BUG: soft lockup\r\n")
+        assert index.search("soft lockup")
+        assert index.update() == 0
+
+    def test_rotated_segments(self, logdir, index):
+        with gzip.open(logdir / "bmc.1700000000000000000.log.gz", "wb") as f:
+            f.write((BOOT + "oom-killer invoked\r\n").encode())
+        (logdir / "bmc.log").write_bytes(b"after rotation\r\n")
+        index.update()
+        hits = index.grep("oom-killer")
+        assert [seg.path.endswith(".gz") for seg in hits] == [True]
+        assert len(index.boots("bmc")) == 1
+
+    def test_live_log_rotation_reindexes(self, logdir, index):
+        log = logdir / "bmc.log"
+        log.write_bytes(b"old content marker\r\n")
+        index.update()
+        log.unlink()
+        log.write_bytes(b"fresh\r\n")
+        index.update()
+        assert index.search("marker") == []
+        assert index.search("fresh")
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import time
+from unittest import mock
+
+import pytest
+
+from ipmi_menu.core import transcript, utils
+from ipmi_menu.core.ipmi import ipmi, ipmi_stream
+from ipmi_menu.core.transcript import TranscriptPlayer, TranscriptRecorder, sanitize
+
+
+def fake_popen_answers(answers):
+    """subprocess.Popen replacement answering ipmitool argv tails from `answers`."""
+
+    class P:
+        def __init__(self, cmd, **kw):
+            self.returncode, self._out = answers[" ".join(cmd[cmd.index("-P") + 2:])]
+
+        def communicate(self, timeout=None):
+            return self._out, ""
+
+    return P
+
+
+@pytest.fixture
+def no_hooks():
+    yield
+    transcript.set_recorder(None)
+    transcript.set_player(None)
+
+
+class TestSanitize:
+    def test_secrets_masked(self):
+        cmd = ["ipmitool", "-H", "h", "-U", "root", "-P", "pw", "-k", "kg", "mc", "info"]
+        assert sanitize(cmd) == ["ipmitool", "-H", "h", "-U", "root", "-P", "****", "-k", "****", "mc", "info"]
+
+
+class TestRecordReplay:
+    @pytest.mark.parametrize("name", ["t.jsonl", "t.jsonl.gz"])
+    def test_round_trip(self, tmp_path, no_hooks, name):
+        path = tmp_path / name
+        rec = TranscriptRecorder(path)
+        transcript.set_recorder(rec)
+        answers = {"chassis power status": (0, "Chassis Power is on\n"), "mc info": (1, "")}
+        with mock.patch.object(utils.subprocess, "Popen", fake_popen_answers(answers)):
+            assert ipmi("h1", "root", "s3cret", "lanplus", 623, 5, ["chassis", "power", "status"])[0] == 0
+            ipmi("h1", "root", "s3cret", "lanplus", 623, 5, ["mc", "info"])
+        rec.close()
+        transcript.set_recorder(None)
+        assert rec.calls == 2
+
+        if not name.endswith(".gz"):
+            text = path.read_text()
+            assert "s3cret" not in text
+            first = json.loads(text.splitlines()[1])
+            assert first["host"] == "h1" and first["cmd"] == "chassis power status" and "err" not in first
+
+        transcript.set_player(TranscriptPlayer(path, scale=0))
+        with mock.patch.object(utils.subprocess, "Popen", side_effect=AssertionError("ran ipmitool")):
+            assert ipmi("h1", "other", "pw", "lan", 623, 5, ["chassis", "power", "status"]) == (
+                0, "Chassis Power is on", "")
+            assert ipmi("h1", "root", "pw", "lanplus", 623, 5, ["mc", "info"])[0] == 1
+            lines = []
+            assert ipmi_stream("h1", "root", "pw", "lanplus", 623, 5, ["chassis", "power", "status"], lines.append)[0] == 0
+            assert lines == ["Chassis Power is on"]
+            rc, _, err = ipmi("h2", "root", "pw", "lanplus", 623, 5, ["mc", "info"])
+            assert rc == 1 and "no recorded answer" in err
+
+
+class TestPlayer:
+    def write(self, path, records):
+        lines = [json.dumps({"transcript": 1, "started": 0})] + [json.dumps(r) for r in records]
+        path.write_text("\n".join(lines) + "\n")
+
+    def test_order_then_last_repeats(self, tmp_path):
+        self.write(tmp_path / "t.jsonl", [
+            {"t": 0, "host": "h", "cmd": "chassis power status", "wall": 0.01, "rc": 0, "out": "Chassis Power is off"},
+            {"t": 1, "host": "h", "cmd": "chassis power status", "wall": 0.01, "rc": 0, "out": "Chassis Power is on"},
+        ])
+        player = TranscriptPlayer(tmp_path / "t.jsonl", scale=0)
+        cmd = ["ipmitool", "-I", "lanplus", "-H", "h", "-U", "u", "-P", "p", "chassis", "power", "status"]
+        assert [player.play(cmd, 5)[1] for _ in range(3)] == [
+            "Chassis Power is off", "Chassis Power is on", "Chassis Power is on"]
+
+    def test_latency_scaled_and_timeout(self, tmp_path):
+        self.write(tmp_path / "t.jsonl", [
+            {"t": 0, "host": "h", "cmd": "sdr list", "wall": 0.4, "rc": 0, "out": "x"},
+            {"t": 0, "host": "h", "cmd": "sel list", "wall": 30, "rc": 0, "out": "x"},
+        ])
+        player = TranscriptPlayer(tmp_path / "t.jsonl", scale=0.25)
+        t0 = time.monotonic()
+        assert player.play(["ipmitool", "-H", "h", "sdr", "list"], 5)[0] == 0
+        assert 0.09 <= time.monotonic() - t0 < 0.3
+        assert player.play(["ipmitool", "-H", "h", "sel", "list"], 0.2) == (124, "", "timeout")
+
+    def test_not_a_transcript(self, tmp_path):
+        (tmp_path / "x.json").write_text('{"hosts": []}\n')
+        with pytest.raises(ValueError, match="not an ipmi-menu transcript"):
+            TranscriptPlayer(tmp_path / "x.json")
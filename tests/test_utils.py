@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import subprocess
+import time
 from unittest import mock
 
-from ipmi_menu.core.utils import _sanitize_cmd, run_cmd
+import pytest
+
+from ipmi_menu.core.utils import _sanitize_cmd, run_cmd, run_cmd_stream
 
 
 class TestSanitizeCmd:
@@ -40,12 +44,59 @@ class TestRunCmd:
         assert err == "timeout"
 
     def test_with_mock(self):
-        mock_result = mock.MagicMock()
-        mock_result.returncode = 0
-        mock_result.stdout = "Chassis Power is on\n"
-        mock_result.stderr = ""
+        mock_proc = mock.MagicMock()
+        mock_proc.returncode = 0
+        mock_proc.communicate.return_value = ("Chassis Power is on\n", "")
 
-        with mock.patch("ipmi_menu.core.utils.subprocess.run", return_value=mock_result):
+        with mock.patch("ipmi_menu.core.utils.subprocess.Popen", return_value=mock_proc):
             rc, out, err = run_cmd(["ipmitool", "power", "status"], timeout=10)
             assert rc == 0
             assert out == "Chassis Power is on"
+
+
+class TestRunCmdStream:
+    def test_lines_arrive_before_exit(self):
+        arrivals = []
+        start = time.monotonic()
+        rc, out, err = run_cmd_stream(
+            ["sh", "-c", "echo first; sleep 0.5; echo second"],
+            timeout=5,
+            on_line=lambda ln: arrivals.append((ln, time.monotonic() - start)),
+        )
+        assert rc == 0
+        assert out == "first\nsecond"
+        assert [ln for ln, _ in arrivals] == ["first", "second"]
+        assert arrivals[0][1] < 0.4
+
+    def test_stderr_and_exit_code(self):
+        rc, out, err = run_cmd_stream(["sh", "-c", "echo oops >&2; exit 3"], timeout=5, on_line=lambda ln: None)
+        assert rc == 3
+        assert out == ""
+        assert err == "oops"
+
+    def test_timeout_keeps_partial_output(self):
+        lines = []
+        rc, out, err = run_cmd_stream(["sh", "-c", "echo partial; sleep 10"], timeout=1, on_line=lines.append)
+        assert rc == 124
+        assert err == "timeout"
+        assert lines == ["partial"]
+
+    def test_failing_callback_reaps_child(self):
+        procs = []
+        real_popen = subprocess.Popen
+
+        def popen(*a, **kw):
+            procs.append(real_popen(*a, **kw))
+            return procs[-1]
+
+        def boom(line):
+            raise KeyboardInterrupt
+
+        with mock.patch.object(subprocess, "Popen", popen), pytest.raises(KeyboardInterrupt):
+            run_cmd_stream(["sh", "-c", "echo first; sleep 10"], timeout=30, on_line=boom)
+        assert procs[0].returncode is not None
+
+    def test_command_not_found(self):
+        rc, out, err = run_cmd_stream(["nonexistent_command_xyz"], timeout=5, on_line=lambda ln: None)
+        assert rc == 127
+        assert err == "command not found"
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from unittest import mock
+
+from ipmi_menu.core import detect as detect_mod
+from ipmi_menu.core import vendors
+from ipmi_menu.core.detect import detect
+from ipmi_menu.core.vendors import GENERIC, parse_manufacturer_id, power_summary, profile_for
+
+MC_INFO = """Device ID                 : 32
+Device Revision           : 1
+Firmware Revision         : 4.40
+IPMI Version              : 2.0
+Manufacturer ID           : {mid}
+Manufacturer Name         : {name}
+Product ID                : 256 (0x0100)
+Product Name              : {product}
+"""
+
+FRU = """FRU Device Description : Builtin FRU Device (ID 0)
+ Board Mfg             : Super Micro Computer
+ Board Product         : X11DPi-N
+"""
+
+
+def fake_ipmi(responses):
+    calls = []
+
+    def run(host, user, password, interface, port, timeout, args):
+        calls.append((tuple(args), timeout))
+        return responses.get(tuple(args), (1, "", "unsupported"))
+
+    return run, calls
+
+
+class TestParseManufacturerId:
+    def test_decimal(self):
+        assert parse_manufacturer_id(MC_INFO.format(mid=674, name="DELL Inc", product="")) == 674
+
+    def test_with_suffix(self):
+        assert parse_manufacturer_id("Manufacturer ID : 10876 (0x2a7c)") == 10876
+
+    def test_missing(self):
+        assert parse_manufacturer_id("Device ID : 32") is None
+
+    def test_garbage(self):
+        assert parse_manufacturer_id("Manufacturer ID : Unknown") is None
+
+
+class TestProfileFor:
+    def test_known(self):
+        assert profile_for(674).key == "dell"
+        assert profile_for(10876).key == "supermicro"
+        assert profile_for(11) is profile_for(47196)
+
+    def test_unknown(self):
+        assert profile_for(99999) is GENERIC
+        assert profile_for(None) is GENERIC
+
+    def test_timeout_never_shorter(self):
+        p = profile_for(674)
+        assert p.timeout("sdr", 60) == 90
+        assert p.timeout("sdr", 120) == 120
+        assert p.timeout("sel", 300) == 300
+
+
+class TestDetect:
+    def test_known_id_skips_fru(self):
+        run, calls = fake_ipmi(
+            {("mc", "info"): (0, MC_INFO.format(mid=674, name="DELL Inc", product="PowerEdge R640"), "")}
+        )
+        with mock.patch.object(detect_mod, "ipmi", run):
+            di = detect("h", "u", "p", "lanplus", 623, 10)
+        assert di.vendor == "dell"
+        assert di.manufacturer_id == 674
+        assert di.profile.key == "dell"
+        assert di.product == "PowerEdge R640"
+        assert [c[0] for c in calls] == [("mc", "info")]
+        assert "PowerEdge R640" in di.mc_text and di.fru_text == ""
+
+    def test_known_id_without_product_reads_fru(self):
+        run, calls = fake_ipmi(
+            {
+                ("mc", "info"): (0, MC_INFO.format(mid=10876, name="Super Micro Computer Inc.", product=""), ""),
+                ("fru", "print"): (0, FRU, ""),
+            }
+        )
+        with mock.patch.object(detect_mod, "ipmi", run):
+            di = detect("h", "u", "p", "lanplus", 623, 10)
+        assert di.vendor == "supermicro"
+        assert di.product == "X11DPi-N"
+        assert calls[1] == (("fru", "print"), 10)
+        assert di.fru_text == FRU  # kept for the inventory
+
+    def test_unknown_id_falls_back_to_names(self):
+        run, _ = fake_ipmi(
+            {
+                ("mc", "info"): (0, MC_INFO.format(mid=12345, name="Acme Corp", product=""), ""),
+                ("fru", "print"): (0, FRU, ""),
+            }
+        )
+        with mock.patch.object(detect_mod, "ipmi", run):
+            di = detect("h", "u", "p", "lanplus", 623, 10)
+        assert di.profile is GENERIC
+        assert di.vendor == "supermicro"  # from the FRU board manufacturer
+        assert di.manufacturer == "Acme Corp"
+
+
+class TestPowerSummary:
+    def test_oem_fast_path(self):
+        run, calls = fake_ipmi({("delloem", "powermonitor"): (0, "Peak Power: 350 W", "")})
+        with mock.patch.object(vendors, "ipmi", run):
+            rc, out, _ = power_summary("h", "u", "p", "lanplus", 623, 10, profile_for(674))
+        assert rc == 0 and "350" in out
+        assert len(calls) == 1
+
+    def test_falls_back_to_dcmi(self):
+        run, calls = fake_ipmi({("dcmi", "power", "reading"): (0, "Instantaneous power reading: 200 Watts", "")})
+        with mock.patch.object(vendors, "ipmi", run):
+            rc, out, _ = power_summary("h", "u", "p", "lanplus", 623, 10, profile_for(674))
+        assert rc == 0 and "200" in out
+        assert [c[0] for c in calls] == [("delloem", "powermonitor"), ("dcmi", "power", "reading")]
+
+    def test_generic_single_call(self):
+        run, calls = fake_ipmi({})
+        with mock.patch.object(vendors, "ipmi", run):
+            rc, _, _ = power_summary("h", "u", "p", "lanplus", 623, 10, GENERIC)
+        assert rc == 1
+        assert len(calls) == 1